@@ -0,0 +1,204 @@
+"""
+Extracción de campos de PDFProcessor tal como era antes de precompilar los
+patrones y categorizar en una pasada. Se conserva sin cambios como punto de
+comparación para benchmarks/bench_pdf_extraction.py --baseline; no lo usa
+la aplicación.
+"""
+import re
+from datetime import datetime
+from typing import List
+
+# Separadores entre secciones (productos) dentro del texto
+SECTION_SEPARATOR = re.compile(r'\n\s*\n\s*\n|\f|\n-{3,}')
+
+class BaselinePDFProcessor:
+    """PDFProcessor de routes/pdf.py antes de precompilar los patrones (solo la parte de texto)"""
+
+    def __init__(self):
+        self.patterns = {
+            'titulo': [
+                r'(?:título|title|nombre):\s*([^\n]+)',
+                r'^([A-Z][^:\n]+(?:\s+[A-Z][^\n]*)*)\s*$',
+                r'(?:^|\n)([A-Z][A-Za-z0-9\s:]+(?:20\d{2}|III|IV|V|VI|VII|VIII|IX|X))',
+            ],
+            'descripcion': [
+                r'(?:descripción|description|resumen|summary):\s*([^\n]+(?:\n[^\n:]*)*)',
+                r'(?:overview|sinopsis):\s*([^\n]+)',
+            ],
+            'pais': [
+                r'(?:país|country|origin|procedencia):\s*([^\n]+)',
+                r'(?:desarrollado en|made in|from):\s*([^\n]+)',
+                r'\b(Estados Unidos|USA|United States|España|Spain|Francia|France|Alemania|Germany|Reino Unido|UK|Japón|Japan|China|Corea del Sur|South Korea|México|Mexico|Argentina|Brasil|Brazil|Italia|Italy|Canadá|Canada|Australia|Suecia|Sweden|Polonia|Poland|Holanda|Netherlands)\b'
+            ],
+            'fecha': [
+                r'(?:fecha|date|año|year|lanzamiento|release):\s*(\d{1,2}[-/]\d{1,2}[-/]\d{4}|\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{4})',
+                r'(?:released|launched):\s*(\d{4})',
+                r'\b(20\d{2})\b'
+            ],
+            'plataformas': [
+                r'(?:plataformas|platforms|available on):\s*([^\n]+)',
+                r'(?:compatible con|supports):\s*([^\n]+)',
+                r'\b(PC|PlayStation|Xbox|Nintendo|Switch|PS5|PS4|Xbox One|Xbox Series|Windows|macOS|Linux|Android|iOS|Steam|Epic Games)\b'
+            ],
+            'categoria': [
+                r'(?:categoría|category|tipo|type|género|genre):\s*([^\n]+)',
+                r'\b(juego|game|aplicación|app|serie|series|película|movie|telenovela|reality|animado|anime)\b'
+            ]
+        }
+
+    def extract_products_from_text(self, text: str) -> List[dict]:
+        """Extrae productos del texto usando patrones"""
+        # Dividir el texto en secciones (por ejemplo, por páginas o párrafos)
+        sections = self._split_into_sections(text)
+        return self.extract_products_from_sections(sections)
+
+    def extract_products_from_sections(self, sections: List[str]) -> List[dict]:
+        """Extrae productos de secciones ya separadas"""
+        products = []
+        for section in sections:
+            section = section.strip()
+            if len(section) <= 50:
+                continue
+            product = self._extract_product_from_section(section)
+            if product and product.get('titulo'):
+                products.append(product)
+        return products
+
+    def _split_into_sections(self, text: str) -> List[str]:
+        """Divide el texto en secciones lógicas"""
+        # Dividir por saltos de página múltiples o patrones específicos
+        sections = SECTION_SEPARATOR.split(text)
+        return [section.strip() for section in sections if len(section.strip()) > 50]
+
+    def _extract_product_from_section(self, section: str) -> dict:
+        """Extrae información de un producto de una sección de texto"""
+        product = {
+            'titulo': '',
+            'descripcion': '',
+            'pais': '',
+            'fecha_lanzamiento': '',
+            'plataformas': [],
+            'categoria': 'juegos',
+            'subcategoria': 'pc'
+        }
+
+        # Extraer título
+        for pattern in self.patterns['titulo']:
+            match = re.search(pattern, section, re.MULTILINE | re.IGNORECASE)
+            if match:
+                titulo = match.group(1).strip()
+                if len(titulo) > 3 and len(titulo) < 100:
+                    product['titulo'] = titulo
+                    break
+
+        # Extraer descripción
+        for pattern in self.patterns['descripcion']:
+            match = re.search(pattern, section, re.MULTILINE | re.IGNORECASE | re.DOTALL)
+            if match:
+                descripcion = match.group(1).strip()[:500]  # Limitar longitud
+                product['descripcion'] = descripcion
+                break
+        
+        # Si no hay descripción específica, usar primeras líneas después del título
+        if not product['descripcion'] and product['titulo']:
+            lines = section.split('\n')
+            title_found = False
+            desc_parts = []
+            for line in lines:
+                if product['titulo'].lower() in line.lower():
+                    title_found = True
+                    continue
+                if title_found and line.strip():
+                    desc_parts.append(line.strip())
+                    if len(' '.join(desc_parts)) > 100:
+                        break
+            if desc_parts:
+                product['descripcion'] = ' '.join(desc_parts)[:500]
+
+        # Extraer país
+        for pattern in self.patterns['pais']:
+            match = re.search(pattern, section, re.IGNORECASE)
+            if match:
+                product['pais'] = match.group(1).strip()
+                break
+
+        # Extraer fecha
+        for pattern in self.patterns['fecha']:
+            match = re.search(pattern, section, re.IGNORECASE)
+            if match:
+                fecha = match.group(1)
+                # Formatear fecha
+                if len(fecha) == 4:  # Solo año
+                    product['fecha_lanzamiento'] = f"{fecha}-01-01"
+                else:
+                    product['fecha_lanzamiento'] = self._format_date(fecha)
+                break
+
+        # Extraer plataformas
+        plataformas_encontradas = set()
+        for pattern in self.patterns['plataformas']:
+            matches = re.findall(pattern, section, re.IGNORECASE)
+            for match in matches:
+                if isinstance(match, str):
+                    # Dividir por comas, y, etc.
+                    plats = re.split(r'[,;y&]|\sand\s', match)
+                    for plat in plats:
+                        plat = plat.strip()
+                        if plat:
+                            plataformas_encontradas.add(plat)
+
+        product['plataformas'] = list(plataformas_encontradas)[:10]  # Limitar cantidad
+
+        # Determinar categoría y subcategoría
+        product_lower = section.lower()
+        if any(word in product_lower for word in ['juego', 'game', 'gaming']):
+            product['categoria'] = 'juegos'
+            if any(word in product_lower for word in ['xbox one']):
+                product['subcategoria'] = 'xboxOne'
+            elif any(word in product_lower for word in ['xbox series', 'series x', 'series s']):
+                product['subcategoria'] = 'xboxSeries'
+            else:
+                product['subcategoria'] = 'pc'
+        elif any(word in product_lower for word in ['app', 'aplicación', 'software']):
+            product['categoria'] = 'aplicaciones'
+            if any(word in product_lower for word in ['ios', 'iphone', 'ipad', 'apple']):
+                product['subcategoria'] = 'apple'
+            else:
+                product['subcategoria'] = 'android'
+        elif any(word in product_lower for word in ['serie', 'series', 'tv']):
+            product['categoria'] = 'seriesTV'
+        elif any(word in product_lower for word in ['película', 'movie', 'film']):
+            product['categoria'] = 'peliculas'
+        elif any(word in product_lower for word in ['anime']):
+            product['categoria'] = 'animes'
+        elif any(word in product_lower for word in ['animado', 'cartoon', 'animation']):
+            product['categoria'] = 'animados'
+        elif any(word in product_lower for word in ['telenovela', 'novela']):
+            product['categoria'] = 'telenovelas'
+        elif any(word in product_lower for word in ['reality', 'show']):
+            product['categoria'] = 'realitys'
+
+        # Valores por defecto si no se encontraron
+        if not product['pais']:
+            product['pais'] = 'No especificado'
+        if not product['fecha_lanzamiento']:
+            product['fecha_lanzamiento'] = '2024-01-01'
+        if not product['descripcion']:
+            product['descripcion'] = 'Descripción no disponible'
+
+        return product
+
+    def _format_date(self, date_str: str) -> str:
+        """Formatea una fecha al formato YYYY-MM-DD"""
+        try:
+            # Intentar varios formatos
+            formats = ['%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d', '%d-%m-%Y', '%m-%d-%Y', '%Y-%m-%d']
+            for fmt in formats:
+                try:
+                    date_obj = datetime.strptime(date_str, fmt)
+                    return date_obj.strftime('%Y-%m-%d')
+                except ValueError:
+                    continue
+            return '2024-01-01'  # Fecha por defecto
+        except:
+            return '2024-01-01'
@@ -0,0 +1,282 @@
+"""
+Prueba de carga reproducible de la API del catálogo, en proceso (cliente
+ASGI de httpx sobre la app de server.py, con middleware incluido).
+
+Por cada tamaño de catálogo siembra productos sintéticos (una parte con la
+imagen en base64 dentro del documento, como los productos antiguos) y mide
+GET /products con mezclas de categoría, subcategoría, búsqueda y campos,
+el bootstrap, la subida de PDF (nuevos y repetidos) y el guardado de los
+productos importados. Informa p50/p95/p99, throughput y RSS en JSON.
+
+Almacenes: `mongomock` (por defecto; requiere mongomock-motor y no soporta
+búsqueda de texto), `mongo` (MONGO_URL, en la base <DB_NAME>_bench, que se
+vacía) o `memory` (repositorio en memoria; el resto de colecciones en
+mongomock). Desde backend/:
+
+    python -m benchmarks.bench_catalog_load --sizes 1000 10000 100000 --output load.json
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import resource
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'mara_productions')
+
+import httpx
+
+from benchmarks.pdf_fixtures import catalog_pdf
+
+CATEGORIES = {
+    "juegos": ["pc", "xboxOne", "xboxSeries"],
+    "aplicaciones": ["android", "apple"],
+    "seriesTV": [None],
+    "peliculas": [None],
+    "animes": [None],
+}
+TITLE_WORDS = ["Cyberpunk", "Witcher", "Halo", "Forza", "Spotify", "Stranger", "Parásito",
+               "Titan", "Toy", "Flores", "Zelda", "Mario", "Sonic", "Batman", "Dune"]
+SEARCH_TERMS = ["witcher", "halo", "parasito", "zelda", "aventura", "xbox", "méxico"]
+PLATFORMS = ["PC", "PlayStation 5", "Xbox One", "Xbox Series X", "Nintendo Switch", "iOS", "Android"]
+
+def generate_products(count: int, inline_ratio: float, image_kb: int, seed: int = 0) -> List[dict]:
+    """Productos sintéticos; `inline_ratio` de ellos con imagen base64 de `image_kb` KB"""
+    rng = random.Random(seed)
+    # Pocas imágenes distintas: el tamaño del documento es realista sin multiplicar la memoria
+    images = [
+        "data:image/jpeg;base64," + base64.b64encode(rng.randbytes(image_kb * 1024 * 3 // 4)).decode()
+        for _ in range(8)
+    ]
+    base = datetime(2023, 1, 1)
+    products = []
+    for n in range(count):
+        categoria = rng.choice(list(CATEGORIES))
+        created = base + timedelta(seconds=rng.randint(0, 5 * 10 ** 7), microseconds=rng.randint(0, 999) * 1000)
+        products.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "titulo": f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)} {n}",
+            "descripcion": f"Aventura {rng.choice(TITLE_WORDS).lower()} con contenido adicional y banda sonora",
+            "imagen": rng.choice(images) if rng.random() < inline_ratio else f"/api/images/{rng.getrandbits(256):064x}",
+            "pais": rng.choice(["México", "Japón", "Estados Unidos", "Polonia", "Corea del Sur"]),
+            "fecha_lanzamiento": f"{rng.randint(1995, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "plataformas": rng.sample(PLATFORMS, 2),
+            "categoria": categoria,
+            "subcategoria": rng.choice(CATEGORIES[categoria]),
+            "created_at": created,
+            "updated_at": created,
+        })
+    return products
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentil por rango más cercano"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+def rss_mb() -> Dict[str, float]:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    current_mb = None
+    try:
+        with open("/proc/self/statm") as statm:
+            current_mb = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+    return {"peak_rss_mb": round(peak_mb, 1), "rss_mb": round(current_mb, 1) if current_mb else None}
+
+async def run_workload(client: httpx.AsyncClient, make_request: Callable[[random.Random, int], dict],
+                       requests: int, concurrency: int, seed: int) -> dict:
+    """Ejecuta `requests` peticiones con `concurrency` en paralelo y resume latencias"""
+    rng = random.Random(seed)
+    specs = [make_request(rng, n) for n in range(requests)]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(spec: dict):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(**spec)
+            latencies.append(time.perf_counter() - start)
+            status = str(response.status_code)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(spec) for spec in specs))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if int(status) >= 400),
+        "status_codes": statuses,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "throughput_rps": round(requests / wall, 1),
+    }
+
+def _list_request(params: dict) -> dict:
+    return {"method": "GET", "url": "/api/products", "params": params}
+
+def read_workloads(page_size: int) -> Dict[str, Callable[[random.Random, int], dict]]:
+    return {
+        "products_page": lambda rng, n: _list_request({"limit": page_size}),
+        "products_category": lambda rng, n: _list_request(
+            {"categoria": rng.choice(list(CATEGORIES)), "limit": page_size}),
+        "products_subcategory": lambda rng, n: _list_request(
+            {"categoria": "juegos", "subcategoria": rng.choice(CATEGORIES["juegos"]), "limit": page_size}),
+        "products_search": lambda rng, n: _list_request({"search": rng.choice(SEARCH_TERMS), "limit": page_size}),
+        "products_fields": lambda rng, n: _list_request(
+            {"fields": "titulo,categoria,subcategoria", "limit": page_size * 4}),
+        "bootstrap": lambda rng, n: {"method": "GET", "url": "/api/bootstrap"},
+    }
+
+def pdf_workloads(pdf_pages: int, seed: int) -> Dict[str, Callable[[random.Random, int], dict]]:
+    repeated = catalog_pdf(pdf_pages, seed=seed)
+
+    def upload(content: bytes) -> dict:
+        return {"method": "POST", "url": "/api/pdf/upload",
+                "files": {"file": ("catalogo.pdf", content, "application/pdf")}}
+
+    def save(rng: random.Random, n: int) -> dict:
+        products = [{
+            "titulo": f"Importado {seed} {n} {i}", "descripcion": "Desde PDF", "imagen": "/placeholder.png",
+            "pais": "México", "fecha_lanzamiento": "2024-01-01", "plataformas": ["PC"],
+            "categoria": "juegos", "subcategoria": "pc",
+        } for i in range(20)]
+        return {"method": "POST", "url": "/api/pdf/save-products", "json": products}
+
+    return {
+        # Cada petición es un PDF distinto: análisis completo en el pool
+        "pdf_upload_new": lambda rng, n: upload(catalog_pdf(pdf_pages, seed=seed * 100000 + n + 1)),
+        # El mismo PDF: resultado desde la caché por SHA-256
+        "pdf_upload_repeated": lambda rng, n: upload(repeated),
+        "pdf_save": save,
+    }
+
+async def _stores(store: str):
+    """(db auxiliar, repositorio de productos) para el almacén pedido"""
+    from database.indexes import ensure_indexes
+    if store == "mongo":
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from database.mongo_product_repository import MongoProductRepository
+        db = AsyncIOMotorClient(os.environ['MONGO_URL'])[f"{os.environ['DB_NAME']}_bench"]
+        await db.client.drop_database(db.name)
+        await ensure_indexes(db)
+        return db, MongoProductRepository(db)
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("Los almacenes mongomock y memory requieren: pip install mongomock-motor")
+    db = AsyncMongoMockClient()["bench"]
+    if store == "memory":
+        from database.memory_product_repository import MemoryProductRepository
+        return db, MemoryProductRepository()
+    from database.mongo_product_repository import MongoProductRepository
+    # mongomock no implementa índices de texto; basta el único de la clave natural
+    await db.products.create_index("natural_key", unique=True)
+    return db, MongoProductRepository(db)
+
+def _app_for(db, repo):
+    import logging
+    import server
+    # server.py configura INFO; el log de cada petición de httpx distorsiona las medidas
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    from database.product_repository import get_product_repository
+    from routes import bootstrap, config, images, pdf, products
+    app = server.app
+    for module in (products, config, pdf, images, bootstrap):
+        app.dependency_overrides[module.get_database] = lambda: db
+    app.dependency_overrides[get_product_repository] = lambda: repo
+    return app
+
+async def run_size(args, size: int) -> dict:
+    from services.response_cache import response_cache
+    response_cache.clear()
+    if not args.cache:
+        # Ninguna respuesta cabe: cada lectura va a la base de datos
+        response_cache.max_bytes = 0
+
+    db, repo = await _stores(args.store)
+    app = _app_for(db, repo)
+    result = {"items": size}
+
+    start = time.perf_counter()
+    products = generate_products(size, args.inline_ratio, args.image_kb, args.seed)
+    for offset in range(0, size, args.seed_batch):
+        await repo.bulk_upsert(products[offset:offset + args.seed_batch])
+    del products
+    result["seed_seconds"] = round(time.perf_counter() - start, 2)
+
+    workloads = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name, make_request in read_workloads(args.page_size).items():
+            if name == "products_search" and args.store == "mongomock":
+                workloads[name] = {"skipped": "mongomock no implementa $text"}
+                continue
+            workloads[name] = await run_workload(client, make_request, args.requests, args.concurrency, args.seed)
+        if args.pdf_requests:
+            for name, make_request in pdf_workloads(args.pdf_pages, args.seed).items():
+                workloads[name] = await run_workload(
+                    client, make_request, args.pdf_requests, args.pdf_concurrency, args.seed
+                )
+
+    result["workloads"] = workloads
+    result.update(rss_mb())
+    return result
+
+async def main(args) -> dict:
+    from services import pdf_pool
+    report = {
+        "benchmark": "catalog_load",
+        "started_at": datetime.utcnow().isoformat() + "Z",
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": [],
+    }
+    try:
+        for size in args.sizes:
+            report["results"].append(await run_size(args, size))
+            print(json.dumps(report["results"][-1]), file=sys.stderr)
+    finally:
+        pdf_pool.shutdown()
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--store", choices=["mongomock", "mongo", "memory"], default="mongomock")
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por carga de lectura")
+    parser.add_argument("--pdf-requests", type=int, default=10, help="Peticiones por carga de PDF (0 las omite)")
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pdf-concurrency", type=int, default=2,
+                        help="Por encima de PDF_MAX_PENDING las subidas responden 503")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--inline-ratio", type=float, default=0.1, help="Fracción con imagen base64 en el documento")
+    parser.add_argument("--image-kb", type=int, default=48)
+    parser.add_argument("--seed-batch", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="Desactiva la caché de respuestas")
+    parser.add_argument("--output", help="Archivo donde guardar el informe JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    print(text)
@@ -0,0 +1,93 @@
+"""
+Microbenchmark de la serialización de listas de productos: ruta normal
+(Product por fila + encoder estándar) frente a FAST_JSON (orjson sobre las
+filas de la base de datos). Comprueba además que ambas producen los mismos
+bytes. Desde backend/:
+
+    python -m benchmarks.bench_json_serialization --sizes 1000 10000
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from services import serialization
+from services.serialization import render_products
+
+TITLES = ["Cyberpunk 2077", "The Witcher 3", "Halo Infinite", "Forza Horizon 5", "Spotify",
+          "Stranger Things", "Parásito", "Shingeki no Kyojin", "Toy Story 4", "La Casa de las Flores"]
+PLATFORMS = ["PC", "PlayStation 5", "Xbox One", "Xbox Series X", "Nintendo Switch", "iOS", "Android"]
+
+def generate_rows(count: int, source: str = "mongo", seed: int = 0) -> list:
+    """Filas como las devuelve Motor (fechas naive al milisegundo) o PostgREST (texto)"""
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    rows = []
+    for n in range(count):
+        created = base + timedelta(seconds=rng.randint(0, 10 ** 7), milliseconds=rng.randint(0, 999))
+        row = {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "titulo": f"{rng.choice(TITLES)} {n}",
+            "descripcion": "Edición especial con banda sonora original y contenido adicional " * 2,
+            "imagen": f"/api/images/{rng.getrandbits(256):064x}",
+            "pais": rng.choice(["México", "Japón", "Corea del Sur", "Polonia"]),
+            "fecha_lanzamiento": f"{rng.randint(1995, 2024)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+            "plataformas": rng.sample(PLATFORMS, 3),
+            "categoria": "juegos",
+            "subcategoria": rng.choice(["pc", "xboxOne", None]),
+            "created_at": created,
+            "updated_at": created,
+        }
+        if source == "supabase":
+            # PostgREST recorta los ceros finales de los microsegundos
+            for field in ("created_at", "updated_at"):
+                text = row[field].replace(tzinfo=timezone.utc).isoformat()
+                row[field] = text.replace("000+", "+") if "." in text else text
+        else:
+            row["_id"] = n
+            row["natural_key"] = row["titulo"].lower()
+        rows.append(row)
+    return rows
+
+def _time(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run(sizes, repeat: int) -> list:
+    results = []
+    for source in ("mongo", "supabase"):
+        for size in sizes:
+            rows = generate_rows(size, source)
+
+            serialization.FAST_JSON = False
+            standard_body = render_products(rows)
+            standard = _time(lambda: render_products(rows), repeat)
+
+            serialization.FAST_JSON = True
+            fast_body = render_products(rows)
+            fast = _time(lambda: render_products(rows), repeat)
+
+            results.append({
+                "source": source,
+                "items": size,
+                "bytes": len(fast_body),
+                "identical": fast_body == standard_body,
+                "standard_seconds": round(standard, 4),
+                "fast_seconds": round(fast, 4),
+                "speedup": round(standard / fast, 1),
+            })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for result in run(args.sizes, args.repeat):
+        print(json.dumps(result))
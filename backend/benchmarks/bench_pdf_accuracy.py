@@ -0,0 +1,163 @@
+"""
+Velocidad y precisión del análisis de PDF de extremo a extremo (pdfplumber
+y PDFProcessor, la misma función que ejecuta el pool) sobre catálogos
+sintéticos con verdad de referencia (benchmarks/catalog_generator.py).
+
+Informa páginas por segundo, tiempo por etapa, precision/recall de los
+productos detectados y acierto por campo. Con --baseline compara contra un
+informe anterior y termina con error si la precisión bajó, para que una
+optimización del parser no empeore la extracción sin que se note. Desde
+backend/:
+
+    python -m benchmarks.bench_pdf_accuracy --pages 200 1000 --noise 0 0.3 --output pdf.json
+    python -m benchmarks.bench_pdf_accuracy --pages 200 --noise 0 0.3 --baseline pdf.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.catalog_generator import catalog_pdf_with_truth
+from routes.pdf import _finalize_products, process_pdf_file
+
+FIELDS = ("titulo", "descripcion", "pais", "fecha_lanzamiento", "plataformas", "categoria", "subcategoria")
+# Verdades posteriores a la actual donde se busca el producto de cada predicción
+MATCH_WINDOW = 5
+# Campos de _agreement que deben coincidir para considerar detectado un producto
+MIN_AGREEMENT = 3
+# Margen de la comparación con --baseline (evita falsos avisos por redondeo)
+TOLERANCE = 0.0005
+
+def _normalize(text: Optional[str]) -> str:
+    text = unicodedata.normalize('NFKD', (text or "").casefold())
+    return ' '.join(''.join(c for c in text if not unicodedata.combining(c)).split())
+
+def _field_correct(field: str, predicted: dict, expected: dict) -> bool:
+    if field == "plataformas":
+        return sorted(p.strip() for p in predicted.get(field) or []) == expected[field]
+    if field == "descripcion":
+        return _normalize(predicted.get(field)) == _normalize(expected[field])
+    return predicted.get(field) == expected[field]
+
+def _agreement(predicted: dict, expected: dict) -> int:
+    """Campos que coinciden (título y descripción por contención, pues el parser puede arrastrar texto)"""
+    return sum((
+        _normalize(expected["titulo"]) in _normalize(predicted.get("titulo")),
+        _normalize(expected["descripcion"]) in _normalize(predicted.get("descripcion")),
+        predicted.get("pais") == expected["pais"],
+        predicted.get("fecha_lanzamiento") == expected["fecha_lanzamiento"],
+        predicted.get("categoria") == expected["categoria"],
+    ))
+
+def match_products(predicted: List[dict], truth: List[dict]) -> List[Tuple[dict, dict]]:
+    """
+    Empareja en orden cada producto extraído con uno de referencia cercano
+    que coincida en al menos MIN_AGREEMENT campos. No basta con el título:
+    si el parser no reconoce la etiqueta del título, el producto se detecta
+    igualmente y el fallo cuenta en el acierto del campo, no en el recall.
+    """
+    pairs = []
+    position = 0
+    for product in predicted:
+        for index in range(position, min(position + MATCH_WINDOW, len(truth))):
+            if _agreement(product, truth[index]) >= MIN_AGREEMENT:
+                pairs.append((product, truth[index]))
+                position = index + 1
+                break
+    return pairs
+
+def score(predicted: List[dict], truth: List[dict]) -> dict:
+    pairs = match_products(predicted, truth)
+    precision = len(pairs) / len(predicted) if predicted else 0.0
+    recall = len(pairs) / len(truth) if truth else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    # Acierto por campo sobre todos los productos de referencia: uno no
+    # detectado cuenta como fallo en cada campo
+    field_accuracy = {
+        field: round(sum(_field_correct(field, p, t) for p, t in pairs) / len(truth), 4) if truth else 0.0
+        for field in FIELDS
+    }
+    return {
+        "expected_products": len(truth),
+        "extracted_products": len(predicted),
+        "matched_products": len(pairs),
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "field_accuracy": field_accuracy,
+    }
+
+def run(pages: int, noise: float, seed: int) -> dict:
+    content, truth = catalog_pdf_with_truth(pages, noise, seed)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(content)
+    try:
+        start = time.perf_counter()
+        result = process_pdf_file(tmp.name, {})
+        elapsed = time.perf_counter() - start
+    finally:
+        os.unlink(tmp.name)
+
+    products = _finalize_products(result["products"])
+    return {
+        "pages": pages,
+        "noise": noise,
+        "seed": seed,
+        "pdf_bytes": len(content),
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 1),
+        "stage_seconds": {stage: round(seconds, 3) for stage, seconds in result["timings"].items()},
+        **score(products, truth),
+    }
+
+def regressions(results: List[dict], baseline: dict) -> List[str]:
+    """Métricas de precisión peores que las del informe base, por (pages, noise, seed)"""
+    previous = {(r["pages"], r["noise"], r["seed"]): r for r in baseline["results"]}
+    problems = []
+    for result in results:
+        before = previous.get((result["pages"], result["noise"], result["seed"]))
+        if not before:
+            continue
+        checks: Dict[str, Tuple[float, float]] = {
+            metric: (before[metric], result[metric]) for metric in ("precision", "recall")
+        }
+        checks.update({
+            f"field_accuracy.{field}": (before["field_accuracy"][field], result["field_accuracy"][field])
+            for field in FIELDS
+        })
+        for metric, (old, new) in checks.items():
+            if new < old - TOLERANCE:
+                problems.append(f"pages={result['pages']} noise={result['noise']}: {metric} {old} -> {new}")
+    return problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200])
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.0, 0.3])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Archivo donde guardar el informe JSON")
+    parser.add_argument("--baseline", help="Informe anterior; sale con código 1 si la precisión bajó")
+    args = parser.parse_args()
+
+    results = []
+    for pages in args.pages:
+        for noise in args.noise:
+            results.append(run(pages, noise, args.seed))
+            print(json.dumps(results[-1]), file=sys.stderr)
+    report = {"benchmark": "pdf_accuracy", "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            problems = regressions(results, json.load(baseline_file))
+        for problem in problems:
+            print(f"Regresión de precisión: {problem}", file=sys.stderr)
+        sys.exit(1 if problems else 0)
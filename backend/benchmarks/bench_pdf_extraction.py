@@ -0,0 +1,93 @@
+"""
+Microbenchmark de PDFProcessor sobre el texto de un catálogo sintético.
+
+Mide solo la división en secciones y la extracción de campos (sin pdfplumber)
+para aislar el costo de los patrones. Con --baseline mide también la
+versión anterior a precompilar los patrones (benchmarks/baseline_pdf_processor.py)
+sobre el mismo texto e informa la mejora. Desde backend/:
+
+    python -m benchmarks.bench_pdf_extraction --pages 500
+    python -m benchmarks.bench_pdf_extraction --pages 500 --baseline
+"""
+import argparse
+import json
+import random
+import time
+from typing import List
+
+from benchmarks.baseline_pdf_processor import BaselinePDFProcessor
+from routes.pdf import PDFProcessor
+
+TITLES = ["Cyberpunk", "The Witcher", "Halo", "Forza Horizon", "Spotify", "Stranger Things",
+          "Parasite", "Attack on Titan", "Toy Story", "Survivor", "La Casa de las Flores"]
+COUNTRIES = ["Polonia", "Estados Unidos", "Japón", "México", "Corea del Sur", "Suecia"]
+PLATFORMS = ["PC", "PlayStation 5", "Xbox One", "Xbox Series X", "Nintendo Switch", "iOS", "Android"]
+CATEGORIES = ["Juegos", "Aplicaciones", "Series TV", "Película", "Anime", "Animado", "Telenovela", "Reality show"]
+FILLER = ("edición especial con contenido adicional, banda sonora original y soporte "
+          "para mods de la comunidad en todas las regiones").split()
+
+def generate_catalog_pages(pages: int, products_per_page: int = 4, seed: int = 0) -> List[List[str]]:
+    """Secciones de producto de cada página, con el formato de PDFUploader.downloadTemplate"""
+    rng = random.Random(seed)
+    catalog = []
+    for page in range(pages):
+        sections = []
+        for n in range(products_per_page):
+            year = rng.randint(1995, 2024)
+            sections.append("\n".join([
+                f"Producto: {rng.choice(TITLES)} {page * products_per_page + n} {year}",
+                f"Descripción: {' '.join(rng.sample(FILLER, 10))}",
+                f"País: {rng.choice(COUNTRIES)}",
+                f"Fecha: {year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                f"Plataformas: {', '.join(rng.sample(PLATFORMS, 3))}",
+                f"Categoría: {rng.choice(CATEGORIES)}",
+            ]))
+        catalog.append(sections)
+    return catalog
+
+def generate_catalog_text(pages: int, products_per_page: int = 4, seed: int = 0) -> str:
+    """Texto del catálogo como lo devolvería pdfplumber"""
+    page_texts = ["\n\n\n".join(sections) + "\n" for sections in generate_catalog_pages(pages, products_per_page, seed)]
+    return "\n\n\n".join(page_texts)
+
+def measure(processor, text: str, repeat: int) -> tuple:
+    """Mejor tiempo de extract_products_from_text en `repeat` pasadas y los productos extraídos"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        products = processor.extract_products_from_text(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings), products
+
+def run(pages: int, repeat: int, baseline: bool = False) -> dict:
+    processor = PDFProcessor()
+    text = generate_catalog_text(pages)
+    sections = processor._split_into_sections(text)
+
+    best, products = measure(processor, text, repeat)
+    result = {
+        "pages": pages,
+        "sections": len(sections),
+        "repeat": repeat,
+        "best_seconds": round(best, 4),
+        "sections_per_second": round(len(sections) / best, 1),
+    }
+    if baseline:
+        baseline_best, baseline_products = measure(BaselinePDFProcessor(), text, repeat)
+        result["baseline"] = {
+            "best_seconds": round(baseline_best, 4),
+            "sections_per_second": round(len(sections) / baseline_best, 1),
+        }
+        result["speedup"] = round(baseline_best / best, 2)
+        # Las optimizaciones no deben cambiar lo que se extrae
+        result["same_products"] = products == baseline_products
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", action="store_true",
+                        help="Mide también la extracción anterior y compara")
+    args = parser.parse_args()
+    print(json.dumps(run(args.pages, args.repeat, args.baseline)))
@@ -0,0 +1,90 @@
+"""
+Compara los backends de productos (PRODUCT_BACKEND) con la misma carga:
+importación por lotes, páginas por cursor, filtros por categoría, búsqueda
+y exportación completa. Mongo usa una base aparte (<DB_NAME>_bench);
+Supabase escribe en la tabla products del proyecto configurado
+(SUPABASE_URL/SUPABASE_KEY), así que debe ser uno de pruebas. Desde backend/:
+
+    python -m benchmarks.bench_product_backends --backends memory mongo --items 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.bench_json_serialization import generate_rows
+from database.product_repository import ProductRepository
+from models.Product import product_natural_key
+
+def _product(row: dict, n: int) -> dict:
+    """Fila generada como documento de Product, con categorías repartidas"""
+    doc = {k: v for k, v in row.items() if k not in ("_id", "natural_key")}
+    doc["categoria"] = ("juegos", "peliculas", "series", "apps")[n % 4]
+    return doc
+
+async def _repository(backend: str) -> ProductRepository:
+    if backend == "memory":
+        from database.memory_product_repository import MemoryProductRepository
+        return MemoryProductRepository()
+    if backend == "mongo":
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from database.indexes import ensure_indexes
+        from database.mongo_product_repository import MongoProductRepository
+        db = AsyncIOMotorClient(os.environ['MONGO_URL'])[f"{os.environ['DB_NAME']}_bench"]
+        await db.products.drop()
+        await ensure_indexes(db)
+        return MongoProductRepository(db)
+    if backend == "supabase":
+        from database.supabase_product_repository import SupabaseProductRepository
+        return SupabaseProductRepository()
+    raise ValueError(backend)
+
+async def _timed(results: dict, name: str, coro):
+    start = time.perf_counter()
+    value = await coro
+    results[name] = round(time.perf_counter() - start, 4)
+    return value
+
+async def _paginate(repo: ProductRepository, page_size: int, **filters) -> int:
+    total, position = 0, None
+    while True:
+        rows, position = await repo.list_products(limit=page_size, position=position, **filters)
+        total += len(rows)
+        if not position:
+            return total
+
+async def _count(iterator) -> int:
+    return sum([1 async for _ in iterator])
+
+async def run(backend: str, items: int, batch_size: int, page_size: int) -> dict:
+    repo = await _repository(backend)
+    docs = [_product(row, n) for n, row in enumerate(generate_rows(items))]
+    results = {"backend": backend, "items": items}
+
+    async def import_all():
+        for start in range(0, len(docs), batch_size):
+            await repo.bulk_upsert(docs[start:start + batch_size])
+
+    await _timed(results, "import_seconds", import_all())
+    # Reimportar el mismo lote: todo son actualizaciones por clave natural
+    await _timed(results, "reimport_batch_seconds", repo.bulk_upsert(docs[:batch_size]))
+    results["paginated_rows"] = await _timed(results, "paginate_seconds", _paginate(repo, page_size))
+    await _timed(results, "category_page_seconds", _paginate(repo, page_size, categoria="peliculas"))
+    await _timed(results, "fields_page_seconds", repo.list_products(limit=page_size, fields={"titulo"}))
+    await _timed(results, "search_seconds", repo.list_products(search="witcher", limit=page_size))
+    await _timed(results, "natural_keys_seconds", repo.find_by_natural_keys(
+        [product_natural_key(d["titulo"], d["categoria"], d["subcategoria"]) for d in docs[:batch_size]]
+    ))
+    results["exported_rows"] = await _timed(results, "export_seconds", _count(repo.iter_products()))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["memory"], choices=["memory", "mongo", "supabase"])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+    for backend in args.backends:
+        print(json.dumps(asyncio.run(run(backend, args.items, args.batch_size, args.page_size))))
@@ -0,0 +1,144 @@
+"""
+Catálogos de proveedor sintéticos con el formato de la plantilla de
+PDFUploader (Producto:/Descripción:/País:/Fecha:/Plataformas:/Categoría:) y
+la verdad de referencia de cada producto, para medir la precisión del
+parser de PDF.
+
+Con `noise` (0 a 1) aparecen los defectos de los catálogos reales, cada uno
+con esa probabilidad por producto: etiquetas alternativas, fechas en otros
+formatos, descripciones en varias líneas, campos que faltan y cabeceras de
+página que caen en medio de un producto.
+"""
+import random
+from typing import List, Optional, Tuple
+
+from benchmarks.pdf_fixtures import FONT_SIZE, LEADING, MARGIN, PAGE_HEIGHT, PRODUCT_SEPARATOR, build_pdf
+
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+WRAP_CHARS = 80 * 10 // FONT_SIZE
+
+NAMES = ["Cyberpunk", "The Witcher", "Halo Infinite", "Forza Horizon", "Spotify", "Stranger Things",
+         "Parásito", "Attack on Titan", "Toy Story", "Survivor", "La Casa de las Flores", "Adobe Photoshop"]
+COUNTRIES = ["Polonia", "Estados Unidos", "Japón", "México", "Corea del Sur", "Suecia", "Francia"]
+PLATFORMS = ["PC", "PlayStation 5", "Xbox One", "Xbox Series X", "Nintendo Switch", "iOS", "Android",
+             "Windows", "macOS"]
+# (texto de la categoría en el PDF, categoría, subcategoría esperadas)
+CATEGORIES = [
+    ("Juegos", "juegos", "pc"),
+    ("Juego de Xbox One", "juegos", "xboxOne"),
+    ("Juego de Xbox Series", "juegos", "xboxSeries"),
+    ("Aplicaciones", "aplicaciones", "android"),
+    ("Aplicación para iPhone", "aplicaciones", "apple"),
+    ("Series TV", "seriesTV", None),
+    ("Película", "peliculas", None),
+    ("Anime", "animes", None),
+    ("Telenovela", "telenovelas", None),
+    ("Reality show", "realitys", None),
+]
+FILLER = ("edición especial con contenido adicional banda sonora original y soporte para mods de la "
+          "comunidad en todas las regiones con doblaje subtítulos y escenas extendidas").split()
+
+# Etiquetas de la plantilla y alternativas que aparecen en catálogos reales
+LABELS = {
+    "titulo": ["Producto", "Título", "Nombre", "Title"],
+    "descripcion": ["Descripción", "Resumen", "Sinopsis", "Description"],
+    "pais": ["País", "Procedencia", "Country", "Origen"],
+    "fecha": ["Fecha", "Lanzamiento", "Release", "Año"],
+    "plataformas": ["Plataformas", "Platforms", "Disponible en"],
+    "categoria": ["Categoría", "Tipo"],
+}
+
+# Valores que el parser asigna cuando falta un campo
+DEFAULT_PAIS = "No especificado"
+DEFAULT_FECHA = "2024-01-01"
+
+def _label(rng: random.Random, field: str, noise: float) -> str:
+    labels = LABELS[field]
+    label = rng.choice(labels[1:]) if rng.random() < noise else labels[0]
+    return label.upper() if rng.random() < noise / 4 else label
+
+def _wrap(text: str) -> List[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > WRAP_CHARS:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    return lines + [current] if current else lines
+
+def generate_product(rng: random.Random, index: int, noise: float) -> Tuple[List[str], dict]:
+    """Líneas de un producto en el PDF y su verdad de referencia"""
+    year, month, day = rng.randint(1995, 2024), rng.randint(1, 12), rng.randint(1, 28)
+    category_text, categoria, subcategoria = rng.choice(CATEGORIES)
+    # El número fijo de 5 cifras hace único el título sin que uno contenga a otro
+    titulo = f"{rng.choice(NAMES)} {index:05d}"
+    long_description = rng.random() < noise
+    descripcion = " ".join(rng.sample(FILLER, 24 if long_description else 10))
+    pais: Optional[str] = rng.choice(COUNTRIES)
+    plataformas = rng.sample(PLATFORMS, rng.randint(1, 3))
+
+    date_style = rng.random() < noise and rng.choice(("dmy", "year"))
+    if date_style == "dmy":
+        fecha_text, fecha = f"{day:02d}/{month:02d}/{year}", f"{year}-{month:02d}-{day:02d}"
+    elif date_style == "year":
+        fecha_text, fecha = str(year), f"{year}-01-01"
+    else:
+        fecha_text, fecha = f"{year}-{month:02d}-{day:02d}", f"{year}-{month:02d}-{day:02d}"
+
+    lines = [f"{_label(rng, 'titulo', noise)}: {titulo}"]
+    description_lines = _wrap(descripcion) if long_description else [descripcion]
+    lines.append(f"{_label(rng, 'descripcion', noise)}: {description_lines[0]}")
+    lines.extend(description_lines[1:])
+    if rng.random() < noise / 2:
+        pais = None
+    else:
+        lines.append(f"{_label(rng, 'pais', noise)}: {pais}")
+    lines.append(f"{_label(rng, 'fecha', noise)}: {fecha_text}")
+    if rng.random() < noise / 2:
+        plataformas = []
+    else:
+        lines.append(f"{_label(rng, 'plataformas', noise)}: {', '.join(plataformas)}")
+    lines.append(f"{_label(rng, 'categoria', noise)}: {category_text}")
+
+    truth = {
+        "titulo": titulo,
+        "descripcion": descripcion,
+        "pais": pais or DEFAULT_PAIS,
+        "fecha_lanzamiento": fecha,
+        "plataformas": sorted(plataformas),
+        "categoria": categoria,
+        "subcategoria": subcategoria,
+    }
+    return lines, truth
+
+def generate_catalog(pages: int, noise: float = 0.0, seed: int = 0) -> Tuple[List[List[str]], List[dict]]:
+    """
+    Líneas de cada página y verdad de referencia de un catálogo de `pages`
+    páginas. Los productos fluyen de una página a la siguiente como en un
+    catálogo real, así que algunos quedan partidos entre dos páginas.
+    """
+    rng = random.Random(seed)
+    page_lines: List[List[str]] = [[]]
+    truth: List[dict] = []
+
+    def add_line(line: str):
+        if len(page_lines[-1]) >= LINES_PER_PAGE:
+            page_lines.append([])
+            # Cabecera de página, que puede caer en medio de un producto
+            if rng.random() < noise:
+                page_lines[-1].append(f"Catálogo de proveedor - página {len(page_lines)}")
+        page_lines[-1].append(line)
+
+    while True:
+        lines, product = generate_product(rng, len(truth), noise)
+        if len(page_lines) == pages and len(page_lines[-1]) + len(lines) + 1 > LINES_PER_PAGE:
+            break
+        for line in lines + [PRODUCT_SEPARATOR]:
+            add_line(line)
+        truth.append(product)
+    return page_lines, truth
+
+def catalog_pdf_with_truth(pages: int, noise: float = 0.0, seed: int = 0) -> Tuple[bytes, List[dict]]:
+    page_lines, truth = generate_catalog(pages, noise, seed)
+    return build_pdf(page_lines), truth
@@ -0,0 +1,71 @@
+"""
+PDF sintéticos para los benchmarks, escritos a mano (sin dependencias): una
+fuente Helvetica estándar con WinAnsiEncoding, así pdfplumber devuelve el
+texto con acentos tal como se escribió.
+"""
+from typing import List
+
+from benchmarks.bench_pdf_extraction import generate_catalog_pages
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 en puntos
+MARGIN = 50
+FONT_SIZE = 10
+LEADING = 14
+# Separador entre productos: pdfplumber no conserva las líneas en blanco,
+# así que se usa la otra forma de SECTION_SEPARATOR (una línea de guiones)
+PRODUCT_SEPARATOR = "----------"
+
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+def _content_stream(lines: List[str]) -> bytes:
+    parts = [b"BT", f"/F1 {FONT_SIZE} Tf {LEADING} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td".encode()]
+    for line in lines:
+        parts.append(_pdf_string(line) + b" Tj T*")
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """Un PDF con una página por lista de líneas"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # el árbol de páginas se completa cuando se conocen sus números
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for lines in pages:
+        stream = _content_stream(lines)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        ).encode())
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(page_refs)} >>".encode()
+    return write_pdf(objects)
+
+def write_pdf(objects: List[bytes]) -> bytes:
+    """Archivo PDF con los objetos numerados desde 1 (el 1 es el catálogo) y su tabla xref"""
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+def catalog_pdf(pages: int, products_per_page: int = 4, seed: int = 0) -> bytes:
+    """Catálogo sintético (el de bench_pdf_extraction) como PDF"""
+    pdf_pages = []
+    for sections in generate_catalog_pages(pages, products_per_page, seed):
+        lines = []
+        for section in sections:
+            lines.extend(section.split("\n"))
+            lines.append(PRODUCT_SEPARATOR)
+        pdf_pages.append(lines)
+    return build_pdf(pdf_pages)
@@ -0,0 +1,172 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+from typing import Optional
+
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from PIL import Image, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+
+from database.product_repository import ProductRepository
+
+logger = logging.getLogger(__name__)
+
+# Anchos (px) de las miniaturas WebP generadas al subir cada imagen
+THUMBNAIL_WIDTHS = tuple(
+    int(w) for w in os.environ.get('IMAGE_THUMBNAIL_WIDTHS', '200,400,800').split(',') if w.strip()
+)
+MAX_IMAGE_BYTES = int(os.environ.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+WEBP_QUALITY = 80
+
+IMAGE_URL_PREFIX = "/api/images/"
+
+class InvalidImageError(ValueError):
+    """El contenido recibido no es una imagen válida"""
+
+def _bucket(db: AsyncIOMotorDatabase) -> AsyncIOMotorGridFSBucket:
+    return AsyncIOMotorGridFSBucket(db, bucket_name="images")
+
+def variant_name(digest: str, width: Optional[int] = None) -> str:
+    """Nombre del archivo en GridFS: el hash para el original, hash/wNNN para miniaturas"""
+    return digest if width is None else f"{digest}/w{width}"
+
+def image_url(digest: str) -> str:
+    return f"{IMAGE_URL_PREFIX}{digest}"
+
+def _render_thumbnails(data: bytes) -> tuple:
+    """Valida la imagen y genera las miniaturas WebP (se ejecuta en un hilo)"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            content_type = Image.MIME.get(image.format, "application/octet-stream")
+            image.load()
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+            thumbnails = {}
+            for width in THUMBNAIL_WIDTHS:
+                # No se generan miniaturas más grandes que el original
+                if width >= image.width:
+                    continue
+                height = max(1, round(image.height * width / image.width))
+                buffer = io.BytesIO()
+                image.resize((width, height), Image.LANCZOS).save(buffer, "WEBP", quality=WEBP_QUALITY)
+                thumbnails[width] = buffer.getvalue()
+            return content_type, thumbnails
+    except Image.DecompressionBombError:
+        # Pocos bytes que se descomprimen en una imagen enorme (más del doble de Image.MAX_IMAGE_PIXELS)
+        raise InvalidImageError("La imagen tiene demasiados píxeles")
+    except (UnidentifiedImageError, OSError) as e:
+        raise InvalidImageError(str(e))
+
+async def store_image(db: AsyncIOMotorDatabase, data: bytes) -> dict:
+    """
+    Guarda una imagen por su SHA-256 junto con sus miniaturas.
+
+    Si el hash ya existe no se vuelve a subir nada, así que subir la misma
+    imagen varias veces es gratis.
+    """
+    if len(data) > MAX_IMAGE_BYTES:
+        raise InvalidImageError("La imagen es demasiado grande")
+
+    digest = hashlib.sha256(data).hexdigest()
+    existing = await db["images.files"].find_one({"filename": digest}, {"metadata": 1})
+    if existing:
+        return {"id": digest, "url": image_url(digest), "widths": existing["metadata"]["widths"]}
+
+    content_type, thumbnails = await run_in_threadpool(_render_thumbnails, data)
+    bucket = _bucket(db)
+    for width, thumbnail in thumbnails.items():
+        await bucket.upload_from_stream(
+            variant_name(digest, width), thumbnail,
+            metadata={"sha256": digest, "content_type": "image/webp", "width": width}
+        )
+    # El original se sube al final: su presencia indica que la imagen está completa
+    widths = sorted(thumbnails)
+    await bucket.upload_from_stream(
+        digest, data,
+        metadata={"sha256": digest, "content_type": content_type, "widths": widths}
+    )
+    return {"id": digest, "url": image_url(digest), "widths": widths}
+
+async def open_image(db: AsyncIOMotorDatabase, digest: str, width: Optional[int] = None):
+    """
+    Abre el original o la miniatura más pequeña que tenga al menos `width` px.
+    Devuelve (nombre de la variante, GridOut) o (None, None) si no existe.
+    """
+    bucket = _bucket(db)
+    try:
+        original = await bucket.open_download_stream_by_name(digest)
+    except NoFile:
+        return None, None
+    if width is None:
+        return digest, original
+
+    candidates = [w for w in original.metadata.get("widths", []) if w >= width]
+    if not candidates:
+        return digest, original
+    name = variant_name(digest, min(candidates))
+    try:
+        return name, await bucket.open_download_stream_by_name(name)
+    except NoFile:
+        return digest, original
+
+def decode_data_url(value: str) -> Optional[bytes]:
+    """Devuelve los bytes de un data URL de imagen en base64, o None si no lo es"""
+    if not value or not value.startswith("data:image/"):
+        return None
+    header, _, payload = value.partition(",")
+    if not header.endswith(";base64"):
+        return None
+    try:
+        return base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+async def externalize_data_url(db: AsyncIOMotorDatabase, value: str) -> str:
+    """Si `value` es un data URL lo guarda en el almacén y devuelve su URL corta"""
+    data = decode_data_url(value)
+    if data is None:
+        return value
+    stored = await store_image(db, data)
+    return stored["url"]
+
+async def migrate_base64_images(db: AsyncIOMotorDatabase, repo: ProductRepository) -> dict:
+    """
+    Convierte los data URL guardados en la imagen de los productos (a través
+    del repositorio configurado, sea cual sea el backend) y en site_config.value
+    """
+    result = {"products": 0, "config": 0, "failed": 0}
+
+    async for product in repo.iter_products():
+        value = product.get("imagen")
+        if not value or not value.startswith("data:image/"):
+            continue
+        try:
+            url = await externalize_data_url(db, value)
+        except InvalidImageError as e:
+            logger.error(f"Error migrating image in products {product['id']}: {str(e)}")
+            result["failed"] += 1
+            continue
+        if url != value:
+            # update_product da al producto un change_seq nuevo: los clientes
+            # que sincronizan por cambios ven la nueva URL
+            if await repo.update_product(product["id"], {"imagen": url}):
+                result["products"] += 1
+
+    cursor = db.site_config.find({"value": {"$regex": "^data:image/"}}, {"_id": 1, "value": 1})
+    async for doc in cursor:
+        try:
+            url = await externalize_data_url(db, doc["value"])
+        except InvalidImageError as e:
+            logger.error(f"Error migrating image in site_config {doc['_id']}: {str(e)}")
+            result["failed"] += 1
+            continue
+        if url != doc["value"]:
+            await db.site_config.update_one({"_id": doc["_id"]}, {"$set": {"value": url}})
+            result["config"] += 1
+
+    return result
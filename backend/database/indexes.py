@@ -0,0 +1,255 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from database.mongo_product_repository import TOMBSTONE_COLLECTION, reserve_change_seqs
+from database.product_repository import TOMBSTONE_RETENTION_DAYS
+from models.Product import product_natural_key
+from services.pdf_cache import DOCUMENT_COLLECTION, PAGE_COLLECTION, PDF_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Índice de texto completo del catálogo. Con text index v3 MongoDB ignora
+# acentos y mayúsculas, y default_language aplica el stemming en español.
+PRODUCTS_TEXT_INDEX = {
+    "keys": [("titulo", "text"), ("descripcion", "text"), ("pais", "text"), ("plataformas", "text")],
+    "name": "products_text",
+    "default_language": "spanish",
+    # Los productos no tienen campo de idioma; evita que "language" lo cambie
+    "language_override": "idioma",
+    "weights": {"titulo": 10, "plataformas": 4, "pais": 2, "descripcion": 1},
+}
+
+# Índices declarados por colección
+INDEXES = {
+    "products": [
+        # Búsqueda por id en get, update y delete
+        {"keys": [("id", 1)], "name": "products_id", "unique": True},
+        # Listado por categoría/subcategoría en el orden de la paginación
+        {"keys": [("categoria", 1), ("subcategoria", 1), ("created_at", -1), ("id", -1)],
+         "name": "products_category_created"},
+        # Listado sin filtros, paginación por clave y agrupación del bootstrap
+        {"keys": [("created_at", -1), ("id", -1)], "name": "products_created"},
+        # Secuencia de cambios para /products/changes
+        {"keys": [("change_seq", 1)], "name": "products_change_seq"},
+        PRODUCTS_TEXT_INDEX,
+        # Clave natural para importar sin duplicados; los documentos antiguos
+        # que no la tienen quedan fuera del índice
+        {"keys": [("natural_key", 1)], "name": "products_natural_key", "unique": True,
+         "partialFilterExpression": {"natural_key": {"$exists": True}}},
+    ],
+    TOMBSTONE_COLLECTION: [
+        {"keys": [("change_seq", 1)], "name": "product_tombstones_seq"},
+        {"keys": [("deleted_at", 1)], "name": "product_tombstones_ttl",
+         "expireAfterSeconds": TOMBSTONE_RETENTION_DAYS * 86400},
+    ],
+    "site_config": [
+        {"keys": [("key", 1)], "name": "site_config_key", "unique": True},
+    ],
+    # La caché de importación de PDF caduca por tiempo sin uso
+    DOCUMENT_COLLECTION: [
+        {"keys": [("last_used_at", 1)], "name": "pdf_cache_ttl", "expireAfterSeconds": PDF_CACHE_TTL},
+    ],
+    PAGE_COLLECTION: [
+        {"keys": [("last_used_at", 1)], "name": "pdf_page_cache_ttl", "expireAfterSeconds": PDF_CACHE_TTL},
+    ],
+}
+
+# Productos antiguos sin clave natural que se listan en GET /admin/indexes
+LEGACY_DUPLICATES_LIMIT = 100
+
+def _legacy_key(doc: dict) -> str:
+    return product_natural_key(doc.get("titulo", ""), doc.get("categoria", ""), doc.get("subcategoria"))
+
+async def _key_owners(db: AsyncIOMotorDatabase, keys) -> Dict[str, dict]:
+    """Producto que tiene cada clave natural: {"id", "titulo"}"""
+    owners = {}
+    projection = {"_id": 0, "natural_key": 1, "id": 1, "titulo": 1}
+    async for doc in db.products.find({"natural_key": {"$in": list(keys)}}, projection):
+        owners[doc["natural_key"]] = {"id": doc.get("id"), "titulo": doc.get("titulo")}
+    return owners
+
+def _duplicate(doc: dict, owner: dict) -> dict:
+    return {"id": doc.get("id"), "titulo": doc.get("titulo"), "duplicate_of": owner}
+
+async def backfill_natural_keys(db: AsyncIOMotorDatabase, batch_size: int = 1000) -> List[dict]:
+    """
+    Asigna natural_key a los productos creados antes de que existiera. Si dos
+    productos antiguos comparten clave, solo el más antiguo la recibe para no
+    romper el índice único; los demás se devuelven (y se registran) con el
+    producto que tiene su clave, para fusionarlos o corregirlos a mano.
+    """
+    # Lo habitual es que no quede ninguno: una consulta y listo
+    if not await db.products.find_one({"natural_key": {"$exists": False}}, {"_id": 1}):
+        return []
+
+    duplicates = []
+    cursor = db.products.find(
+        {"natural_key": {"$exists": False}},
+        {"id": 1, "titulo": 1, "categoria": 1, "subcategoria": 1}
+    ).sort("created_at", 1).batch_size(batch_size)
+    batch = []
+
+    async def assign(docs: List[dict]):
+        # Los productos de los lotes anteriores ya tienen su clave en la base
+        owners = await _key_owners(db, {_legacy_key(doc) for doc in docs})
+        ops = []
+        for doc in docs:
+            key = _legacy_key(doc)
+            if key in owners:
+                duplicates.append(_duplicate(doc, owners[key]))
+                continue
+            owners[key] = {"id": doc.get("id"), "titulo": doc.get("titulo")}
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"natural_key": key}}))
+        if ops:
+            await db.products.bulk_write(ops, ordered=False)
+
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await assign(batch)
+            batch = []
+    if batch:
+        await assign(batch)
+
+    for duplicate in duplicates:
+        logger.warning(
+            f"Legacy product {duplicate['id']} shares its natural key with {duplicate['duplicate_of']['id']} "
+            f"and was left without one"
+        )
+    return duplicates
+
+async def legacy_duplicates(db: AsyncIOMotorDatabase, limit: int = LEGACY_DUPLICATES_LIMIT) -> dict:
+    """
+    Productos que siguen sin natural_key porque otro producto ya tiene su
+    clave (ver backfill_natural_keys), con ese otro producto en `duplicate_of`
+    """
+    count = await db.products.count_documents({"natural_key": {"$exists": False}})
+    docs = [doc async for doc in db.products.find(
+        {"natural_key": {"$exists": False}},
+        {"_id": 0, "id": 1, "titulo": 1, "categoria": 1, "subcategoria": 1}
+    ).sort("created_at", 1).limit(limit)]
+    owners = await _key_owners(db, {_legacy_key(doc) for doc in docs}) if docs else {}
+    return {
+        "count": count,
+        "products": [_duplicate(doc, owners.get(_legacy_key(doc))) for doc in docs],
+    }
+
+async def backfill_change_seqs(db: AsyncIOMotorDatabase, batch_size: int = 1000):
+    """Da un change_seq a los productos creados antes de la sincronización incremental"""
+    ids = [doc["_id"] async for doc in db.products.find(
+        {"change_seq": {"$exists": False}}, {"_id": 1}
+    ).sort("created_at", 1)]
+    if not ids:
+        return
+    first_seq = await reserve_change_seqs(db, len(ids))
+    changed_at = datetime.utcnow()
+    for start in range(0, len(ids), batch_size):
+        await db.products.bulk_write([
+            UpdateOne({"_id": _id}, {"$set": {"change_seq": first_seq + start + offset, "changed_at": changed_at}})
+            for offset, _id in enumerate(ids[start:start + batch_size])
+        ], ordered=False)
+    logger.info(f"Assigned change sequence numbers to {len(ids)} products")
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    """Crea los índices necesarios si no existen (operación idempotente)"""
+    try:
+        await backfill_natural_keys(db)
+    except Exception as e:
+        logger.error(f"Error backfilling product natural keys: {str(e)}")
+    try:
+        await backfill_change_seqs(db)
+    except Exception as e:
+        logger.error(f"Error backfilling product change sequence: {str(e)}")
+
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            spec = dict(index)
+            keys = spec.pop("keys")
+            try:
+                await db[collection].create_index(keys, **spec)
+            except Exception as e:
+                # No impedir el arranque si el índice no se puede crear
+                logger.error(f"Error creating index {spec['name']}: {str(e)}")
+
+# Consultas habituales de las rutas, como comandos find para explain
+PRODUCT_SORT = {"created_at": -1, "id": -1}
+_SAMPLE_DATE = datetime(2024, 1, 1)
+STANDARD_QUERIES = {
+    "products_page": {"find": "products", "filter": {}, "sort": PRODUCT_SORT, "limit": 21},
+    "products_next_page": {"find": "products", "filter": {"$or": [
+        {"created_at": {"$lt": _SAMPLE_DATE}},
+        {"created_at": _SAMPLE_DATE, "id": {"$lt": "ffffffff"}},
+    ]}, "sort": PRODUCT_SORT, "limit": 21},
+    "products_category": {"find": "products", "filter": {"categoria": "juegos"}, "sort": PRODUCT_SORT, "limit": 21},
+    "products_subcategory": {"find": "products", "filter": {"categoria": "juegos", "subcategoria": "pc"},
+                             "sort": PRODUCT_SORT, "limit": 21},
+    "products_search": {"find": "products", "filter": {"$text": {"$search": "juego"}},
+                        "sort": {"score": {"$meta": "textScore"}, **PRODUCT_SORT}, "limit": 21},
+    "product_by_id": {"find": "products", "filter": {"id": "00000000"}, "limit": 1},
+    "products_by_natural_key": {"find": "products", "filter": {"natural_key": {"$in": ["|juegos|pc"]}}},
+    "products_changes": {"find": "products", "filter": {"change_seq": {"$gt": 0}}, "sort": {"change_seq": 1},
+                         "limit": 501},
+    "site_config_by_key": {"find": "site_config", "filter": {"key": "logo"}, "limit": 1},
+}
+
+def _find_query_planner(explain: dict) -> Optional[dict]:
+    """queryPlanner de la respuesta de explain, esté donde esté (find, agregación, sharding)"""
+    if "queryPlanner" in explain:
+        return explain["queryPlanner"]
+    for value in explain.values():
+        children = value if isinstance(value, list) else [value]
+        for child in children:
+            if isinstance(child, dict):
+                found = _find_query_planner(child)
+                if found:
+                    return found
+    return None
+
+def _plan_stages(plan: dict) -> List[Tuple[str, Optional[str]]]:
+    """Etapas del plan ganador con el índice que usa cada una"""
+    # Con el motor SBE (MongoDB 7+) el plan clásico va dentro de queryPlan
+    plan = plan.get("queryPlan", plan)
+    stages = [(plan.get("stage", ""), plan.get("indexName"))]
+    children = plan.get("inputStages") or ([plan["inputStage"]] if "inputStage" in plan else [])
+    for child in children:
+        stages.extend(_plan_stages(child))
+    return stages
+
+def summarize_explain(name: str, collection: str, explain: dict) -> dict:
+    planner = _find_query_planner(explain) or {}
+    stages = _plan_stages(planner.get("winningPlan", {}))
+    return {
+        "query": name,
+        "collection": collection,
+        "stages": [stage for stage, _ in stages],
+        "indexes": sorted({index for _, index in stages if index}),
+        "collscan": any(stage == "COLLSCAN" for stage, _ in stages),
+        # SORT es un ordenamiento en memoria: el índice no cubre el orden
+        "in_memory_sort": any(stage == "SORT" for stage, _ in stages),
+    }
+
+async def explain_standard_queries(db: AsyncIOMotorDatabase) -> List[dict]:
+    """Plan de cada consulta de STANDARD_QUERIES, marcando las que recorren la colección"""
+    results = []
+    for name, command in STANDARD_QUERIES.items():
+        try:
+            explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+            results.append(summarize_explain(name, command["find"], explain))
+        except Exception as e:
+            logger.error(f"Error explaining query {name}: {str(e)}")
+            results.append({"query": name, "collection": command["find"], "error": str(e)})
+    return results
+
+async def index_status(db: AsyncIOMotorDatabase) -> Dict[str, dict]:
+    """Índices declarados en INDEXES y los que faltan en la base de datos"""
+    status = {}
+    for collection, indexes in INDEXES.items():
+        existing = {index["name"] async for index in db[collection].list_indexes()}
+        declared = [index["name"] for index in indexes]
+        status[collection] = {
+            "declared": declared,
+            "missing": [name for name in declared if name not in existing],
+        }
+    return status
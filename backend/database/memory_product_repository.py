@@ -0,0 +1,225 @@
+import bisect
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from database.indexes import PRODUCTS_TEXT_INDEX
+from database.product_repository import (
+    IMPORT_INSERT_ONLY, INTERNAL_FIELDS, TOMBSTONE_RETENTION_DAYS, DuplicateProductError, ProductRepository,
+    merge_changes, position_timestamp, select_fields, with_natural_key
+)
+
+# Pesos de búsqueda: los mismos que el índice de texto de MongoDB
+SEARCH_WEIGHTS = PRODUCTS_TEXT_INDEX["weights"]
+
+def _tokens(value) -> Set[str]:
+    """Palabras sin acentos ni mayúsculas (como el índice de texto v3)"""
+    if isinstance(value, list):
+        value = " ".join(str(v) for v in value)
+    normalized = unicodedata.normalize('NFKD', str(value or "").casefold())
+    normalized = ''.join(c if c.isalnum() else ' ' for c in normalized if not unicodedata.combining(c))
+    return set(normalized.split())
+
+def _naive_utc(value):
+    """Fechas como las guarda Motor: UTC sin zona horaria"""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+class MemoryProductRepository(ProductRepository):
+    """
+    Productos en memoria del proceso, con los mismos índices que las bases
+    de datos: orden (created_at, id), clave natural, categoría y palabras.
+    Pensado para desarrollo, pruebas y comparar backends; no persiste.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.products: Dict[str, dict] = {}
+        self.by_natural_key: Dict[str, str] = {}
+        self.by_category: Dict[Tuple[str, Optional[str]], Set[str]] = {}
+        self.by_token: Dict[str, Set[str]] = {}
+        # (created_at, id) ascendente; las listas se recorren al revés
+        self.order: List[tuple] = []
+        # Secuencia de cambios: (change_seq, id) ascendente y marcas de borrado
+        self.change_seq = 0
+        self.changes: List[Tuple[int, str]] = []
+        self.tombstones: List[dict] = []
+
+    def _next_change(self) -> Tuple[int, datetime]:
+        self.change_seq += 1
+        return self.change_seq, datetime.utcnow()
+
+    def _index(self, doc: dict):
+        product_id = doc["id"]
+        self.products[product_id] = doc
+        self.by_natural_key[doc["natural_key"]] = product_id
+        self.by_category.setdefault((doc["categoria"], doc.get("subcategoria")), set()).add(product_id)
+        for field in SEARCH_WEIGHTS:
+            for token in _tokens(doc.get(field)):
+                self.by_token.setdefault(token, set()).add(product_id)
+        bisect.insort(self.order, (doc["created_at"], product_id))
+        # Cada escritura pasa por aquí: el producto recibe la siguiente secuencia
+        doc["change_seq"], doc["changed_at"] = self._next_change()
+        self.changes.append((doc["change_seq"], product_id))
+
+    def _unindex(self, product_id: str) -> dict:
+        doc = self.products.pop(product_id)
+        del self.by_natural_key[doc["natural_key"]]
+        self.by_category[(doc["categoria"], doc.get("subcategoria"))].discard(product_id)
+        for field in SEARCH_WEIGHTS:
+            for token in _tokens(doc.get(field)):
+                self.by_token[token].discard(product_id)
+        position = bisect.bisect_left(self.order, (doc["created_at"], product_id))
+        del self.order[position]
+        del self.changes[bisect.bisect_left(self.changes, (doc["change_seq"], product_id))]
+        return doc
+
+    def _prepare(self, doc: dict) -> dict:
+        doc = with_natural_key(dict(doc))
+        doc["created_at"] = _naive_utc(doc["created_at"])
+        doc["updated_at"] = _naive_utc(doc.get("updated_at"))
+        return doc
+
+    @staticmethod
+    def _public(doc: dict) -> dict:
+        return {k: v for k, v in doc.items() if k not in INTERNAL_FIELDS}
+
+    def _category_ids(self, categoria: Optional[str], subcategoria: Optional[str]) -> Optional[Set[str]]:
+        """Ids que pasan los filtros de categoría, o None si no hay filtros"""
+        if not categoria and not subcategoria:
+            return None
+        ids = set()
+        for (cat, sub), members in self.by_category.items():
+            if (not categoria or cat == categoria) and (not subcategoria or sub == subcategoria):
+                ids |= members
+        return ids
+
+    def _search_scores(self, search: str) -> Dict[str, float]:
+        """Relevancia por producto: cualquier palabra coincide, ponderada por campo"""
+        scores: Dict[str, float] = {}
+        for token in _tokens(search):
+            for product_id in self.by_token.get(token, ()):
+                doc = self.products[product_id]
+                scores[product_id] = scores.get(product_id, 0) + sum(
+                    weight for field, weight in SEARCH_WEIGHTS.items() if token in _tokens(doc.get(field))
+                )
+        return scores
+
+    async def list_products(self, categoria: Optional[str] = None, subcategoria: Optional[str] = None,
+                            search: Optional[str] = None, limit: Optional[int] = None,
+                            position: Optional[dict] = None,
+                            fields: Optional[Set[str]] = None) -> Tuple[List[dict], Optional[dict]]:
+        allowed = self._category_ids(categoria, subcategoria)
+        wanted = limit + 1 if limit else None
+        offset = 0
+        if search:
+            scores = self._search_scores(search)
+            ids = [i for i in scores if allowed is None or i in allowed]
+            ids.sort(key=lambda i: (scores[i], self.products[i]["created_at"], i), reverse=True)
+            if position and "o" in position:
+                offset = position["o"]
+            ids = ids[offset:offset + wanted] if wanted else ids[offset:]
+        else:
+            end = len(self.order)
+            if position and "c" in position:
+                # Paginación por clave: todo lo anterior a (created_at, id)
+                created = _naive_utc(position_timestamp(position["c"]))
+                end = bisect.bisect_left(self.order, (created, position["i"]))
+            ids = []
+            # Recorrido descendente del índice hasta llenar la página
+            for index in range(end - 1, -1, -1):
+                product_id = self.order[index][1]
+                if allowed is None or product_id in allowed:
+                    ids.append(product_id)
+                    if wanted and len(ids) == wanted:
+                        break
+
+        rows = [self._public(self.products[i]) for i in ids]
+
+        next_position = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            if search:
+                next_position = {"o": offset + limit}
+            else:
+                next_position = {"c": rows[-1]["created_at"].isoformat(), "i": rows[-1]["id"]}
+
+        if fields is not None:
+            rows = [select_fields(row, fields) for row in rows]
+        return rows, next_position
+
+    async def get_product(self, product_id: str) -> Optional[dict]:
+        doc = self.products.get(product_id)
+        return self._public(doc) if doc else None
+
+    async def create_product(self, doc: dict) -> dict:
+        doc = self._prepare(doc)
+        if doc["natural_key"] in self.by_natural_key:
+            raise DuplicateProductError()
+        self._index(doc)
+        return self._public(doc)
+
+    async def update_product(self, product_id: str, changes: dict) -> Optional[dict]:
+        existing = self.products.get(product_id)
+        if not existing:
+            return None
+        updated = self._prepare({**existing, **changes})
+        owner = self.by_natural_key.get(updated["natural_key"])
+        if owner is not None and owner != product_id:
+            raise DuplicateProductError()
+        self._unindex(product_id)
+        self._index(updated)
+        return self._public(updated)
+
+    async def delete_product(self, product_id: str) -> bool:
+        if product_id not in self.products:
+            return False
+        self._unindex(product_id)
+        change_seq, deleted_at = self._next_change()
+        self.tombstones.append({"id": product_id, "change_seq": change_seq, "deleted_at": deleted_at})
+        # Las marcas más antiguas que la retención caducan (como el TTL de Mongo)
+        expired = deleted_at - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+        while self.tombstones[0]["deleted_at"] < expired:
+            self.tombstones.pop(0)
+        return True
+
+    async def find_by_natural_keys(self, keys: Iterable[str]) -> Dict[str, dict]:
+        return {
+            key: self._public(self.products[self.by_natural_key[key]])
+            for key in keys if key in self.by_natural_key
+        }
+
+    async def bulk_upsert(self, docs: List[dict], insert_only: Sequence[str] = IMPORT_INSERT_ONLY) -> List[str]:
+        statuses = []
+        for doc in docs:
+            doc = self._prepare(doc)
+            existing_id = self.by_natural_key.get(doc["natural_key"])
+            if existing_id is None:
+                if doc["id"] in self.products:
+                    # El id ya pertenece a otro producto (índice único en las bases de datos)
+                    statuses.append("failed")
+                    continue
+                self._index(doc)
+                statuses.append("created")
+            else:
+                existing = self._unindex(existing_id)
+                self._index({**doc, **{k: existing[k] for k in insert_only if k in existing}})
+                statuses.append("updated")
+        return statuses
+
+    async def iter_products(self, categoria: Optional[str] = None,
+                            subcategoria: Optional[str] = None) -> AsyncIterator[dict]:
+        allowed = self._category_ids(categoria, subcategoria)
+        # Copia de los ids: el catálogo puede cambiar mientras se recorre
+        for product_id in list(self.products):
+            doc = self.products.get(product_id)
+            if doc and (allowed is None or product_id in allowed):
+                yield self._public(doc)
+
+    async def list_changes(self, since: int, limit: int) -> List[dict]:
+        start = bisect.bisect_left(self.changes, (since + 1,))
+        products = [self.products[product_id] for _, product_id in self.changes[start:start + limit]]
+        first_tombstone = bisect.bisect_left(self.tombstones, since + 1, key=lambda t: t["change_seq"])
+        return merge_changes(products, self.tombstones[first_tombstone:first_tombstone + limit], limit)
@@ -0,0 +1,262 @@
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from database.product_repository import (
+    IMPORT_INSERT_ONLY, INTERNAL_FIELDS, DuplicateProductError, ProductRepository, merge_changes,
+    position_timestamp, with_natural_key
+)
+from models.Product import product_natural_key
+from services.catalog_version import META_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+# Documentos por lote al recorrer el catálogo completo
+ITER_BATCH_SIZE = 1000
+NATURAL_KEY_FIELDS = {"titulo", "categoria", "subcategoria"}
+# Producto tal como se publica, sin los campos internos
+PUBLIC_PROJECTION = {"_id": 0, **{field: 0 for field in INTERNAL_FIELDS}}
+# Marcas de borrado para /products/changes (caducan con un índice TTL)
+TOMBSTONE_COLLECTION = "product_tombstones"
+CHANGE_SEQ_ID = "product_changes"
+
+async def reserve_change_seqs(db: AsyncIOMotorDatabase, count: int = 1) -> int:
+    """Reserva `count` números consecutivos de la secuencia de cambios y devuelve el primero"""
+    doc = await db[META_COLLECTION].find_one_and_update(
+        {"_id": CHANGE_SEQ_ID},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["seq"] - count + 1
+
+class MongoProductRepository(ProductRepository):
+    """Productos en la colección `products` (índices en database/indexes.py)"""
+
+    name = "mongo"
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        # Pasa a False la primera vez que el servidor rechaza $topN
+        self._top_n = True
+
+    async def list_products(self, categoria: Optional[str] = None, subcategoria: Optional[str] = None,
+                            search: Optional[str] = None, limit: Optional[int] = None,
+                            position: Optional[dict] = None,
+                            fields: Optional[Set[str]] = None) -> Tuple[List[dict], Optional[dict]]:
+        projection = PUBLIC_PROJECTION
+        if fields is not None:
+            projection = {"_id": 0, "id": 1, "created_at": 1, **{f: 1 for f in fields}}
+
+        # Construir filtros
+        filters = {}
+        if categoria:
+            filters["categoria"] = categoria
+        if subcategoria:
+            filters["subcategoria"] = subcategoria
+
+        # Búsqueda por texto con el índice products_text
+        if search:
+            filters["$text"] = {"$search": search}
+            sort = [("score", {"$meta": "textScore"}), ("created_at", -1), ("id", -1)]
+        else:
+            sort = [("created_at", -1), ("id", -1)]
+
+        offset = 0
+        if position and "o" in position:
+            # Con búsqueda el orden es por relevancia, así que se pagina por posición
+            offset = position["o"]
+        elif position:
+            # Paginación por clave: continuar después del último (created_at, id)
+            created = position_timestamp(position["c"])
+            filters["$or"] = [
+                {"created_at": {"$lt": created}},
+                {"created_at": created, "id": {"$lt": position["i"]}}
+            ]
+
+        query = self.db.products.find(filters, projection).sort(sort)
+        if offset:
+            query = query.skip(offset)
+        if limit:
+            # Se pide uno extra para saber si hay una página siguiente
+            query = query.limit(limit + 1)
+
+        rows = [row async for row in query]
+
+        next_position = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            if search:
+                next_position = {"o": offset + limit}
+            else:
+                last = rows[-1]
+                next_position = {"c": last["created_at"].isoformat(), "i": last["id"]}
+
+        # Quitar created_at si solo se usó para el cursor
+        if fields is not None and "created_at" not in fields:
+            for row in rows:
+                row.pop("created_at", None)
+        return rows, next_position
+
+    async def get_product(self, product_id: str) -> Optional[dict]:
+        return await self.db.products.find_one({"id": product_id}, PUBLIC_PROJECTION)
+
+    async def create_product(self, doc: dict) -> dict:
+        doc = with_natural_key(dict(doc))
+        doc["change_seq"] = await reserve_change_seqs(self.db)
+        doc["changed_at"] = datetime.utcnow()
+        try:
+            await self.db.products.insert_one(doc)
+        except DuplicateKeyError:
+            raise DuplicateProductError()
+        return {k: v for k, v in doc.items() if k != "_id" and k not in INTERNAL_FIELDS}
+
+    async def update_product(self, product_id: str, changes: dict) -> Optional[dict]:
+        changes = dict(changes)
+        if NATURAL_KEY_FIELDS & changes.keys():
+            # La clave natural depende también de los campos que no cambian
+            projection = {"_id": 0, **{field: 1 for field in NATURAL_KEY_FIELDS}}
+            existing = await self.db.products.find_one({"id": product_id}, projection)
+            if not existing:
+                return None
+            merged = {**existing, **changes}
+            changes["natural_key"] = product_natural_key(
+                merged["titulo"], merged["categoria"], merged.get("subcategoria")
+            )
+        changes["change_seq"] = await reserve_change_seqs(self.db)
+        changes["changed_at"] = datetime.utcnow()
+        try:
+            # Una sola operación actualiza y devuelve el documento (None si no existe)
+            return await self.db.products.find_one_and_update(
+                {"id": product_id}, {"$set": changes}, PUBLIC_PROJECTION, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise DuplicateProductError()
+
+    async def delete_product(self, product_id: str) -> bool:
+        result = await self.db.products.delete_one({"id": product_id})
+        if not result.deleted_count:
+            return False
+        # La secuencia se reserva después del borrado: es posterior a cualquier escritura del producto
+        await self.db[TOMBSTONE_COLLECTION].insert_one({
+            "id": product_id,
+            "change_seq": await reserve_change_seqs(self.db),
+            "deleted_at": datetime.utcnow(),
+        })
+        return True
+
+    async def find_by_natural_keys(self, keys: Iterable[str]) -> Dict[str, dict]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        found = {}
+        async for doc in self.db.products.find({"natural_key": {"$in": keys}}, {"_id": 0}):
+            found[doc["natural_key"]] = doc
+        return found
+
+    async def bulk_upsert(self, docs: List[dict], insert_only: Sequence[str] = IMPORT_INSERT_ONLY) -> List[str]:
+        if not docs:
+            return []
+        # Un número de secuencia por documento, reservados de una vez
+        first_seq = await reserve_change_seqs(self.db, len(docs))
+        changed_at = datetime.utcnow()
+        operations = []
+        for offset, doc in enumerate(docs):
+            doc = with_natural_key(dict(doc))
+            doc["change_seq"] = first_seq + offset
+            doc["changed_at"] = changed_at
+            operations.append(UpdateOne(
+                {"natural_key": doc["natural_key"]},
+                {
+                    "$set": {k: v for k, v in doc.items() if k not in insert_only},
+                    "$setOnInsert": {k: doc[k] for k in insert_only if k in doc},
+                },
+                upsert=True
+            ))
+
+        try:
+            result = await self.db.products.bulk_write(operations, ordered=False)
+            upserted, failed = result.upserted_ids, {}
+        except BulkWriteError as e:
+            upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+            failed = {err["index"]: err.get("errmsg", "") for err in e.details.get("writeErrors", [])}
+
+        statuses = []
+        for index in range(len(operations)):
+            if index in failed:
+                logger.error(f"Error upserting product: {failed[index]}")
+                statuses.append("failed")
+            else:
+                statuses.append("created" if index in upserted else "updated")
+        return statuses
+
+    async def iter_products(self, categoria: Optional[str] = None,
+                            subcategoria: Optional[str] = None) -> AsyncIterator[dict]:
+        filters = {}
+        if categoria:
+            filters["categoria"] = categoria
+        if subcategoria:
+            filters["subcategoria"] = subcategoria
+        cursor = self.db.products.find(filters, PUBLIC_PROJECTION).batch_size(ITER_BATCH_SIZE)
+        async for doc in cursor:
+            yield doc
+
+    async def list_changes(self, since: int, limit: int) -> List[dict]:
+        # Índices products_change_seq y product_tombstones_seq
+        products = self.db.products.find(
+            {"change_seq": {"$gt": since}}, {"_id": 0, "natural_key": 0}
+        ).sort("change_seq", 1).limit(limit)
+        tombstones = self.db[TOMBSTONE_COLLECTION].find(
+            {"change_seq": {"$gt": since}}, {"_id": 0}
+        ).sort("change_seq", 1).limit(limit)
+        return merge_changes([doc async for doc in products], [doc async for doc in tombstones], limit)
+
+    async def catalog_groups(self, fields: Sequence[str], per_group: int) -> List[dict]:
+        """
+        Una sola agregación en el servidor. $topN (MongoDB 5.2+) guarda solo
+        los `per_group` más recientes de cada grupo mientras agrupa; en
+        servidores anteriores (o mongomock) se ordena, se acumula el grupo
+        entero con $push y se recorta con $slice
+        """
+        group_id = {"categoria": "$categoria", "subcategoria": "$subcategoria"}
+        output = {f: f"${f}" for f in fields}
+        by_group = {"$sort": {"_id.categoria": 1, "_id.subcategoria": 1}}
+        if self._top_n:
+            pipeline = [
+                {"$group": {
+                    "_id": group_id,
+                    "total": {"$sum": 1},
+                    "products": {"$topN": {
+                        "n": per_group, "sortBy": {"created_at": -1, "id": -1}, "output": output,
+                    }},
+                }},
+                by_group,
+            ]
+            try:
+                return await self._aggregate_groups(pipeline)
+            except (OperationFailure, NotImplementedError) as e:
+                logger.warning(f"$topN not supported, grouping with $push and $slice: {str(e)}")
+                self._top_n = False
+
+        pipeline = [
+            {"$sort": {"created_at": -1, "id": -1}},
+            {"$group": {"_id": group_id, "total": {"$sum": 1}, "products": {"$push": output}}},
+            {"$project": {"total": 1, "products": {"$slice": ["$products", per_group]}}},
+            by_group,
+        ]
+        return await self._aggregate_groups(pipeline)
+
+    async def _aggregate_groups(self, pipeline: List[dict]) -> List[dict]:
+        groups = []
+        async for group in self.db.products.aggregate(pipeline):
+            groups.append({
+                "categoria": group["_id"].get("categoria"),
+                "subcategoria": group["_id"].get("subcategoria"),
+                "total": group["total"],
+                "products": group["products"],
+            })
+        return groups
@@ -0,0 +1,172 @@
+import heapq
+import itertools
+import logging
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from models.Product import product_natural_key
+
+logger = logging.getLogger(__name__)
+
+# Backend de productos: mongo (por defecto), supabase o memory
+PRODUCT_BACKEND = os.environ.get('PRODUCT_BACKEND', 'mongo').lower()
+
+# Campos que solo se fijan al crear en una importación (se conservan al actualizar)
+IMPORT_INSERT_ONLY = ("id", "created_at")
+
+# Campos que guarda el backend y no forman parte del producto publicado:
+# clave natural y posición en la secuencia de cambios (ver list_changes)
+INTERNAL_FIELDS = ("natural_key", "change_seq", "changed_at")
+# Días que se conservan las marcas de borrado para la sincronización incremental
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get('TOMBSTONE_RETENTION_DAYS', 30))
+
+class DuplicateProductError(Exception):
+    """Ya existe un producto con la misma clave natural"""
+
+def with_natural_key(doc: dict) -> dict:
+    doc["natural_key"] = product_natural_key(doc["titulo"], doc["categoria"], doc.get("subcategoria"))
+    return doc
+
+def select_fields(row: dict, fields: Optional[Set[str]]) -> dict:
+    """Fila con solo `id` y los campos pedidos, en el orden del documento"""
+    if fields is None:
+        return row
+    return {k: v for k, v in row.items() if k == "id" or k in fields}
+
+def position_timestamp(value) -> datetime:
+    """created_at de una posición, ya sea datetime o el texto ISO devuelto"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def _change_time(value) -> datetime:
+    """changed_at/deleted_at como datetime UTC sin zona (Supabase los devuelve como texto)"""
+    value = position_timestamp(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def merge_changes(products: Iterable[dict], tombstones: Iterable[dict], limit: int) -> List[dict]:
+    """
+    Une productos (con change_seq y changed_at) y marcas de borrado (id,
+    change_seq, deleted_at), ambos ordenados por secuencia, en los primeros
+    `limit` cambios
+    """
+    upserts = (
+        {"seq": doc["change_seq"], "at": _change_time(doc["changed_at"]), "op": "upsert", "id": doc["id"],
+         "product": {k: v for k, v in doc.items() if k not in INTERNAL_FIELDS}}
+        for doc in products
+    )
+    deletes = (
+        {"seq": doc["change_seq"], "at": _change_time(doc["deleted_at"]), "op": "delete", "id": doc["id"]}
+        for doc in tombstones
+    )
+    return list(itertools.islice(heapq.merge(upserts, deletes, key=lambda change: change["seq"]), limit))
+
+class ProductRepository:
+    """
+    Operaciones de productos comunes a todos los backends.
+
+    Todas las lecturas de listas comparten la misma semántica: orden por
+    created_at e id descendentes (o relevancia con `search`), página de
+    `limit` filas y posición de continuación opaca:
+    {"c": created_at ISO, "i": id} o {"o": offset} en búsquedas.
+    """
+
+    name = "base"
+
+    async def ensure_ready(self):
+        """Preparación al arrancar (índices, claves naturales pendientes)"""
+
+    async def list_products(self, categoria: Optional[str] = None, subcategoria: Optional[str] = None,
+                            search: Optional[str] = None, limit: Optional[int] = None,
+                            position: Optional[dict] = None,
+                            fields: Optional[Set[str]] = None) -> Tuple[List[dict], Optional[dict]]:
+        """Devuelve (filas, posición de la página siguiente o None)"""
+        raise NotImplementedError
+
+    async def get_product(self, product_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def create_product(self, doc: dict) -> dict:
+        """Inserta un producto completo; DuplicateProductError si la clave natural existe"""
+        raise NotImplementedError
+
+    async def update_product(self, product_id: str, changes: dict) -> Optional[dict]:
+        """Aplica los cambios y devuelve el producto actualizado, o None si no existe"""
+        raise NotImplementedError
+
+    async def delete_product(self, product_id: str) -> bool:
+        raise NotImplementedError
+
+    async def find_by_natural_keys(self, keys: Iterable[str]) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    async def bulk_upsert(self, docs: List[dict], insert_only: Sequence[str] = IMPORT_INSERT_ONLY) -> List[str]:
+        """
+        Inserta o actualiza por clave natural en una escritura por lote. Los
+        campos de `insert_only` solo se escriben al crear. Devuelve el estado
+        de cada documento: "created", "updated" o "failed".
+        """
+        raise NotImplementedError
+
+    async def list_changes(self, since: int, limit: int) -> List[dict]:
+        """
+        Hasta `limit` cambios posteriores a la secuencia `since`, en orden:
+        {"seq", "at", "op": "upsert", "id", "product"} o {"seq", "at", "op": "delete", "id"}.
+        Cada escritura da al producto un change_seq nuevo y cada borrado deja
+        una marca con el suyo, así que solo aparece el último estado.
+        """
+        raise NotImplementedError
+
+    def iter_products(self, categoria: Optional[str] = None,
+                      subcategoria: Optional[str] = None) -> AsyncIterator[dict]:
+        """Recorre todos los productos por lotes, sin cargarlos en memoria"""
+        raise NotImplementedError
+
+    async def catalog_groups(self, fields: Sequence[str], per_group: int) -> List[dict]:
+        """
+        Productos agrupados por categoría/subcategoría, los más recientes
+        primero. Los backends con agregación en el servidor lo sobrescriben.
+        """
+        def newest_first(products: List[dict]) -> List[dict]:
+            products.sort(key=lambda d: (str(d.get("created_at")), str(d.get("id"))), reverse=True)
+            return products[:per_group]
+
+        groups: Dict[tuple, dict] = {}
+        async for doc in self.iter_products():
+            key = (doc.get("categoria"), doc.get("subcategoria"))
+            group = groups.setdefault(key, {"categoria": key[0], "subcategoria": key[1], "total": 0, "products": []})
+            group["total"] += 1
+            group["products"].append({f: doc.get(f) for f in (*fields, "created_at")})
+            # Solo se conservan los `per_group` más recientes de cada grupo
+            if len(group["products"]) >= 2 * per_group:
+                group["products"] = newest_first(group["products"])
+
+        result = []
+        for key in sorted(groups, key=lambda k: (k[0] or "", k[1] or "")):
+            group = groups[key]
+            group["products"] = [{f: d[f] for f in fields} for d in newest_first(group["products"])]
+            result.append(group)
+        return result
+
+_repository: Optional[ProductRepository] = None
+
+def create_repository(backend: str = PRODUCT_BACKEND) -> ProductRepository:
+    if backend == "mongo":
+        from database.mongo_product_repository import MongoProductRepository
+        from server import db
+        return MongoProductRepository(db)
+    if backend == "supabase":
+        from database.supabase_product_repository import SupabaseProductRepository
+        return SupabaseProductRepository()
+    if backend == "memory":
+        from database.memory_product_repository import MemoryProductRepository
+        return MemoryProductRepository()
+    raise ValueError(f"PRODUCT_BACKEND desconocido: {backend}")
+
+# Dependency para obtener el repositorio de productos configurado
+async def get_product_repository() -> ProductRepository:
+    global _repository
+    if _repository is None:
+        _repository = create_repository()
+    return _repository
@@ -0,0 +1,241 @@
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from database.product_repository import (
+    IMPORT_INSERT_ONLY, INTERNAL_FIELDS, TOMBSTONE_RETENTION_DAYS, DuplicateProductError, ProductRepository,
+    merge_changes, select_fields, with_natural_key
+)
+from database.supabase_rest import SupabaseError, get_supabase_rest
+from models.Product import Product, product_natural_key
+
+logger = logging.getLogger(__name__)
+
+# Filas por página al recorrer la tabla y claves por consulta `in`
+# (acota la longitud de la URL)
+ITER_BATCH_SIZE = 1000
+KEYS_PER_QUERY = 200
+NATURAL_KEY_FIELDS = {"titulo", "categoria", "subcategoria"}
+# Código de PostgreSQL para una violación de restricción única
+UNIQUE_VIOLATION = "23505"
+
+def _row(item: dict) -> dict:
+    """Fila de PostgREST sin las columnas internas (natural_key, change_seq, changed_at)"""
+    for field in INTERNAL_FIELDS:
+        item.pop(field, None)
+    return item
+
+def _timestamp(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+class SupabaseProductRepository(ProductRepository):
+    """Productos en la tabla `products` de Supabase (ver supabase-setup.sql)"""
+
+    name = "supabase"
+
+    def __init__(self):
+        self.supabase = get_supabase_rest()
+
+    async def ensure_ready(self):
+        """
+        Borra las marcas de borrado caducadas y asigna natural_key a las filas
+        creadas antes de que existiera la columna
+        """
+        expired = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+        try:
+            await self.supabase.table('product_tombstones').delete().lt('deleted_at', expired.isoformat()).execute()
+        except SupabaseError as e:
+            logger.error(f"Error pruning Supabase product tombstones: {str(e)}")
+
+        pending_check = await self.supabase.table('products').select('id').is_('natural_key', None).limit(1).execute()
+        if not pending_check.data:
+            return
+
+        taken = set()
+        pending = []
+        async for row in self._iter_rows(None, None, columns="*"):
+            if row.get("natural_key"):
+                taken.add(row["natural_key"])
+            else:
+                pending.append(row)
+
+        duplicates = 0
+        batch = []
+        for row in pending:
+            key = product_natural_key(row["titulo"], row["categoria"], row.get("subcategoria"))
+            if key in taken:
+                duplicates += 1
+                continue
+            taken.add(key)
+            batch.append({**row, "natural_key": key})
+            if len(batch) >= ITER_BATCH_SIZE:
+                await self.supabase.table('products').upsert(batch, on_conflict='id').execute()
+                batch = []
+        if batch:
+            await self.supabase.table('products').upsert(batch, on_conflict='id').execute()
+        if duplicates:
+            logger.warning(f"{duplicates} legacy Supabase products share a natural key and were left without one")
+
+    async def list_products(self, categoria: Optional[str] = None, subcategoria: Optional[str] = None,
+                            search: Optional[str] = None, limit: Optional[int] = None,
+                            position: Optional[dict] = None,
+                            fields: Optional[Set[str]] = None) -> Tuple[List[dict], Optional[dict]]:
+        columns = "*"
+        if fields is not None:
+            # Mismo orden de campos que el modelo (y que los documentos de Mongo)
+            columns = ",".join(f for f in Product.model_fields if f in fields or f in ("id", "created_at"))
+        offset = 0
+        if search:
+            # search_products (supabase-setup.sql) usa los índices GIN y ordena por relevancia
+            query = self.supabase.rpc('search_products', {'q': search}, columns=columns)
+            if position and "o" in position:
+                offset = position["o"]
+        else:
+            query = self.supabase.table('products').select(columns).order('created_at', desc=True).order('id', desc=True)
+            if position and "c" in position:
+                created = _timestamp(position["c"])
+                query = query.or_(
+                    f'(created_at.lt."{created}",and(created_at.eq."{created}",id.lt."{position["i"]}"))'
+                )
+
+        # Aplicar filtros
+        if categoria:
+            query = query.eq('categoria', categoria)
+        if subcategoria:
+            query = query.eq('subcategoria', subcategoria)
+        if offset:
+            query = query.offset(offset)
+        if limit:
+            query = query.limit(limit + 1)
+
+        rows = [_row(item) for item in (await query.execute()).data]
+
+        next_position = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            if search:
+                next_position = {"o": offset + limit}
+            else:
+                next_position = {"c": rows[-1]["created_at"], "i": rows[-1]["id"]}
+
+        if fields is not None:
+            # Quitar created_at si solo se usó para el cursor
+            rows = [select_fields(row, fields) for row in rows]
+        return rows, next_position
+
+    async def get_product(self, product_id: str) -> Optional[dict]:
+        response = await self.supabase.table('products').select('*').eq('id', product_id).execute()
+        return _row(response.data[0]) if response.data else None
+
+    async def create_product(self, doc: dict) -> dict:
+        try:
+            response = await self.supabase.table('products').insert(
+                jsonable_encoder(with_natural_key(dict(doc)))
+            ).execute()
+        except SupabaseError as e:
+            if e.code == UNIQUE_VIOLATION:
+                raise DuplicateProductError()
+            raise
+        return _row(response.data[0])
+
+    async def update_product(self, product_id: str, changes: dict) -> Optional[dict]:
+        changes = dict(changes)
+        if NATURAL_KEY_FIELDS & changes.keys():
+            existing = await self.get_product(product_id)
+            if not existing:
+                return None
+            merged = {**existing, **changes}
+            changes["natural_key"] = product_natural_key(
+                merged["titulo"], merged["categoria"], merged.get("subcategoria")
+            )
+        try:
+            response = await self.supabase.table('products').update(
+                jsonable_encoder(changes)
+            ).eq('id', product_id).execute()
+        except SupabaseError as e:
+            if e.code == UNIQUE_VIOLATION:
+                raise DuplicateProductError()
+            raise
+        return _row(response.data[0]) if response.data else None
+
+    async def delete_product(self, product_id: str) -> bool:
+        response = await self.supabase.table('products').delete().eq('id', product_id).execute()
+        return bool(response.data)
+
+    async def find_by_natural_keys(self, keys: Iterable[str]) -> Dict[str, dict]:
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), KEYS_PER_QUERY):
+            response = await self.supabase.table('products').select('*').in_(
+                'natural_key', keys[start:start + KEYS_PER_QUERY]
+            ).execute()
+            for item in response.data:
+                key = item["natural_key"]
+                found[key] = _row(item)
+        return found
+
+    async def bulk_upsert(self, docs: List[dict], insert_only: Sequence[str] = IMPORT_INSERT_ONLY) -> List[str]:
+        if not docs:
+            return []
+        rows = [jsonable_encoder(with_natural_key(dict(doc))) for doc in docs]
+        existing = await self.find_by_natural_keys({row["natural_key"] for row in rows})
+
+        # Las columnas NOT NULL se validan antes del ON CONFLICT, así que las
+        # filas existentes llevan sus valores actuales en los campos insert_only.
+        # Un upsert no puede tocar dos veces la misma fila: gana la última.
+        payload = {}
+        for row in rows:
+            current = existing.get(row["natural_key"])
+            if current:
+                row.update({k: current[k] for k in insert_only if k in current})
+            payload[row["natural_key"]] = row
+
+        try:
+            await self.supabase.table('products').upsert(list(payload.values()), on_conflict='natural_key').execute()
+        except SupabaseError as e:
+            # PostgREST aplica cada petición en una transacción: falla el lote entero
+            logger.error(f"Error upserting products into Supabase: {str(e)}")
+            return ["failed"] * len(rows)
+
+        statuses = []
+        seen = set(existing)
+        for row in rows:
+            statuses.append("updated" if row["natural_key"] in seen else "created")
+            seen.add(row["natural_key"])
+        return statuses
+
+    async def _iter_rows(self, categoria: Optional[str], subcategoria: Optional[str],
+                         columns: str) -> AsyncIterator[dict]:
+        """Recorre la tabla por páginas ordenadas por id (sin OFFSET)"""
+        last_id = None
+        while True:
+            query = self.supabase.table('products').select(columns).order('id')
+            if categoria:
+                query = query.eq('categoria', categoria)
+            if subcategoria:
+                query = query.eq('subcategoria', subcategoria)
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            rows = (await query.limit(ITER_BATCH_SIZE).execute()).data
+            for row in rows:
+                yield row
+            if len(rows) < ITER_BATCH_SIZE:
+                break
+            last_id = rows[-1]['id']
+
+    async def iter_products(self, categoria: Optional[str] = None,
+                            subcategoria: Optional[str] = None) -> AsyncIterator[dict]:
+        async for row in self._iter_rows(categoria, subcategoria, columns="*"):
+            yield _row(row)
+
+    async def list_changes(self, since: int, limit: int) -> List[dict]:
+        # change_seq y changed_at los asignan los triggers de supabase-setup.sql
+        products = await self.supabase.table('products').select('*').gt(
+            'change_seq', since
+        ).order('change_seq').limit(limit).execute()
+        tombstones = await self.supabase.table('product_tombstones').select('*').gt(
+            'change_seq', since
+        ).order('change_seq').limit(limit).execute()
+        return merge_changes(products.data, tombstones.data, limit)
@@ -0,0 +1,223 @@
+import importlib.util
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from services.metrics import db_latency
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson está en requirements.txt
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Límites del pool de conexiones HTTP hacia PostgREST
+SUPABASE_MAX_CONNECTIONS = int(os.environ.get('SUPABASE_MAX_CONNECTIONS', 20))
+SUPABASE_MAX_KEEPALIVE = int(os.environ.get('SUPABASE_MAX_KEEPALIVE', 10))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.environ.get('SUPABASE_KEEPALIVE_EXPIRY', 30))
+SUPABASE_TIMEOUT = float(os.environ.get('SUPABASE_TIMEOUT', 10))
+SUPABASE_CONNECT_TIMEOUT = float(os.environ.get('SUPABASE_CONNECT_TIMEOUT', 5))
+# HTTP/2 multiplexa las peticiones sobre una conexión; requiere el paquete h2
+SUPABASE_HTTP2 = os.environ.get('SUPABASE_HTTP2', 'true').lower() == 'true'
+
+class SupabaseError(Exception):
+    """Respuesta de error de PostgREST"""
+
+    def __init__(self, status_code: int, message: str, code: Optional[str] = None):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.code = code
+
+class QueryResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    return str(value)
+
+class Query:
+    """
+    Petición a PostgREST con la misma forma encadenable que el cliente de
+    supabase-py (`.select().eq().order()`), pero con `await query.execute()`.
+    """
+
+    def __init__(self, rest: "SupabaseRest", method: str, path: str,
+                 body: Any = None, prefer: Optional[List[str]] = None):
+        self._rest = rest
+        self._method = method
+        self._path = path
+        self._body = body
+        self._prefer = list(prefer or [])
+        self._params: List[Tuple[str, str]] = []
+
+    def _filter(self, column: str, operator: str, value: str) -> "Query":
+        self._params.append((column, f"{operator}.{value}"))
+        return self
+
+    def eq(self, column: str, value) -> "Query":
+        return self._filter(column, "eq", _format_value(value))
+
+    def neq(self, column: str, value) -> "Query":
+        return self._filter(column, "neq", _format_value(value))
+
+    def is_(self, column: str, value) -> "Query":
+        return self._filter(column, "is", _format_value(value))
+
+    def gt(self, column: str, value) -> "Query":
+        return self._filter(column, "gt", _format_value(value))
+
+    def lt(self, column: str, value) -> "Query":
+        return self._filter(column, "lt", _format_value(value))
+
+    def in_(self, column: str, values: Iterable) -> "Query":
+        quoted = ",".join(json.dumps(_format_value(v)) for v in values)
+        return self._filter(column, "in", f"({quoted})")
+
+    def or_(self, expression: str) -> "Query":
+        """Filtro `or` de PostgREST, p. ej. "(a.lt.1,and(a.eq.1,b.lt.2))" """
+        self._params.append(("or", expression))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "Query":
+        # Varias columnas de orden van en un único parámetro separado por comas
+        term = f"{column}.{'desc' if desc else 'asc'}"
+        for index, (name, value) in enumerate(self._params):
+            if name == "order":
+                self._params[index] = ("order", f"{value},{term}")
+                return self
+        self._params.append(("order", term))
+        return self
+
+    def limit(self, count: int) -> "Query":
+        self._params.append(("limit", str(count)))
+        return self
+
+    def offset(self, count: int) -> "Query":
+        self._params.append(("offset", str(count)))
+        return self
+
+    async def execute(self) -> QueryResponse:
+        headers = {"Prefer": ",".join(self._prefer)} if self._prefer else None
+        response = await self._rest.request(self._method, self._path, self._params, self._body, headers)
+        if not response.content:
+            data = []
+        else:
+            data = orjson.loads(response.content) if orjson else response.json()
+        return QueryResponse(data)
+
+class Table:
+    def __init__(self, rest: "SupabaseRest", name: str):
+        self._rest = rest
+        self._path = f"/{name}"
+
+    def select(self, columns: str = "*") -> Query:
+        query = Query(self._rest, "GET", self._path)
+        query._params.append(("select", columns))
+        return query
+
+    def insert(self, rows) -> Query:
+        return Query(self._rest, "POST", self._path, rows, ["return=representation"])
+
+    def upsert(self, rows, on_conflict: Optional[str] = None) -> Query:
+        query = Query(self._rest, "POST", self._path, rows,
+                      ["return=representation", "resolution=merge-duplicates"])
+        if on_conflict:
+            query._params.append(("on_conflict", on_conflict))
+        return query
+
+    def update(self, values: dict) -> Query:
+        return Query(self._rest, "PATCH", self._path, values, ["return=representation"])
+
+    def delete(self) -> Query:
+        return Query(self._rest, "DELETE", self._path, prefer=["return=representation"])
+
+class SupabaseRest:
+    """
+    Cliente asíncrono de PostgREST sobre un httpx.AsyncClient compartido.
+
+    Las conexiones se reutilizan (keep-alive) y las peticiones no bloquean el
+    event loop, así que varias rutas pueden esperar a Supabase a la vez.
+    """
+
+    def __init__(self, url: str, key: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        http2 = SUPABASE_HTTP2 and transport is None and importlib.util.find_spec("h2") is not None
+        self._client = httpx.AsyncClient(
+            base_url=f"{url.rstrip('/')}/rest/v1",
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            limits=httpx.Limits(
+                max_connections=SUPABASE_MAX_CONNECTIONS,
+                max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+                keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT),
+            http2=http2,
+            transport=transport,
+        )
+
+    def table(self, name: str) -> Table:
+        return Table(self, name)
+
+    def rpc(self, function: str, params: Optional[dict] = None, columns: Optional[str] = None) -> Query:
+        query = Query(self, "POST", f"/rpc/{function}", params or {})
+        if columns:
+            query._params.append(("select", columns))
+        return query
+
+    async def request(self, method: str, path: str, params: List[Tuple[str, str]], body: Any = None,
+                      headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        operation = f"{method} {path.lstrip('/')}"
+        start = time.perf_counter()
+        try:
+            response = await self._client.request(method, path, params=params, json=body, headers=headers)
+        except httpx.HTTPError:
+            db_latency.observe(time.perf_counter() - start, "supabase", operation, "error")
+            raise
+        db_latency.observe(time.perf_counter() - start, "supabase", operation,
+                           "error" if response.is_error else "ok")
+        if response.is_error:
+            try:
+                error = response.json()
+            except ValueError:
+                error = None
+            if isinstance(error, dict):
+                raise SupabaseError(response.status_code, error.get("message") or response.text, error.get("code"))
+            raise SupabaseError(response.status_code, response.text)
+        return response
+
+    async def close(self):
+        await self._client.aclose()
+
+_rest: Optional[SupabaseRest] = None
+
+def get_supabase_rest() -> SupabaseRest:
+    """Cliente compartido; se crea en el primer uso para no exigir Supabase al importar"""
+    global _rest
+    if _rest is None:
+        url = os.environ.get('SUPABASE_URL')
+        key = os.environ.get('SUPABASE_ANON_KEY')
+
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables")
+
+        _rest = SupabaseRest(url, key)
+    return _rest
+
+def supabase_configured() -> bool:
+    return bool(os.environ.get('SUPABASE_URL') and os.environ.get('SUPABASE_ANON_KEY'))
+
+async def close_supabase_rest():
+    global _rest
+    if _rest is not None:
+        await _rest.close()
+        _rest = None
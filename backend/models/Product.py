@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
+import unicodedata
 import uuid
 
 class Product(BaseModel):
@@ -34,4 +35,15 @@ class ProductUpdate(BaseModel):
     fecha_lanzamiento: Optional[str] = None
     plataformas: Optional[List[str]] = None
     categoria: Optional[str] = None
-    subcategoria: Optional[str] = None
\ No newline at end of file
+    subcategoria: Optional[str] = None
+
+def product_natural_key(titulo: str, categoria: str, subcategoria: Optional[str] = None) -> str:
+    """
+    Clave natural de un producto: título sin acentos, mayúsculas ni espacios
+    repetidos, más categoría y subcategoría. Identifica el mismo producto
+    cuando se vuelve a importar.
+    """
+    normalized = unicodedata.normalize('NFKD', titulo.casefold())
+    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
+    normalized = ' '.join(normalized.split())
+    return f"{normalized}|{categoria}|{subcategoria or ''}"
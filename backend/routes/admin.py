@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Depends
+from database.indexes import explain_standard_queries, index_status, legacy_duplicates
+import logging
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Dependency para obtener la base de datos
+async def get_database() -> AsyncIOMotorDatabase:
+    from server import db
+    return db
+
+@router.get("/admin/indexes")
+async def get_index_report(db: AsyncIOMotorDatabase = Depends(get_database)):
+    """
+    Índices declarados que faltan y plan de las consultas habituales; las que
+    hacen COLLSCAN aparecen en `collscans`. `legacy_duplicates` lista los
+    productos antiguos que se quedaron sin clave natural por repetir la de otro
+    """
+    try:
+        queries = await explain_standard_queries(db)
+        return {
+            "indexes": await index_status(db),
+            "queries": queries,
+            "collscans": [query["query"] for query in queries if query.get("collscan")],
+            "legacy_duplicates": await legacy_duplicates(db),
+        }
+    except Exception as e:
+        logger.error(f"Error building index report: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
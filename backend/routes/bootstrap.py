@@ -0,0 +1,114 @@
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+import asyncio
+import os
+import logging
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database.image_store import IMAGE_URL_PREFIX
+from database.product_repository import ProductRepository, get_product_repository
+from database.supabase_rest import get_supabase_rest, supabase_configured
+from services.catalog_version import catalog_version
+from services.compression import use_cached_encodings
+from services.response_cache import response_cache
+from services.serialization import render_json
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Productos por categoría/subcategoría incluidos en el bootstrap; el resto se
+# pide con GET /products
+BOOTSTRAP_CARDS_PER_GROUP = int(os.environ.get('BOOTSTRAP_CARDS_PER_GROUP', 100))
+# Ancho de la miniatura que usan las tarjetas
+CARD_IMAGE_WIDTH = 400
+CARD_FIELDS = ("id", "titulo", "descripcion", "imagen", "pais", "fecha_lanzamiento", "plataformas")
+
+# Dependency para obtener la base de datos
+async def get_database() -> AsyncIOMotorDatabase:
+    from server import db
+    return db
+
+def _card_image(imagen: str) -> str:
+    """Las imágenes del almacén se sirven como miniatura en las tarjetas"""
+    if imagen and imagen.startswith(IMAGE_URL_PREFIX) and "?" not in imagen:
+        return f"{imagen}?w={CARD_IMAGE_WIDTH}"
+    return imagen
+
+async def _catalog_groups(repo: ProductRepository) -> list:
+    """Tarjetas de producto agrupadas por categoría y subcategoría"""
+    groups = await repo.catalog_groups(CARD_FIELDS, BOOTSTRAP_CARDS_PER_GROUP)
+    for group in groups:
+        for card in group["products"]:
+            card["imagen"] = _card_image(card.get("imagen"))
+    return groups
+
+async def _active_rows(table: str) -> list:
+    supabase = get_supabase_rest()
+    response = await supabase.table(table).select('*').eq('is_active', True).execute()
+    return response.data
+
+async def _build_bootstrap(db: AsyncIOMotorDatabase, repo: ProductRepository) -> tuple:
+    """Devuelve (contenido, completo); si Supabase falla el contenido no se cachea"""
+    logo_task = db.site_config.find_one({"key": "logo"}, {"_id": 0, "value": 1})
+    tasks = [logo_task, _catalog_groups(repo)]
+    if supabase_configured():
+        tasks += [_active_rows('social_networks'), _active_rows('business_groups')]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    for result in results[:2]:
+        if isinstance(result, Exception):
+            raise result
+    logo, catalog = results[0], results[1]
+
+    complete = True
+    remote = results[2:] or [[], []]
+    for index, result in enumerate(remote):
+        if isinstance(result, Exception):
+            logger.error(f"Error getting bootstrap data from Supabase: {str(result)}")
+            remote[index] = []
+            complete = False
+
+    content = {
+        "config": {"logo": logo["value"] if logo else ""},
+        "social_networks": remote[0],
+        "business_groups": remote[1],
+        "catalog": catalog,
+    }
+    return content, complete
+
+@router.get("/bootstrap")
+async def get_bootstrap(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    repo: ProductRepository = Depends(get_product_repository)
+):
+    """
+    Todo lo que la tienda necesita al cargar (logo, redes sociales, grupos y
+    tarjetas de producto por categoría) en una sola respuesta.
+
+    El ETag se deriva de la versión del catálogo, que sube con cada
+    escritura: una visita repetida con If-None-Match recibe un 304 sin
+    consultar la base de datos.
+    """
+    try:
+        etag = await catalog_version.etag(db)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+
+        cached = response_cache.get("bootstrap", etag)
+        if cached:
+            use_cached_encodings(request, cached)
+            return Response(content=cached.body, media_type="application/json", headers=headers)
+        generation = response_cache.generation("bootstrap")
+
+        content, complete = await _build_bootstrap(db, repo)
+        body = render_json(content)
+        if complete:
+            use_cached_encodings(request, response_cache.put("bootstrap", etag, body, generation=generation))
+        else:
+            # Sin ETag: la respuesta incompleta no debe revalidarse como válida
+            headers = {"Cache-Control": "no-store"}
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    except Exception as e:
+        logger.error(f"Error getting bootstrap: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from models.SiteConfig import SiteConfig, SiteConfigCreate, SiteConfigUpdate
+from database.image_store import InvalidImageError, externalize_data_url
+from services.compression import use_cached_encodings
+from services.response_cache import response_cache
+from services.serialization import render_json
+from services.catalog_version import catalog_changed
 import os
-from datetime import datetime
 import logging
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -14,13 +19,23 @@ async def get_database() -> AsyncIOMotorDatabase:
     return db
 
 @router.get("/config/{key}")
-async def get_config(key: str, db: AsyncIOMotorDatabase = Depends(get_database)):
+async def get_config(key: str, request: Request, db: AsyncIOMotorDatabase = Depends(get_database)):
     try:
+        cached = response_cache.get("config", key)
+        if cached:
+            use_cached_encodings(request, cached)
+            return Response(content=cached.body, media_type="application/json")
+        generation = response_cache.generation("config")
+
         config = await db.site_config.find_one({"key": key})
         if config:
-            return {"key": config["key"], "value": config["value"]}
+            content = {"key": config["key"], "value": config["value"]}
         else:
-            return {"key": key, "value": ""}
+            content = {"key": key, "value": ""}
+
+        body = render_json(content)
+        use_cached_encodings(request, response_cache.put("config", key, body, generation=generation))
+        return Response(content=body, media_type="application/json")
     
     except Exception as e:
         logger.error(f"Error getting config: {str(e)}")
@@ -29,39 +44,27 @@ async def get_config(key: str, db: AsyncIOMotorDatabase = Depends(get_database))
 @router.post("/config", response_model=SiteConfig)
 async def update_config(config_data: SiteConfigCreate, db: AsyncIOMotorDatabase = Depends(get_database)):
     try:
-        # Verificar si ya existe la configuración
-        existing_config = await db.site_config.find_one({"key": config_data.key})
-        
-        if existing_config:
-            # Actualizar configuración existente
-            update_data = {
-                "value": config_data.value,
-                "updated_at": datetime.utcnow()
-            }
-            
-            result = await db.site_config.update_one(
-                {"key": config_data.key},
-                {"$set": update_data}
-            )
-            
-            if result.modified_count:
-                updated_config = await db.site_config.find_one({"key": config_data.key})
-                return SiteConfig(**updated_config)
-            else:
-                raise HTTPException(status_code=500, detail="Error al actualizar la configuración")
-        
-        else:
-            # Crear nueva configuración
-            config_obj = SiteConfig(**config_data.dict())
-            result = await db.site_config.insert_one(config_obj.dict())
-            
-            if result.inserted_id:
-                return config_obj
-            else:
-                raise HTTPException(status_code=500, detail="Error al crear la configuración")
+        # El logo llega como base64: se guarda en el almacén de imágenes
+        config_data.value = await externalize_data_url(db, config_data.value)
+
+        # Crear o actualizar en una sola operación (índice único site_config_key)
+        config_obj = SiteConfig(**config_data.dict())
+        updated_config = await db.site_config.find_one_and_update(
+            {"key": config_obj.key},
+            {
+                "$set": {"value": config_obj.value, "updated_at": config_obj.updated_at},
+                "$setOnInsert": {"id": config_obj.id},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await catalog_changed(db, "config")
+        return SiteConfig(**updated_config)
     
     except HTTPException:
         raise
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=f"Imagen no válida: {str(e)}")
     except Exception as e:
         logger.error(f"Error updating config: {str(e)}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
\ No newline at end of file
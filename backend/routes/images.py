@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import re
+import logging
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from services.catalog_version import catalog_changed
+from database.product_repository import ProductRepository, get_product_repository
+from database.image_store import (
+    InvalidImageError, MAX_IMAGE_BYTES, store_image, open_image, migrate_base64_images
+)
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# El contenido de un hash nunca cambia, así que el navegador puede guardarlo para siempre
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Dependency para obtener la base de datos
+async def get_database() -> AsyncIOMotorDatabase:
+    from server import db
+    return db
+
+@router.post("/images")
+async def upload_image(
+    file: UploadFile = File(...),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    try:
+        content = await file.read(MAX_IMAGE_BYTES + 1)
+        return await store_image(db, content)
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=f"Imagen no válida: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error uploading image: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.get("/images/{image_id}")
+async def get_image(
+    image_id: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    if not SHA256_RE.match(image_id):
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+    name, grid_out = await open_image(db, image_id, w)
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+    etag = f'"{name.replace("/", "-")}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    async def chunks():
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+    headers["Content-Length"] = str(grid_out.length)
+    return StreamingResponse(chunks(), media_type=grid_out.metadata["content_type"], headers=headers)
+
+@router.post("/images/migrate")
+async def migrate_images(
+    repo: ProductRepository = Depends(get_product_repository),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Mueve al almacén de imágenes los base64 guardados en productos y configuración"""
+    try:
+        result = await migrate_base64_images(db, repo)
+        await catalog_changed(db, "products", "config")
+        return {"message": "Migración de imágenes completada", **result}
+    except Exception as e:
+        logger.error(f"Error migrating images: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Response
+from services import pdf_cache, pdf_pool
+from services.metrics import Gauge, registry
+from services.response_cache import response_cache
+
+router = APIRouter()
+
+# Contadores que ya llevan las cachés y el pool, leídos en cada exportación
+response_cache_stats = registry.register(Gauge(
+    "response_cache", "Estado de la caché de respuestas (aciertos, fallos, bytes...)", ("stat",)))
+pdf_cache_stats = registry.register(Gauge(
+    "pdf_cache", "Aciertos y fallos de la caché de PDF", ("stat",)))
+pdf_pool_pending = registry.register(Gauge(
+    "pdf_pool_pending_jobs", "Trabajos de PDF en ejecución o en cola"))
+
+def _collect():
+    for stat, value in response_cache.snapshot().items():
+        response_cache_stats.set(stat, value=value)
+    for stat, value in pdf_cache.stats.items():
+        pdf_cache_stats.set(stat, value=value)
+    pdf_pool_pending.set(value=pdf_pool.pending())
+
+registry.collectors.append(_collect)
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Métricas del proceso en el formato de texto de Prometheus"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
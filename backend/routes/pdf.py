@@ -1,85 +1,264 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Iterable, Iterator, List, Optional
 import pdfplumber
-import io
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+import asyncio
+import hashlib
+import json
+import os
 import re
+import tempfile
+import time
+import uuid
 from datetime import datetime
 import logging
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from models.Product import ProductCreate, product_natural_key
+from database.product_repository import INTERNAL_FIELDS, ProductRepository, get_product_repository
+from services.pdf_pool import PDF_JOB_TIMEOUT, PoolBusyError, JobTimeoutError, run_in_pool
+from services import pdf_cache
+from services.pdf_jobs import PDFJob, create_job, get_job
+from services.catalog_version import catalog_changed, catalog_version
+from services.duplicate_index import duplicate_index, fingerprint, near_duplicates_within
+from services.metrics import StageTimer, pdf_stage_latency, record_pdf_stages
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# El análisis es por páginas con memoria acotada, así que el límite es solo de disco
+MAX_PDF_BYTES = int(os.environ.get('PDF_MAX_BYTES', 50 * 1024 * 1024))
+MAX_PDF_MB = MAX_PDF_BYTES // (1024 * 1024)
+# Páginas que procesa cada tarea del pool en los trabajos en segundo plano
+PDF_JOB_BATCH_PAGES = int(os.environ.get('PDF_JOB_BATCH_PAGES', 10))
+# Segundos entre intentos de un trabajo en segundo plano con el pool lleno
+POOL_RETRY_SECONDS = 1
+DEFAULT_PRODUCT_IMAGE = 'https://images.unsplash.com/photo-1578662996442-48f60103fc96?w=400&h=300&fit=crop'
+# Versión de las reglas de extracción (FIELD_PATTERNS, CATEGORY_RULES,
+# SectionSplitter). Forma parte de la clave de la caché de documentos: al
+# cambiar las reglas hay que subirla para no servir productos extraídos con
+# las anteriores (la caché de páginas guarda solo texto y no depende de ella)
+PARSER_VERSION = 1
+# Separadores entre secciones (productos) dentro del texto
+SECTION_SEPARATOR = re.compile(r'\n\s*\n\s*\n|\f|\n-{3,}')
+
 # Dependency para obtener la base de datos
 async def get_database() -> AsyncIOMotorDatabase:
     from server import db
     return db
 
+class PDFProcessingError(ValueError):
+    """Error del PDF que se informa al usuario con un 400"""
+
+# Patrones de cada campo, compilados una sola vez al importar el módulo
+FIELD_PATTERNS = {
+    'titulo': [re.compile(p, re.MULTILINE | re.IGNORECASE) for p in (
+        r'(?:título|title|nombre):\s*([^\n]+)',
+        r'^([A-Z][^:\n]+(?:\s+[A-Z][^\n]*)*)\s*$',
+        r'(?:^|\n)([A-Z][A-Za-z0-9\s:]+(?:20\d{2}|III|IV|V|VI|VII|VIII|IX|X))',
+    )],
+    'descripcion': [re.compile(p, re.MULTILINE | re.IGNORECASE | re.DOTALL) for p in (
+        r'(?:descripción|description|resumen|summary):\s*([^\n]+(?:\n[^\n:]*)*)',
+        r'(?:overview|sinopsis):\s*([^\n]+)',
+    )],
+    'pais': [re.compile(p, re.IGNORECASE) for p in (
+        r'(?:país|country|origin|procedencia):\s*([^\n]+)',
+        r'(?:desarrollado en|made in|from):\s*([^\n]+)',
+        r'\b(Estados Unidos|USA|United States|España|Spain|Francia|France|Alemania|Germany|Reino Unido|UK|Japón|Japan|China|Corea del Sur|South Korea|México|Mexico|Argentina|Brasil|Brazil|Italia|Italy|Canadá|Canada|Australia|Suecia|Sweden|Polonia|Poland|Holanda|Netherlands)\b'
+    )],
+    'fecha': [re.compile(p, re.IGNORECASE) for p in (
+        r'(?:fecha|date|año|year|lanzamiento|release):\s*(\d{1,2}[-/]\d{1,2}[-/]\d{4}|\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{4})',
+        r'(?:released|launched):\s*(\d{4})',
+        r'\b(20\d{2})\b'
+    )],
+    'plataformas': [re.compile(p, re.IGNORECASE) for p in (
+        r'(?:plataformas|platforms|available on):\s*([^\n]+)',
+        r'(?:compatible con|supports):\s*([^\n]+)',
+        r'\b(PC|PlayStation|Xbox|Nintendo|Switch|PS5|PS4|Xbox One|Xbox Series|Windows|macOS|Linux|Android|iOS|Steam|Epic Games)\b'
+    )],
+}
+PLATFORM_SEPARATOR = re.compile(r'[,;y&]|\sand\s')
+
+# Equivalentes compilados de '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d', '%d-%m-%Y',
+# '%m-%d-%Y' y '%Y-%m-%d'; strptime recompila el formato en cada llamada
+DATE_FORMATS = [
+    (re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})'), ('d', 'm', 'Y')),
+    (re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})'), ('m', 'd', 'Y')),
+    (re.compile(r'(\d{4})/(\d{1,2})/(\d{1,2})'), ('Y', 'm', 'd')),
+    (re.compile(r'(\d{1,2})-(\d{1,2})-(\d{4})'), ('d', 'm', 'Y')),
+    (re.compile(r'(\d{1,2})-(\d{1,2})-(\d{4})'), ('m', 'd', 'Y')),
+    (re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})'), ('Y', 'm', 'd')),
+]
+
+# Reglas de categoría en orden de prioridad: (categoría, palabras clave,
+# reglas de subcategoría, subcategoría por defecto o None para no cambiarla)
+CATEGORY_RULES = [
+    ('juegos', ('juego', 'game', 'gaming'),
+     [('xboxOne', ('xbox one',)), ('xboxSeries', ('xbox series', 'series x', 'series s'))], 'pc'),
+    ('aplicaciones', ('app', 'aplicación', 'software'),
+     [('apple', ('ios', 'iphone', 'ipad', 'apple'))], 'android'),
+    ('seriesTV', ('serie', 'series', 'tv'), [], None),
+    ('peliculas', ('película', 'movie', 'film'), [], None),
+    ('animes', ('anime',), [], None),
+    ('animados', ('animado', 'cartoon', 'animation'), [], None),
+    ('telenovelas', ('telenovela', 'novela'), [], None),
+    ('realitys', ('reality', 'show'), [], None),
+]
+
+# Todas las palabras clave de CATEGORY_RULES. Se buscan una sola vez por
+# sección; las reglas se evalúan después sobre el conjunto encontrado.
+# (Una alternancia única con lookahead resultó ~4 veces más lenta que
+# `palabra in texto`, que CPython resuelve con búsqueda de subcadenas en C.)
+CATEGORY_KEYWORDS = tuple(sorted({
+    word
+    for _, words, subcategories, _ in CATEGORY_RULES
+    for word in words + tuple(w for _, sub_words in subcategories for w in sub_words)
+}))
+
+def find_keywords(text_lower: str) -> set:
+    """Palabras clave de categoría contenidas en el texto (ya en minúsculas)"""
+    return {word for word in CATEGORY_KEYWORDS if word in text_lower}
+
+def _separator_run_start(text: str) -> int:
+    """
+    Posición donde empieza el tramo final de espacios, saltos y guiones, los
+    únicos caracteres que pueden formar parte de SECTION_SEPARATOR
+    """
+    i = len(text)
+    while i and (text[i - 1].isspace() or text[i - 1] == '-'):
+        i -= 1
+    return i
+
+class SectionSplitter:
+    """
+    Divide en secciones un texto que llega por páginas, igual que aplicar
+    SECTION_SEPARATOR.split al texto completo pero sin reconstruirlo.
+
+    Solo se guarda la sección en curso. Como un separador está hecho solo de
+    espacios, saltos y guiones, el tramo final con esos caracteres se deja
+    pendiente y se vuelve a examinar junto con la página siguiente.
+    """
+
+    def __init__(self, carry: str = ""):
+        self._pending: List[str] = [carry] if carry else []
+
+    def _pop_tail(self) -> str:
+        tail = []
+        while self._pending:
+            chunk = self._pending[-1]
+            i = _separator_run_start(chunk)
+            tail.append(chunk[i:])
+            if i:
+                self._pending[-1] = chunk[:i]
+                break
+            self._pending.pop()
+        return "".join(reversed(tail))
+
+    def feed(self, text: str) -> List[str]:
+        """Agrega texto y devuelve las secciones que quedaron completas"""
+        text = self._pop_tail() + text
+        # Un separador al final todavía puede alargarse con el texto siguiente
+        end = _separator_run_start(text)
+        pieces = SECTION_SEPARATOR.split(text[:end])
+        if len(pieces) == 1:
+            self._pending.append(text)
+            return []
+        sections = ["".join(self._pending) + pieces[0]] + pieces[1:-1]
+        self._pending = [pieces[-1] + text[end:]]
+        return sections
+
+    @property
+    def pending(self) -> str:
+        return "".join(self._pending)
+
+    def flush(self) -> List[str]:
+        """Devuelve las secciones del texto pendiente al terminar el documento"""
+        sections = SECTION_SEPARATOR.split(self.pending)
+        self._pending = []
+        return sections
+
 class PDFProcessor:
-    def __init__(self):
-        self.patterns = {
-            'titulo': [
-                r'(?:título|title|nombre):\s*([^\n]+)',
-                r'^([A-Z][^:\n]+(?:\s+[A-Z][^\n]*)*)\s*$',
-                r'(?:^|\n)([A-Z][A-Za-z0-9\s:]+(?:20\d{2}|III|IV|V|VI|VII|VIII|IX|X))',
-            ],
-            'descripcion': [
-                r'(?:descripción|description|resumen|summary):\s*([^\n]+(?:\n[^\n:]*)*)',
-                r'(?:overview|sinopsis):\s*([^\n]+)',
-            ],
-            'pais': [
-                r'(?:país|country|origin|procedencia):\s*([^\n]+)',
-                r'(?:desarrollado en|made in|from):\s*([^\n]+)',
-                r'\b(Estados Unidos|USA|United States|España|Spain|Francia|France|Alemania|Germany|Reino Unido|UK|Japón|Japan|China|Corea del Sur|South Korea|México|Mexico|Argentina|Brasil|Brazil|Italia|Italy|Canadá|Canada|Australia|Suecia|Sweden|Polonia|Poland|Holanda|Netherlands)\b'
-            ],
-            'fecha': [
-                r'(?:fecha|date|año|year|lanzamiento|release):\s*(\d{1,2}[-/]\d{1,2}[-/]\d{4}|\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{4})',
-                r'(?:released|launched):\s*(\d{4})',
-                r'\b(20\d{2})\b'
-            ],
-            'plataformas': [
-                r'(?:plataformas|platforms|available on):\s*([^\n]+)',
-                r'(?:compatible con|supports):\s*([^\n]+)',
-                r'\b(PC|PlayStation|Xbox|Nintendo|Switch|PS5|PS4|Xbox One|Xbox Series|Windows|macOS|Linux|Android|iOS|Steam|Epic Games)\b'
-            ],
-            'categoria': [
-                r'(?:categoría|category|tipo|type|género|genre):\s*([^\n]+)',
-                r'\b(juego|game|aplicación|app|serie|series|película|movie|telenovela|reality|animado|anime)\b'
-            ]
-        }
+    def iter_page_texts(
+        self,
+        path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        page_cache: Optional[Dict[str, str]] = None,
+        new_pages: Optional[Dict[str, str]] = None
+    ) -> Iterator[str]:
+        """
+        Devuelve el texto de las páginas [start, end) de un PDF en disco, una a
+        una. La caché de cada página se libera al terminarla, así la memoria no
+        crece con el número de páginas.
 
-    def extract_text_from_pdf(self, pdf_content: bytes) -> str:
-        """Extrae todo el texto del PDF"""
+        Con `page_cache` ({hash de página: texto}) las páginas conocidas no se
+        vuelven a analizar; el texto de las demás se agrega a `new_pages`.
+        """
+        pages = range(start + 1, end + 1) if end is not None else None
         try:
-            with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                return text
+            with pdfplumber.open(path, pages=pages) as pdf:
+                for page in pdf.pages[start:] if pages is None else pdf.pages:
+                    if page_cache is None:
+                        page_text = (page.extract_text() or "") + "\n"
+                    else:
+                        key = page_content_hash(page)
+                        page_text = page_cache.get(key)
+                        if page_text is None:
+                            page_text = (page.extract_text() or "") + "\n"
+                            new_pages[key] = page_text
+                    page.close()
+                    if page_text != "\n":
+                        yield page_text
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {str(e)}")
-            raise HTTPException(status_code=400, detail="Error al procesar el PDF")
+            raise PDFProcessingError("Error al procesar el PDF")
+
+    def iter_products(self, pages: Iterable[str], splitter: Optional[SectionSplitter] = None,
+                      timer: Optional[StageTimer] = None) -> Iterator[dict]:
+        """
+        Extrae productos a medida que se completan sus secciones. Sin
+        `splitter` la última sección se procesa al agotarse las páginas; con
+        uno, el texto pendiente queda en él para continuar en otra tanda.
+        Con `timer` se mide el tiempo de separar secciones y extraer campos.
+        """
+        final = splitter is None
+        splitter = splitter or SectionSplitter()
+        timer = timer or StageTimer()
+        for page_text in pages:
+            with timer.stage("split_sections"):
+                sections = splitter.feed(page_text)
+            with timer.stage("extract_fields"):
+                products = self.extract_products_from_sections(sections)
+            yield from products
+        if final:
+            with timer.stage("extract_fields"):
+                products = self.extract_products_from_sections(splitter.flush())
+            yield from products
 
     def extract_products_from_text(self, text: str) -> List[dict]:
         """Extrae productos del texto usando patrones"""
-        products = []
-        
         # Dividir el texto en secciones (por ejemplo, por páginas o párrafos)
         sections = self._split_into_sections(text)
-        
+        return self.extract_products_from_sections(sections)
+
+    def extract_products_from_sections(self, sections: List[str]) -> List[dict]:
+        """Extrae productos de secciones ya separadas"""
+        products = []
         for section in sections:
+            section = section.strip()
+            if len(section) <= 50:
+                continue
             product = self._extract_product_from_section(section)
             if product and product.get('titulo'):
                 products.append(product)
-        
         return products
 
     def _split_into_sections(self, text: str) -> List[str]:
         """Divide el texto en secciones lógicas"""
         # Dividir por saltos de página múltiples o patrones específicos
-        sections = re.split(r'\n\s*\n\s*\n|\f|\n-{3,}', text)
+        sections = SECTION_SEPARATOR.split(text)
         return [section.strip() for section in sections if len(section.strip()) > 50]
 
     def _extract_product_from_section(self, section: str) -> dict:
@@ -95,8 +274,8 @@ class PDFProcessor:
         }
 
         # Extraer título
-        for pattern in self.patterns['titulo']:
-            match = re.search(pattern, section, re.MULTILINE | re.IGNORECASE)
+        for pattern in FIELD_PATTERNS['titulo']:
+            match = pattern.search(section)
             if match:
                 titulo = match.group(1).strip()
                 if len(titulo) > 3 and len(titulo) < 100:
@@ -104,8 +283,8 @@ class PDFProcessor:
                     break
 
         # Extraer descripción
-        for pattern in self.patterns['descripcion']:
-            match = re.search(pattern, section, re.MULTILINE | re.IGNORECASE | re.DOTALL)
+        for pattern in FIELD_PATTERNS['descripcion']:
+            match = pattern.search(section)
             if match:
                 descripcion = match.group(1).strip()[:500]  # Limitar longitud
                 product['descripcion'] = descripcion
@@ -128,15 +307,15 @@ class PDFProcessor:
                 product['descripcion'] = ' '.join(desc_parts)[:500]
 
         # Extraer país
-        for pattern in self.patterns['pais']:
-            match = re.search(pattern, section, re.IGNORECASE)
+        for pattern in FIELD_PATTERNS['pais']:
+            match = pattern.search(section)
             if match:
                 product['pais'] = match.group(1).strip()
                 break
 
         # Extraer fecha
-        for pattern in self.patterns['fecha']:
-            match = re.search(pattern, section, re.IGNORECASE)
+        for pattern in FIELD_PATTERNS['fecha']:
+            match = pattern.search(section)
             if match:
                 fecha = match.group(1)
                 # Formatear fecha
@@ -148,12 +327,12 @@ class PDFProcessor:
 
         # Extraer plataformas
         plataformas_encontradas = set()
-        for pattern in self.patterns['plataformas']:
-            matches = re.findall(pattern, section, re.IGNORECASE)
+        for pattern in FIELD_PATTERNS['plataformas']:
+            matches = pattern.findall(section)
             for match in matches:
                 if isinstance(match, str):
                     # Dividir por comas, y, etc.
-                    plats = re.split(r'[,;y&]|\sand\s', match)
+                    plats = PLATFORM_SEPARATOR.split(match)
                     for plat in plats:
                         plat = plat.strip()
                         if plat:
@@ -161,34 +340,20 @@ class PDFProcessor:
 
         product['plataformas'] = list(plataformas_encontradas)[:10]  # Limitar cantidad
 
-        # Determinar categoría y subcategoría
-        product_lower = section.lower()
-        if any(word in product_lower for word in ['juego', 'game', 'gaming']):
-            product['categoria'] = 'juegos'
-            if any(word in product_lower for word in ['xbox one']):
-                product['subcategoria'] = 'xboxOne'
-            elif any(word in product_lower for word in ['xbox series', 'series x', 'series s']):
-                product['subcategoria'] = 'xboxSeries'
-            else:
-                product['subcategoria'] = 'pc'
-        elif any(word in product_lower for word in ['app', 'aplicación', 'software']):
-            product['categoria'] = 'aplicaciones'
-            if any(word in product_lower for word in ['ios', 'iphone', 'ipad', 'apple']):
-                product['subcategoria'] = 'apple'
+        # Determinar categoría y subcategoría con una sola pasada sobre el texto
+        keywords = find_keywords(section.lower())
+        for categoria, words, subcategories, default_subcategoria in CATEGORY_RULES:
+            if keywords.isdisjoint(words):
+                continue
+            product['categoria'] = categoria
+            for subcategoria, sub_words in subcategories:
+                if not keywords.isdisjoint(sub_words):
+                    product['subcategoria'] = subcategoria
+                    break
             else:
-                product['subcategoria'] = 'android'
-        elif any(word in product_lower for word in ['serie', 'series', 'tv']):
-            product['categoria'] = 'seriesTV'
-        elif any(word in product_lower for word in ['película', 'movie', 'film']):
-            product['categoria'] = 'peliculas'
-        elif any(word in product_lower for word in ['anime']):
-            product['categoria'] = 'animes'
-        elif any(word in product_lower for word in ['animado', 'cartoon', 'animation']):
-            product['categoria'] = 'animados'
-        elif any(word in product_lower for word in ['telenovela', 'novela']):
-            product['categoria'] = 'telenovelas'
-        elif any(word in product_lower for word in ['reality', 'show']):
-            product['categoria'] = 'realitys'
+                if default_subcategoria:
+                    product['subcategoria'] = default_subcategoria
+            break
 
         # Valores por defecto si no se encontraron
         if not product['pais']:
@@ -202,18 +367,184 @@ class PDFProcessor:
 
     def _format_date(self, date_str: str) -> str:
         """Formatea una fecha al formato YYYY-MM-DD"""
+        # Intentar varios formatos, en el mismo orden que DATE_FORMATS
+        for pattern, order in DATE_FORMATS:
+            match = pattern.fullmatch(date_str)
+            if not match:
+                continue
+            parts = dict(zip(order, map(int, match.groups())))
+            try:
+                return datetime(parts['Y'], parts['m'], parts['d']).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        return '2024-01-01'  # Fecha por defecto
+
+# Instancia compartida: el procesador no guarda estado entre documentos
+pdf_processor = PDFProcessor()
+
+def _hash_pdf_object(digest, obj, seen: Dict[int, int]):
+    """
+    Añade al hash un objeto PDF con sus referencias resueltas: los streams
+    por sus atributos y sus datos, los diccionarios con las claves en orden.
+    Un objeto ya visto se marca por el orden en que apareció y no por su
+    número, que cambia entre ediciones del mismo catálogo.
+    """
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in seen:
+            digest.update(b"@%d" % seen[obj.objid])
+            return
+        seen[obj.objid] = len(seen)
+        obj = resolve1(obj)
+    if isinstance(obj, PDFStream):
+        _hash_pdf_object(digest, obj.attrs, seen)
+        digest.update(obj.get_rawdata() or obj.get_data())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=str):
+            digest.update(str(key).encode() + b"=")
+            _hash_pdf_object(digest, obj[key], seen)
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"[")
+        for item in obj:
+            _hash_pdf_object(digest, item, seen)
+        digest.update(b"]")
+    else:
+        digest.update(repr(obj).encode() + b";")
+
+def page_content_hash(page) -> str:
+    """
+    Hash del contenido de una página sin analizarla: tamaño, rotación, los
+    streams de contenido tal como están en el archivo y los recursos que
+    usan (fuentes y XObjects, con sus datos). Dos páginas con el mismo
+    stream `q /X1 Do Q` pero formularios distintos no comparten hash; una
+    página idéntica en otra edición del catálogo produce el mismo.
+    """
+    page_obj = page.page_obj
+    digest = hashlib.sha256(repr((page_obj.mediabox, page_obj.attrs.get('Rotate'))).encode())
+    for stream in page_obj.contents:
+        stream = resolve1(stream)
+        digest.update(stream.get_rawdata() or stream.get_data())
+    _hash_pdf_object(digest, page_obj.resources, {})
+    return digest.hexdigest()
+
+def hash_pdf_pages(path: str) -> List[str]:
+    """Hash de cada página de un PDF en disco. Se ejecuta en el pool de procesos."""
+    try:
+        with pdfplumber.open(path) as pdf:
+            return [page_content_hash(page) for page in pdf.pages]
+    except Exception as e:
+        logger.error(f"Error opening PDF: {str(e)}")
+        raise PDFProcessingError("Error al procesar el PDF")
+
+def process_pdf_file(path: str, page_cache: Dict[str, str]) -> dict:
+    """Extrae los productos de un PDF en disco. Se ejecuta en el pool de procesos."""
+    new_pages = {}
+    text_length = 0
+    has_text = False
+    timer = StageTimer()
+
+    def pages():
+        nonlocal text_length, has_text
+        page_texts = pdf_processor.iter_page_texts(path, page_cache=page_cache, new_pages=new_pages)
+        for page_text in timer.timed_iter("extract_text", page_texts):
+            text_length += len(page_text)
+            has_text = has_text or bool(page_text.strip())
+            yield page_text
+
+    products = list(pdf_processor.iter_products(pages(), timer=timer))
+
+    if not has_text:
+        raise PDFProcessingError("No se pudo extraer texto del PDF")
+    
+    if not products:
+        raise PDFProcessingError("No se encontraron productos válidos en el PDF")
+
+    return {
+        "products": products, "total_text_length": text_length, "new_pages": new_pages,
+        "timings": timer.totals
+    }
+
+def process_page_batch(path: str, start: int, end: int, carry: str, final: bool, page_cache: Dict[str, str]) -> dict:
+    """
+    Procesa las páginas [start, end) continuando el texto pendiente `carry`
+    de la tanda anterior. Se ejecuta en el pool de procesos.
+    """
+    new_pages = {}
+    text_length = 0
+    splitter = SectionSplitter(carry)
+    timer = StageTimer()
+
+    def pages():
+        nonlocal text_length
+        page_texts = pdf_processor.iter_page_texts(path, start, end, page_cache, new_pages)
+        for page_text in timer.timed_iter("extract_text", page_texts):
+            text_length += len(page_text)
+            yield page_text
+
+    products = list(pdf_processor.iter_products(pages(), splitter, timer))
+    if final:
+        # En la última tanda el texto pendiente también es una sección completa
+        with timer.stage("extract_fields"):
+            products.extend(pdf_processor.extract_products_from_sections(splitter.flush()))
+    return {
+        "products": products, "carry": splitter.pending,
+        "text_length": text_length, "new_pages": new_pages, "timings": timer.totals
+    }
+
+def _finalize_products(products: List[dict]) -> List[dict]:
+    """Filtra los productos sin título útil y les agrega la imagen por defecto"""
+    valid_products = []
+    for product in products:
+        if product.get('titulo') and len(product['titulo'].strip()) > 2:
+            product['imagen'] = DEFAULT_PRODUCT_IMAGE
+            valid_products.append(product)
+    return valid_products
+
+def _copy_and_hash(source, destination) -> str:
+    digest = hashlib.sha256()
+    while True:
+        chunk = source.read(1024 * 1024)
+        if not chunk:
+            return digest.hexdigest()
+        digest.update(chunk)
+        destination.write(chunk)
+
+async def _spool_upload(file: UploadFile) -> tuple:
+    """Copia la subida a un archivo temporal por bloques; devuelve (ruta, SHA-256)"""
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
         try:
-            # Intentar varios formatos
-            formats = ['%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d', '%d-%m-%Y', '%m-%d-%Y', '%Y-%m-%d']
-            for fmt in formats:
-                try:
-                    date_obj = datetime.strptime(date_str, fmt)
-                    return date_obj.strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-            return '2024-01-01'  # Fecha por defecto
-        except:
-            return '2024-01-01'
+            digest = await run_in_threadpool(_copy_and_hash, file.file, tmp)
+        except BaseException:
+            # Límite de tamaño, cliente desconectado o cancelación: no dejar el archivo a medias
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    return tmp.name, digest
+
+async def _store_new_pages(db: AsyncIOMotorDatabase, result: dict, requested: int):
+    """Guarda el texto de las páginas analizadas y actualiza los contadores"""
+    new_pages = result.pop("new_pages")
+    pdf_cache.record_pages(hits=requested - len(new_pages), misses=len(new_pages))
+    await pdf_cache.put_pages(db, new_pages)
+
+def _document_key(digest: str) -> str:
+    """Clave de la caché de documentos: versión del extractor y SHA-256 del PDF"""
+    return f"{PARSER_VERSION}:{digest}"
+
+async def _process_pdf_with_cache(db: AsyncIOMotorDatabase, path: str, digest: str) -> dict:
+    """Resultado del PDF desde la caché, o analizando solo las páginas nuevas"""
+    cached = await pdf_cache.get_document(db, _document_key(digest))
+    if cached:
+        return cached
+
+    page_hashes = await run_in_pool(hash_pdf_pages, path)
+    page_cache = await pdf_cache.get_pages(db, page_hashes)
+    result = await run_in_pool(process_pdf_file, path, page_cache)
+    record_pdf_stages(result.pop("timings"))
+    await _store_new_pages(db, result, len(page_hashes))
+
+    result["total_pages"] = len(page_hashes)
+    await pdf_cache.put_document(db, _document_key(digest), result)
+    return result
 
 @router.post("/pdf/upload")
 async def upload_pdf(
@@ -225,32 +556,19 @@ async def upload_pdf(
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
         
-        if file.size > 10 * 1024 * 1024:  # 10MB
-            raise HTTPException(status_code=400, detail="El archivo es demasiado grande (máximo 10MB)")
+        if file.size > MAX_PDF_BYTES:
+            raise HTTPException(status_code=400, detail=f"El archivo es demasiado grande (máximo {MAX_PDF_MB}MB)")
 
-        # Leer el contenido del archivo
-        content = await file.read()
-        
-        # Procesar PDF
-        processor = PDFProcessor()
-        text = processor.extract_text_from_pdf(content)
-        
-        if not text.strip():
-            raise HTTPException(status_code=400, detail="No se pudo extraer texto del PDF")
-
-        # Extraer productos
-        products = processor.extract_products_from_text(text)
-        
-        if not products:
-            raise HTTPException(status_code=400, detail="No se encontraron productos válidos en el PDF")
+        # Copiar el archivo a disco y procesarlo fuera del event loop
+        path, digest = await _spool_upload(file)
+        try:
+            result = await _process_pdf_with_cache(db, path, digest)
+        finally:
+            os.unlink(path)
+        products = result["products"]
 
         # Filtrar productos válidos
-        valid_products = []
-        for product in products:
-            if product.get('titulo') and len(product['titulo'].strip()) > 2:
-                # Agregar imagen por defecto
-                product['imagen'] = 'https://images.unsplash.com/photo-1578662996442-48f60103fc96?w=400&h=300&fit=crop'
-                valid_products.append(product)
+        valid_products = _finalize_products(products)
 
         if not valid_products:
             raise HTTPException(status_code=400, detail="No se encontraron productos válidos para procesar")
@@ -259,47 +577,339 @@ async def upload_pdf(
             "success": True,
             "message": f"Se extrajeron {len(valid_products)} productos del PDF",
             "products": valid_products,
-            "total_text_length": len(text),
+            "total_text_length": result["total_text_length"],
             "filename": file.filename
         }
 
     except HTTPException:
         raise
+    except PDFProcessingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolBusyError:
+        raise HTTPException(
+            status_code=503,
+            detail="Hay demasiados PDF en proceso, intenta nuevamente en unos segundos",
+            headers={"Retry-After": "10"}
+        )
+    except JobTimeoutError:
+        raise HTTPException(status_code=504, detail="El procesamiento del PDF tomó demasiado tiempo")
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
+async def _run_in_pool_when_free(fn, *args):
+    """
+    Como run_in_pool, pero un trabajo en segundo plano espera turno en vez
+    de fallar. La espera dura como mucho PDF_JOB_TIMEOUT: con el pool
+    atascado o saturado se lanza PoolBusyError y el trabajo se marca fallido.
+    """
+    deadline = time.monotonic() + PDF_JOB_TIMEOUT
+    while True:
+        try:
+            return await run_in_pool(fn, *args)
+        except PoolBusyError:
+            if time.monotonic() + POOL_RETRY_SECONDS > deadline:
+                raise
+            await asyncio.sleep(POOL_RETRY_SECONDS)
+
+async def _run_pdf_job(job: PDFJob, path: str, digest: str, db: AsyncIOMotorDatabase):
+    """Procesa el PDF por tandas de páginas publicando el progreso en el trabajo"""
+    try:
+        cached = await pdf_cache.get_document(db, _document_key(digest))
+        if cached:
+            total_pages = cached.get("total_pages", 0)
+            await job.update(status="processing", total_pages=total_pages)
+            await job.add_products(_finalize_products(cached["products"]), total_pages)
+        else:
+            page_hashes = await _run_in_pool_when_free(hash_pdf_pages, path)
+            total_pages = len(page_hashes)
+            await job.update(status="processing", total_pages=total_pages)
+
+            carry = ""
+            text_length = 0
+            timings = StageTimer()
+            for start in range(0, total_pages, PDF_JOB_BATCH_PAGES):
+                end = min(start + PDF_JOB_BATCH_PAGES, total_pages)
+                batch_hashes = page_hashes[start:end]
+                # Solo el texto guardado de esta tanda: la memoria no crece con el PDF
+                page_cache = await pdf_cache.get_pages(db, batch_hashes)
+                batch = await _run_in_pool_when_free(
+                    process_page_batch, path, start, end, carry, end == total_pages, page_cache
+                )
+                for stage, seconds in batch.pop("timings").items():
+                    timings.add(stage, seconds)
+                await _store_new_pages(db, batch, len(batch_hashes))
+                carry = batch["carry"]
+                text_length += batch["text_length"]
+                await job.add_products(_finalize_products(batch["products"]), end)
+            record_pdf_stages(timings.totals)
+
+            if job.products:
+                await pdf_cache.put_document(db, _document_key(digest), {
+                    "products": job.products, "total_pages": total_pages,
+                    "total_text_length": text_length
+                })
+
+        if job.products:
+            await job.update(status="completed")
+        else:
+            await job.update(status="failed", error="No se encontraron productos válidos en el PDF")
+
+    except PDFProcessingError as e:
+        await job.update(status="failed", error=str(e))
+    except JobTimeoutError:
+        await job.update(status="failed", error="El procesamiento del PDF tomó demasiado tiempo")
+    except PoolBusyError:
+        logger.error(f"PDF job {job.id} gave up waiting for a free worker")
+        await job.update(status="failed", error="Hay demasiados PDF en proceso, intenta nuevamente más tarde")
+    except Exception as e:
+        logger.error(f"Error processing PDF job {job.id}: {str(e)}")
+        await job.update(status="failed", error="Error interno del servidor")
+    finally:
+        os.unlink(path)
+
+@router.post("/pdf/jobs", status_code=202)
+async def create_pdf_job(
+    file: UploadFile = File(...),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Inicia la importación en segundo plano y devuelve el id del trabajo"""
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
+
+    if file.size > MAX_PDF_BYTES:
+        raise HTTPException(status_code=400, detail=f"El archivo es demasiado grande (máximo {MAX_PDF_MB}MB)")
+
+    job = create_job(file.filename)
+    if job is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Hay demasiados PDF en proceso, intenta nuevamente en unos segundos",
+            headers={"Retry-After": "10"}
+        )
+
+    try:
+        # Copiar el archivo a disco para que los workers lo abran por tandas
+        path, digest = await _spool_upload(file)
+    except Exception as e:
+        logger.error(f"Error storing PDF for job {job.id}: {str(e)}")
+        await job.update(status="failed", error="Error interno del servidor")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+    job.task = asyncio.create_task(_run_pdf_job(job, path, digest, db))
+    return {"job_id": job.id, "status": job.status}
+
+@router.get("/pdf/cache/stats")
+async def get_pdf_cache_stats():
+    """Aciertos y fallos de la caché de importación desde que arrancó el proceso"""
+    return pdf_cache.stats
+
+@router.get("/pdf/jobs/{job_id}")
+async def get_pdf_job(job_id: str, since: int = Query(0, ge=0)):
+    """Progreso del trabajo con los productos encontrados desde la posición `since`"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job.snapshot(since)
+
+@router.get("/pdf/jobs/{job_id}/events")
+async def stream_pdf_job(job_id: str):
+    """Server-Sent Events con el progreso y cada nueva tanda de productos"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+    async def events():
+        sent = 0
+        version = -1
+        while True:
+            if job.version != version:
+                version = job.version
+                snapshot = job.snapshot(sent)
+                sent = snapshot["next"]
+                event = "done" if job.finished else "progress"
+                yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+                if job.finished:
+                    return
+            elif not await job.wait_for_change(version, timeout=15):
+                # Mantener viva la conexión a través de proxies
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# Campos que solo se escriben al crear un producto desde un PDF
+PDF_INSERT_ONLY = ("id", "created_at", "imagen")
+
+def _result(index: int, titulo: Optional[str], status: str, product_id: Optional[str] = None,
+            reason: Optional[str] = None, duplicate_of: Optional[dict] = None) -> dict:
+    return {
+        "index": index, "titulo": titulo, "status": status, "id": product_id, "reason": reason,
+        "duplicate_of": duplicate_of
+    }
+
+def _saved_product(doc: dict, current: Optional[dict]) -> dict:
+    """El producto como queda tras bulk_upsert: al actualizar se conservan los campos de PDF_INSERT_ONLY"""
+    if current is None:
+        return doc
+    product = {f: v for f, v in current.items() if f not in INTERNAL_FIELDS}
+    product.update({f: v for f, v in doc.items() if f not in PDF_INSERT_ONLY})
+    return product
+
+async def _near_duplicates(pending: Dict[str, tuple], existing: Dict[str, dict],
+                           repo: ProductRepository, db: AsyncIOMotorDatabase) -> Dict[str, dict]:
+    """
+    Productos nuevos de la importación (su clave natural no existe) que son
+    casi duplicados, por título y descripción, de un producto del catálogo
+    de la misma categoría y subcategoría o de otro anterior del mismo PDF.
+    Devuelve clave natural -> { id, index, titulo, similarity } del parecido.
+    """
+    keys = list(pending)
+    await duplicate_index.ensure_current(await catalog_version.get(db), repo)
+    signatures, band_keys = fingerprint([fields for _, fields in pending.values()])
+    in_catalog = duplicate_index.nearest(signatures, band_keys, keys)
+    in_import = near_duplicates_within(signatures, band_keys)
+
+    found = {}
+    for position, key in enumerate(keys):
+        if key in existing:
+            continue
+        if in_catalog[position]:
+            product_id, titulo, similarity = in_catalog[position]
+            found[key] = {"id": product_id, "index": None, "titulo": titulo, "similarity": round(similarity, 2)}
+        elif in_import[position]:
+            other, similarity = in_import[position]
+            index, fields = pending[keys[other]]
+            found[key] = {"id": None, "index": index, "titulo": fields["titulo"], "similarity": round(similarity, 2)}
+    return found
+
 @router.post("/pdf/save-products")
 async def save_pdf_products(
     products: List[dict],
+    duplicates: str = Query("flag", pattern="^(flag|skip)$"),
+    repo: ProductRepository = Depends(get_product_repository),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
+    """
+    Guarda los productos importados en una sola escritura masiva.
+
+    Cada producto se identifica por su clave natural (título normalizado,
+    categoría y subcategoría), así que volver a importar el mismo PDF
+    actualiza los productos existentes en lugar de duplicarlos. La imagen
+    solo se asigna al crear, para no pisar las que se cambiaron a mano.
+
+    Los productos nuevos que son casi duplicados de otro (mismo título con
+    erratas o de otra edición del catálogo, descripción parecida) se marcan
+    en `duplicate_of`; con `duplicates=skip` además no se guardan.
+    """
     try:
-        saved_products = []
-        
-        for product_data in products:
+        results: List[Optional[dict]] = [None] * len(products)
+        pending = {}  # clave natural -> (índice, campos)
+
+        for index, product_data in enumerate(products):
+            titulo = product_data.get('titulo') if isinstance(product_data, dict) else None
             # Validar datos requeridos
-            if not product_data.get('titulo'):
+            if not titulo:
+                results[index] = _result(index, titulo, "skipped", reason="Falta el título")
+                continue
+            try:
+                fields = ProductCreate(**product_data).dict()
+            except ValidationError as e:
+                results[index] = _result(index, titulo, "skipped", reason=f"Datos no válidos: {e.error_count()} errores")
                 continue
-                
-            # Agregar campos adicionales
-            product_data['id'] = str(datetime.now().timestamp()).replace('.', '')
-            product_data['created_at'] = datetime.utcnow()
-            product_data['updated_at'] = datetime.utcnow()
-            
-            # Insertar en la base de datos
-            result = await db.products.insert_one(product_data)
-            
-            if result.inserted_id:
-                saved_products.append(product_data)
 
+            key = product_natural_key(fields['titulo'], fields['categoria'], fields['subcategoria'])
+            if key in pending:
+                results[index] = _result(index, titulo, "skipped", reason="Duplicado dentro de la importación")
+                continue
+            pending[key] = (index, fields)
+
+        # Una consulta para saber qué productos ya existen y si han cambiado
+        existing = await repo.find_by_natural_keys(pending) if pending else {}
+
+        near = {}
+        if pending:
+            try:
+                near = await _near_duplicates(pending, existing, repo, db)
+            except Exception as e:
+                # La detección es una ayuda: sin ella la importación sigue igual
+                logger.error(f"Error detecting near duplicates: {str(e)}")
+
+        now = datetime.utcnow()
+        docs = []
+        doc_keys = []
+        for key, (index, fields) in pending.items():
+            current = existing.get(key)
+            duplicate_of = near.get(key)
+            if duplicate_of and duplicates == "skip":
+                if duplicate_of["id"]:
+                    reason = "Casi duplicado de un producto existente"
+                else:
+                    reason = "Casi duplicado de otro producto de la importación"
+                results[index] = _result(index, fields['titulo'], "skipped", reason=reason, duplicate_of=duplicate_of)
+                continue
+            changes = {f: v for f, v in fields.items() if f != 'imagen'}
+            if current and all(current.get(f) == v for f, v in changes.items()):
+                results[index] = _result(index, fields['titulo'], "skipped", current["id"], "Sin cambios")
+                continue
+
+            new_id = str(uuid.uuid4())
+            docs.append({**fields, "id": new_id, "created_at": now, "updated_at": now})
+            doc_keys.append(key)
+            results[index] = _result(
+                index, fields['titulo'], "updated" if current else "created",
+                current["id"] if current else new_id, duplicate_of=duplicate_of
+            )
+
+        saved: Dict[int, dict] = {}  # índice -> producto tal como quedó guardado
+        if docs:
+            try:
+                with pdf_stage_latency.time("save"):
+                    statuses = await repo.bulk_upsert(docs, insert_only=PDF_INSERT_ONLY)
+            finally:
+                await catalog_changed(db, "products")
+
+            raced = {}
+            for doc, key, status in zip(docs, doc_keys, statuses):
+                index, _ = pending[key]
+                entry = results[index]
+                if status == "failed":
+                    results[index] = _result(
+                        index, entry["titulo"], "failed", reason="Error al guardar el producto",
+                        duplicate_of=entry["duplicate_of"]
+                    )
+                elif entry["status"] == "created" and status == "updated":
+                    # Otro proceso lo creó entre la consulta y la escritura
+                    entry["status"] = "updated"
+                    raced[key] = doc
+                else:
+                    saved[index] = _saved_product(doc, existing.get(key))
+            if raced:
+                # El id y la fecha de alta son los del producto que creó el otro proceso
+                stored = await repo.find_by_natural_keys(raced)
+                for key, doc in raced.items():
+                    index, _ = pending[key]
+                    current = stored.get(key)
+                    results[index]["id"] = current["id"] if current else None
+                    if current:
+                        saved[index] = _saved_product(doc, current)
+
+        counts = {status: 0 for status in ("created", "updated", "skipped", "failed")}
+        for entry in results:
+            counts[entry["status"]] += 1
+        saved_count = counts["created"] + counts["updated"]
+
+        # Los productos que no se pudieron guardar se informan en `results` y
+        # `failed`; success solo es false si la petición entera falla (500)
         return {
             "success": True,
-            "message": f"Se guardaron {len(saved_products)} productos en el catálogo",
-            "saved_count": len(saved_products),
-            "products": saved_products
+            "message": f"Se guardaron {saved_count} productos en el catálogo",
+            "saved_count": saved_count,
+            "products": [saved[index] for index in sorted(saved)],
+            **counts,
+            "near_duplicates": sum(1 for entry in results if entry["duplicate_of"]),
+            "results": results
         }
 
     except Exception as e:
         logger.error(f"Error saving PDF products: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error al guardar los productos")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error al guardar los productos")
@@ -1,8 +1,27 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Set, Tuple
 from models.Product import Product, ProductCreate, ProductUpdate
+from database.image_store import InvalidImageError, externalize_data_url
+from database.product_repository import (
+    TOMBSTONE_RETENTION_DAYS, DuplicateProductError, ProductRepository, get_product_repository
+)
+from services.compression import use_cached_encodings
+from services.response_cache import response_cache
+from services.serialization import render_json, render_products
+from services.catalog_version import catalog_changed, catalog_version, products_changed
+from services.catalog_engine import catalog_engine
+from services.suggest_index import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, suggest_index
+from services.ndjson import (
+    DEFAULT_BATCH_SIZE, GZIP_MEDIA_TYPE, MAX_BATCH_SIZE, NDJSON_MEDIA_TYPE,
+    ImportReport, LineTooLongError, decode_lines, encode_lines, is_gzip_body, parse_product_line
+)
 import os
-from datetime import datetime
+import base64
+import json
+import time
+import zlib
+from datetime import datetime, timedelta
 import logging
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
@@ -14,55 +33,307 @@ async def get_database() -> AsyncIOMotorDatabase:
     from server import db
     return db
 
-@router.get("/products", response_model=List[Product])
+# Campos que se pueden pedir con ?fields= (el resto del documento se omite)
+PRODUCT_FIELDS = set(Product.model_fields.keys())
+MAX_PAGE_SIZE = 1000
+DUPLICATE_PRODUCT_MESSAGE = "Ya existe un producto con ese título en la misma categoría"
+DEFAULT_CHANGES_PAGE = 500
+# Los cambios más recientes que esto (segundos) esperan a la siguiente
+# consulta: una escritura que reservó su secuencia antes que otra puede
+# terminar después, y el token no debe saltársela
+CHANGES_SETTLE_SECONDS = float(os.environ.get('CHANGES_SETTLE_SECONDS', 1))
+
+def _encode_cursor(payload: dict) -> str:
+    """Codifica la posición de la página siguiente como un token opaco"""
+    raw = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> dict:
+    """Decodifica un cursor generado por _encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        if "o" in payload:
+            return {"o": int(payload["o"])}
+        return {"c": datetime.fromisoformat(payload["c"]), "i": str(payload["i"])}
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def _decode_change_token(token: Optional[str]) -> Tuple[int, float]:
+    """(secuencia, instante en que se emitió) de un token de /products/changes; sin token, desde el principio"""
+    if not token:
+        return 0, time.time()
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        return int(payload["s"]), float(payload["t"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Token de cambios inválido")
+
+def _parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """Convierte ?fields=titulo,pais en el conjunto de campos pedidos"""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - PRODUCT_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(sorted(unknown))}")
+    return requested
+
+def _cache_key(categoria, subcategoria, search, limit, cursor, fields) -> tuple:
+    """Parámetros normalizados: las variantes equivalentes comparten entrada"""
+    requested = tuple(sorted({f.strip() for f in fields.split(",") if f.strip()})) if fields else None
+    return (categoria or None, subcategoria or None, (search or "").strip() or None, limit, cursor, requested)
+
+@router.get("/products")
 async def get_products(
+    request: Request,
     categoria: Optional[str] = Query(None),
     subcategoria: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    repo: ProductRepository = Depends(get_product_repository)
 ):
+    """
+    Lista productos ordenados por created_at descendente, o por relevancia
+    cuando se usa `search`.
+
+    Con `limit` la respuesta es una página y el cursor para pedir la
+    siguiente se devuelve en la cabecera X-Next-Cursor. Con `fields` solo
+    se devuelven esos campos (más `id`), útil para omitir `imagen`.
+
+    Las respuestas se guardan serializadas (y comprimidas, según se pidan)
+    en la caché de lecturas hasta la siguiente escritura del catálogo.
+    """
     try:
-        # Construir filtros
-        filters = {}
-        if categoria:
-            filters["categoria"] = categoria
-        if subcategoria:
-            filters["subcategoria"] = subcategoria
-        
-        # Búsqueda por texto
-        if search:
-            search_regex = {"$regex": search, "$options": "i"}
-            filters["$or"] = [
-                {"titulo": search_regex},
-                {"descripcion": search_regex},
-                {"pais": search_regex},
-                {"plataformas": {"$in": [search_regex]}}
-            ]
-        
-        products = await db.products.find(filters).to_list(1000)
-        return [Product(**product) for product in products]
+        requested = _parse_fields(fields)
+        search = (search or "").strip() or None
+
+        cache_key = _cache_key(categoria, subcategoria, search, limit, cursor, fields)
+        cached = response_cache.get("products", cache_key)
+        if cached:
+            use_cached_encodings(request, cached)
+            return Response(content=cached.body, media_type="application/json", headers=cached.headers)
+        generation = response_cache.generation("products")
+
+        position = _decode_cursor(cursor) if cursor else None
+        products, next_position = await repo.list_products(
+            categoria, subcategoria, search, limit, position, requested
+        )
+
+        headers = {}
+        if next_position:
+            headers["X-Next-Cursor"] = _encode_cursor(next_position)
+
+        body = render_products(products) if requested is None else render_json(products)
+        use_cached_encodings(request, response_cache.put("products", cache_key, body, headers, generation))
+        return Response(content=body, media_type="application/json", headers=headers)
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting products: {str(e)}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+@router.get("/products/suggest")
+async def suggest_products(
+    q: str = Query("", max_length=100),
+    limit: int = Query(DEFAULT_SUGGESTIONS, ge=1, le=MAX_SUGGESTIONS),
+    repo: ProductRepository = Depends(get_product_repository),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Autocompletado: hasta `limit` productos (id, titulo, categoria,
+    subcategoria) cuyas palabras de título, plataformas o país empiezan por
+    las de `q`, sin acentos ni mayúsculas. Se sirve del índice en memoria.
+    """
+    try:
+        await suggest_index.ensure_current(await catalog_version.get(db), repo)
+        return Response(content=render_json(suggest_index.suggest(q, limit)), media_type="application/json")
+
+    except Exception as e:
+        logger.error(f"Error suggesting products: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.get("/products/facets")
+async def get_product_facets(
+    categoria: Optional[List[str]] = Query(None),
+    subcategoria: Optional[List[str]] = Query(None),
+    pais: Optional[List[str]] = Query(None),
+    plataforma: Optional[List[str]] = Query(None),
+    limit: int = Query(0, ge=0, le=MAX_PAGE_SIZE),
+    repo: ProductRepository = Depends(get_product_repository),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Recuentos del catálogo desde el motor en memoria, sin consultar la base
+    de datos: `total` de productos que cumplen los filtros (un parámetro
+    repetido es OR, parámetros distintos AND) y `facets` con cuántos hay por
+    categoría, subcategoría, país y plataforma. Con `limit`, `items` trae
+    los más recientes (sin imagen ni descripción).
+    """
+    try:
+        await catalog_engine.ensure_current(await catalog_version.get(db), repo)
+        filters = {"categoria": categoria, "subcategoria": subcategoria, "pais": pais, "plataformas": plataforma}
+        filters = {field: values for field, values in filters.items() if values}
+        body = render_json({
+            "total": catalog_engine.count(filters),
+            "facets": catalog_engine.facets(filters),
+            "items": catalog_engine.items(filters, limit),
+        })
+        return Response(content=body, media_type="application/json")
+
+    except Exception as e:
+        logger.error(f"Error getting product facets: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.get("/products/changes")
+async def get_product_changes(
+    since: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_CHANGES_PAGE, ge=1, le=MAX_PAGE_SIZE),
+    repo: ProductRepository = Depends(get_product_repository)
+):
+    """
+    Sincronización incremental: productos creados o modificados
+    ({"op": "upsert", "id", "product"}) y borrados ({"op": "delete", "id"})
+    después del token `since`, en orden. Sin `since` devuelve el catálogo
+    entero como upserts. Se sigue pidiendo con `next` mientras `has_more`;
+    un catálogo sin cambios responde con una lista vacía.
+
+    Las marcas de borrado se conservan TOMBSTONE_RETENTION_DAYS días: un
+    token más antiguo responde 410 y el cliente debe empezar de cero.
+    """
+    try:
+        seq, issued_at = _decode_change_token(since)
+        if time.time() - issued_at > TOMBSTONE_RETENTION_DAYS * 86400:
+            raise HTTPException(status_code=410, detail="Token de cambios caducado: vuelve a sincronizar sin `since`")
+
+        changes = await repo.list_changes(seq, limit + 1)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        settled_before = datetime.utcnow() - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+        for index, change in enumerate(changes):
+            if change["at"] > settled_before:
+                changes, has_more = changes[:index], False
+                break
+
+        # El token recuerda desde cuándo el cliente tiene todo lo anterior:
+        # las marcas de borrado posteriores siguen guardadas hasta la caducidad
+        last_seq = changes[-1]["seq"] if changes else seq
+        covered_until = changes[-1]["at"] if has_more else settled_before
+        next_token = _encode_cursor({"s": last_seq, "t": int((covered_until - datetime(1970, 1, 1)).total_seconds())})
+
+        body = render_json({
+            "changes": [{k: v for k, v in change.items() if k not in ("seq", "at")} for change in changes],
+            "next": next_token,
+            "has_more": has_more,
+        })
+        return Response(content=body, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting product changes: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.get("/products/export")
+async def export_products(
+    categoria: Optional[str] = Query(None),
+    subcategoria: Optional[str] = Query(None),
+    compress: bool = Query(False),
+    repo: ProductRepository = Depends(get_product_repository)
+):
+    """
+    Exporta el catálogo como NDJSON (un producto por línea) leyendo del
+    backend por lotes, así la memoria no depende del tamaño del catálogo.
+    Con `compress=true` la salida es un .ndjson.gz.
+    """
+    filename = "catalog.ndjson.gz" if compress else "catalog.ndjson"
+    return StreamingResponse(
+        encode_lines(repo.iter_products(categoria, subcategoria), compress),
+        media_type=GZIP_MEDIA_TYPE if compress else NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+async def _write_import_batch(repo: ProductRepository, batch: List[Tuple[int, Product]], report: ImportReport):
+    """Upsert por clave natural; id y created_at solo se fijan al crear"""
+    statuses = await repo.bulk_upsert([product.dict() for _, product in batch])
+    for (line_number, _), status in zip(batch, statuses):
+        if status == "created":
+            report.created += 1
+        elif status == "updated":
+            report.updated += 1
+        else:
+            report.error(line_number, "Error al guardar el producto")
+
+@router.post("/products/import")
+async def import_products(
+    request: Request,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    repo: ProductRepository = Depends(get_product_repository),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Importa NDJSON (el formato de /products/export, también gzip) a medida
+    que llega el cuerpo, escribiendo cada `batch_size` productos. Los
+    productos se identifican por su clave natural: reimportar actualiza.
+    """
+    report = ImportReport()
+    batch: List[Tuple[int, Product]] = []
+    try:
+        async for line_number, line in decode_lines(request.stream(), is_gzip_body(request)):
+            report.processed += 1
+            try:
+                product = parse_product_line(line)
+                product.imagen = await externalize_data_url(db, product.imagen)
+            except ValueError as e:
+                report.error(line_number, str(e))
+                continue
+            batch.append((line_number, product))
+            if len(batch) >= batch_size:
+                await _write_import_batch(repo, batch, report)
+                batch = []
+                report.batch_done("Product import")
+        if batch:
+            await _write_import_batch(repo, batch, report)
+            report.batch_done("Product import")
+    except LineTooLongError as e:
+        report.error(None, str(e))
+    except zlib.error:
+        report.error(None, "El cuerpo no es un gzip válido")
+    except Exception as e:
+        logger.error(f"Error importing products: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+    finally:
+        if report.created or report.updated:
+            await catalog_changed(db, "products")
+
+    return report.as_dict()
+
 @router.post("/products", response_model=Product)
 async def create_product(
     product_data: ProductCreate,
+    repo: ProductRepository = Depends(get_product_repository),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     try:
         product_dict = product_data.dict()
+        # Las imágenes subidas como base64 se guardan aparte y se referencian por URL
+        product_dict["imagen"] = await externalize_data_url(db, product_dict["imagen"])
         product_obj = Product(**product_dict)
         
-        # Insertar en MongoDB
-        result = await db.products.insert_one(product_obj.dict())
-        
-        if result.inserted_id:
-            return product_obj
-        else:
-            raise HTTPException(status_code=500, detail="Error al crear el producto")
+        # La clave natural (única) la añade el repositorio
+        await repo.create_product(product_obj.dict())
+        await products_changed(db, product_obj.dict())
+        return product_obj
     
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=f"Imagen no válida: {str(e)}")
+    except DuplicateProductError:
+        raise HTTPException(status_code=409, detail=DUPLICATE_PRODUCT_MESSAGE)
     except Exception as e:
         logger.error(f"Error creating product: {str(e)}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -71,33 +342,28 @@ async def create_product(
 async def update_product(
     product_id: str, 
     product_data: ProductUpdate,
+    repo: ProductRepository = Depends(get_product_repository),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     try:
-        # Verificar que el producto existe
-        existing_product = await db.products.find_one({"id": product_id})
-        if not existing_product:
-            raise HTTPException(status_code=404, detail="Producto no encontrado")
-        
         # Preparar datos de actualización
         update_data = {k: v for k, v in product_data.dict().items() if v is not None}
+        if "imagen" in update_data:
+            update_data["imagen"] = await externalize_data_url(db, update_data["imagen"])
         update_data["updated_at"] = datetime.utcnow()
         
-        # Actualizar en MongoDB
-        result = await db.products.update_one(
-            {"id": product_id},
-            {"$set": update_data}
-        )
-        
-        if result.modified_count:
-            # Obtener producto actualizado
-            updated_product = await db.products.find_one({"id": product_id})
-            return Product(**updated_product)
-        else:
-            raise HTTPException(status_code=500, detail="Error al actualizar el producto")
+        updated_product = await repo.update_product(product_id, update_data)
+        if not updated_product:
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+        await products_changed(db, updated_product)
+        return Product(**updated_product)
     
     except HTTPException:
         raise
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=f"Imagen no válida: {str(e)}")
+    except DuplicateProductError:
+        raise HTTPException(status_code=409, detail=DUPLICATE_PRODUCT_MESSAGE)
     except Exception as e:
         logger.error(f"Error updating product: {str(e)}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -105,21 +371,14 @@ async def update_product(
 @router.delete("/products/{product_id}")
 async def delete_product(
     product_id: str,
+    repo: ProductRepository = Depends(get_product_repository),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     try:
-        # Verificar que el producto existe
-        existing_product = await db.products.find_one({"id": product_id})
-        if not existing_product:
+        if not await repo.delete_product(product_id):
             raise HTTPException(status_code=404, detail="Producto no encontrado")
-        
-        # Eliminar de MongoDB
-        result = await db.products.delete_one({"id": product_id})
-        
-        if result.deleted_count:
-            return {"message": "Producto eliminado exitosamente"}
-        else:
-            raise HTTPException(status_code=500, detail="Error al eliminar el producto")
+        await products_changed(db, removed_id=product_id)
+        return {"message": "Producto eliminado exitosamente"}
     
     except HTTPException:
         raise
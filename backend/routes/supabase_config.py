@@ -1,19 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from typing import List
 from models.SiteConfig import SiteConfig, SiteConfigCreate
-from database.supabase_client import get_supabase_client
+from database.supabase_rest import get_supabase_rest
+from services.catalog_version import catalog_changed
+from services.compression import use_cached_encodings
+from services.response_cache import response_cache
+from services.serialization import render_json
 from datetime import datetime
 import logging
 import uuid
+from motor.motor_asyncio import AsyncIOMotorDatabase
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Dependency para obtener la base de datos (versión del catálogo)
+async def get_database() -> AsyncIOMotorDatabase:
+    from server import db
+    return db
+
 @router.get("/supabase/config/{key}")
 async def get_config_supabase(key: str):
     try:
-        supabase = get_supabase_client()
+        supabase = get_supabase_rest()
         
-        response = supabase.table('site_config').select('*').eq('key', key).execute()
+        response = await supabase.table('site_config').select('*').eq('key', key).execute()
         
         if response.data:
             config = response.data[0]
@@ -28,10 +39,10 @@ async def get_config_supabase(key: str):
 @router.post("/supabase/config", response_model=SiteConfig)
 async def update_config_supabase(config_data: SiteConfigCreate):
     try:
-        supabase = get_supabase_client()
+        supabase = get_supabase_rest()
         
         # Verificar si ya existe la configuración
-        existing_response = supabase.table('site_config').select('*').eq('key', config_data.key).execute()
+        existing_response = await supabase.table('site_config').select('*').eq('key', config_data.key).execute()
         
         if existing_response.data:
             # Actualizar configuración existente
@@ -40,7 +51,7 @@ async def update_config_supabase(config_data: SiteConfigCreate):
                 "updated_at": datetime.utcnow().isoformat()
             }
             
-            response = supabase.table('site_config').update(update_data).eq('key', config_data.key).execute()
+            response = await supabase.table('site_config').update(update_data).eq('key', config_data.key).execute()
             
             if response.data:
                 updated_config = response.data[0]
@@ -55,7 +66,7 @@ async def update_config_supabase(config_data: SiteConfigCreate):
             insert_data['id'] = str(uuid.uuid4())
             insert_data['updated_at'] = datetime.utcnow().isoformat()
             
-            response = supabase.table('site_config').insert(insert_data).execute()
+            response = await supabase.table('site_config').insert(insert_data).execute()
             
             if response.data:
                 created_config = response.data[0]
@@ -71,48 +82,48 @@ async def update_config_supabase(config_data: SiteConfigCreate):
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/supabase/social-networks")
-async def get_social_networks_supabase():
+async def get_social_networks_supabase(request: Request):
     try:
-        supabase = get_supabase_client()
+        cached = response_cache.get("social", "active")
+        if cached:
+            use_cached_encodings(request, cached)
+            return Response(content=cached.body, media_type="application/json")
+        generation = response_cache.generation("social")
+
+        supabase = get_supabase_rest()
         
-        response = supabase.table('social_networks').select('*').eq('is_active', True).execute()
+        response = await supabase.table('social_networks').select('*').eq('is_active', True).execute()
         
-        return response.data
+        body = render_json(response.data)
+        use_cached_encodings(request, response_cache.put("social", "active", body, generation=generation))
+        return Response(content=body, media_type="application/json")
     
     except Exception as e:
         logger.error(f"Error getting social networks from Supabase: {str(e)}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.post("/supabase/social-networks")
-async def update_social_networks_supabase(social_networks: list):
+async def update_social_networks_supabase(
+    social_networks: List[dict],
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
     try:
-        supabase = get_supabase_client()
-        
-        # Desactivar todas las redes sociales existentes
-        supabase.table('social_networks').update({'is_active': False}).execute()
+        supabase = get_supabase_rest()
         
-        # Insertar/actualizar las nuevas redes sociales
+        # Solo las redes con URL; si un nombre se repite gana el último
+        networks = {}
         for network in social_networks:
-            if network.get('url'):  # Solo si tiene URL
-                # Verificar si ya existe
-                existing = supabase.table('social_networks').select('*').eq('name', network['name']).execute()
-                
-                if existing.data:
-                    # Actualizar existente
-                    supabase.table('social_networks').update({
-                        'url': network['url'],
-                        'is_active': True
-                    }).eq('name', network['name']).execute()
-                else:
-                    # Crear nuevo
-                    supabase.table('social_networks').insert({
-                        'id': str(uuid.uuid4()),
-                        'name': network['name'],
-                        'url': network['url'],
-                        'icon': network.get('icon', network['name']),
-                        'is_active': True,
-                        'created_at': datetime.utcnow().isoformat()
-                    }).execute()
+            if network.get('name') and network.get('url'):
+                networks[network['name']] = {
+                    'name': network['name'],
+                    'url': network['url'],
+                    'icon': network.get('icon', network['name'])
+                }
+        
+        # Upsert por nombre y limpieza de las que ya no están, en una sola llamada
+        # (replace_social_networks en supabase-setup.sql)
+        await supabase.rpc('replace_social_networks', {'networks': list(networks.values())}).execute()
+        await catalog_changed(db, "social")
         
         return {"message": "Redes sociales actualizadas exitosamente"}
     
@@ -123,9 +134,9 @@ async def update_social_networks_supabase(social_networks: list):
 @router.get("/supabase/business-groups")
 async def get_business_groups_supabase():
     try:
-        supabase = get_supabase_client()
+        supabase = get_supabase_rest()
         
-        response = supabase.table('business_groups').select('*').eq('is_active', True).execute()
+        response = await supabase.table('business_groups').select('*').eq('is_active', True).execute()
         
         return response.data
     
@@ -134,27 +145,30 @@ async def get_business_groups_supabase():
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.post("/supabase/business-groups")
-async def update_business_groups_supabase(business_groups: list):
+async def update_business_groups_supabase(
+    business_groups: List[dict],
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
     try:
-        supabase = get_supabase_client()
-        
-        # Desactivar todos los grupos existentes
-        supabase.table('business_groups').update({'is_active': False}).execute()
+        supabase = get_supabase_rest()
         
-        # Insertar los nuevos grupos
+        # Solo los grupos con nombre; si un nombre se repite gana el último
+        groups = {}
         for group in business_groups:
-            if group.get('name'):  # Solo si tiene nombre
-                supabase.table('business_groups').insert({
-                    'id': str(uuid.uuid4()),
+            if group.get('name'):
+                groups[group['name']] = {
                     'name': group['name'],
                     'description': group.get('description', ''),
-                    'link': group.get('link', ''),
-                    'is_active': True,
-                    'created_at': datetime.utcnow().isoformat()
-                }).execute()
+                    'link': group.get('link', '')
+                }
+        
+        # Upsert por nombre y borrado de los grupos que ya no están, en una sola
+        # llamada (replace_business_groups en supabase-setup.sql)
+        await supabase.rpc('replace_business_groups', {'groups': list(groups.values())}).execute()
+        await catalog_changed(db)
         
         return {"message": "Grupos de negocio actualizados exitosamente"}
     
     except Exception as e:
         logger.error(f"Error updating business groups in Supabase: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error interno del servidor")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
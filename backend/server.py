@@ -15,15 +15,26 @@ from routes.products import router as products_router
 from routes.config import router as config_router
 from routes.auth import router as auth_router
 from routes.pdf import router as pdf_router
-from routes.supabase_products import router as supabase_products_router
+from routes.images import router as images_router
+from routes.bootstrap import router as bootstrap_router
+from routes.admin import router as admin_router
+from routes.metrics import router as metrics_router
 from routes.supabase_config import router as supabase_config_router
+from database.indexes import ensure_indexes
+from database.supabase_rest import close_supabase_rest, supabase_configured
+from database.product_repository import get_product_repository
+from services import pdf_pool
+from services.catalog_engine import catalog_engine
+from services.catalog_version import catalog_version
+from services.compression import CompressionMiddleware
+from services.metrics import MetricsMiddleware, MongoCommandListener
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandListener()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -63,9 +74,17 @@ api_router.include_router(products_router, tags=["products"])
 api_router.include_router(config_router, tags=["config"])
 api_router.include_router(auth_router, tags=["auth"])
 api_router.include_router(pdf_router, tags=["pdf"])
+api_router.include_router(images_router, tags=["images"])
+api_router.include_router(bootstrap_router, tags=["bootstrap"])
+api_router.include_router(admin_router, tags=["admin"])
+# Las rutas de Supabase solo se publican si hay credenciales configuradas
+if supabase_configured():
+    api_router.include_router(supabase_config_router, tags=["supabase"])
 
 # Include the main API router in the app
 app.include_router(api_router)
+# /metrics va fuera de /api, donde Prometheus lo busca por defecto
+app.include_router(metrics_router, tags=["metrics"])
 
 app.add_middleware(
     CORSMiddleware,
@@ -73,7 +92,12 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# Comprime (o sirve ya comprimidas) las respuestas JSON según Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+# El último middleware agregado es el más externo: mide también CORS
+app.add_middleware(MetricsMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -84,8 +108,22 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
+    await ensure_indexes(db)
+    try:
+        repository = await get_product_repository()
+        await repository.ensure_ready()
+        logger.info(f"Product backend: {repository.name}")
+    except Exception as e:
+        logger.error(f"Error preparing product backend: {str(e)}")
+    try:
+        # Carga el motor de facetas ahora en lugar de en la primera petición
+        await catalog_engine.ensure_current(await catalog_version.get(db), await get_product_repository())
+    except Exception as e:
+        logger.error(f"Error loading catalog engine: {str(e)}")
     logger.info("Mara Productions API iniciada correctamente")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    pdf_pool.shutdown()
+    await close_supabase_rest()
     client.close()
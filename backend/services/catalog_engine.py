@@ -0,0 +1,196 @@
+import bisect
+import heapq
+import logging
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.catalog_version import product_listeners
+from services.change_feed import ChangeFeedIndex
+
+logger = logging.getLogger(__name__)
+
+# Campos con índice de bitmaps (plataformas tiene varios valores por producto)
+FACET_FIELDS = ("categoria", "subcategoria", "pais", "plataformas")
+MULTI_VALUED = {"plataformas"}
+# Columnas que se devuelven en `items` (el catálogo sin imagen ni descripción)
+CARD_FIELDS = ("id", "titulo", "categoria", "subcategoria", "pais", "plataformas", "fecha_lanzamiento", "created_at")
+
+def _bitmap(rows: List[int], start: int) -> int:
+    """Entero con los bits `rows` a 1 (todas >= start)"""
+    bits = bytearray((rows[-1] - start) // 8 + 1)
+    for row in rows:
+        offset = row - start
+        bits[offset >> 3] |= 1 << (offset & 7)
+    return int.from_bytes(bits, "little") << start
+
+class CatalogEngine(ChangeFeedIndex):
+    """
+    Copia en memoria del catálogo (sin imágenes) en columnas, con un bitmap
+    por valor de categoria, subcategoria, pais y plataformas. Los bitmaps son
+    enteros de Python: la fila n es el bit n, los filtros son AND/OR de
+    enteros y los recuentos, bit_count().
+
+    Una actualización añade una fila nueva y apaga la anterior en `live`;
+    cuando las filas muertas superan a las vivas se compacta.
+    """
+
+    name = "Catalog engine"
+
+    def _reset(self):
+        self.row_of: Dict[str, int] = {}
+        self.columns: Dict[str, list] = {field: [] for field in CARD_FIELDS if field not in FACET_FIELDS}
+        # Diccionario de valores por campo y, por fila, el código (o los códigos)
+        self.values: Dict[str, List[Optional[str]]] = {field: [] for field in FACET_FIELDS}
+        self.codes_of: Dict[str, Dict[Optional[str], int]] = {field: {} for field in FACET_FIELDS}
+        self.codes: Dict[str, object] = {
+            field: [] if field in MULTI_VALUED else array('I') for field in FACET_FIELDS
+        }
+        self.bitmaps: Dict[str, Dict[int, int]] = {field: {} for field in FACET_FIELDS}
+        # (created_at, id, fila) de menor a mayor; incluye filas muertas hasta compactar
+        self.order: List[Tuple[str, str, int]] = []
+        self.live = 0
+        self.rows = 0
+
+    def _code(self, field: str, value: Optional[str]) -> int:
+        codes = self.codes_of[field]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.values[field])
+            self.values[field].append(value)
+        return code
+
+    def extend(self, products: Iterable[dict]):
+        """
+        Añade o reemplaza varios productos. Los bitmaps de las filas nuevas se
+        construyen de una vez (OR de un bit por fila copiaría el entero entero
+        cada vez) y se combinan con los existentes.
+        """
+        products = {product["id"]: product for product in products}
+        if not products:
+            return
+        for product_id in products:
+            self.remove(product_id)
+        start = self.rows
+        new_rows: Dict[str, Dict[int, List[int]]] = {field: {} for field in FACET_FIELDS}
+        created = self.columns["created_at"]
+        order = []
+        for row, product in enumerate(products.values(), start):
+            self.row_of[product["id"]] = row
+            for field, column in self.columns.items():
+                column.append(product.get(field))
+            for field in FACET_FIELDS:
+                if field in MULTI_VALUED:
+                    row_codes = tuple({self._code(field, value) for value in product.get(field) or ()})
+                    self.codes[field].append(row_codes)
+                else:
+                    row_codes = (self._code(field, product.get(field)),)
+                    self.codes[field].append(row_codes[0])
+                for code in row_codes:
+                    new_rows[field].setdefault(code, []).append(row)
+            order.append((str(created[row]), product["id"], row))
+        self.rows = start + len(products)
+        for field, rows_by_code in new_rows.items():
+            bitmaps = self.bitmaps[field]
+            for code, rows in rows_by_code.items():
+                bitmaps[code] = bitmaps.get(code, 0) | _bitmap(rows, start)
+        self.live |= ((1 << len(products)) - 1) << start
+        if len(order) > 64:
+            self.order.extend(order)
+            self.order.sort()
+        else:
+            for entry in order:
+                bisect.insort(self.order, entry)
+
+    def remove(self, product_id: str):
+        row = self.row_of.pop(product_id, None)
+        if row is None:
+            return
+        mask = ~(1 << row)
+        self.live &= mask
+        for field in FACET_FIELDS:
+            row_codes = self.codes[field][row]
+            for code in (row_codes if field in MULTI_VALUED else (row_codes,)):
+                self.bitmaps[field][code] &= mask
+        if self.rows - len(self.row_of) > max(1024, len(self.row_of)):
+            self._compact()
+
+    def _card(self, row: int) -> dict:
+        card = {field: column[row] for field, column in self.columns.items()}
+        for field in FACET_FIELDS:
+            values = self.values[field]
+            row_codes = self.codes[field][row]
+            card[field] = [values[c] for c in row_codes] if field in MULTI_VALUED else values[row_codes]
+        return {field: card[field] for field in CARD_FIELDS}
+
+    def _compact(self):
+        """Reconstruye las columnas solo con las filas vivas"""
+        cards = [self._card(row) for row in sorted(self.row_of.values())]
+        self._reset()
+        self.extend(cards)
+
+    def _field_mask(self, field: str, values: Iterable[Optional[str]]) -> int:
+        """Filas con cualquiera de `values` en `field`"""
+        mask = 0
+        for value in values:
+            code = self.codes_of[field].get(value)
+            if code is not None:
+                mask |= self.bitmaps[field][code]
+        return mask
+
+    def _mask(self, filters: Dict[str, List[str]], skip: Optional[str] = None) -> int:
+        mask = self.live
+        for field, values in filters.items():
+            if field != skip and values:
+                mask &= self._field_mask(field, values)
+        return mask
+
+    def count(self, filters: Dict[str, List[str]]) -> int:
+        """Productos que cumplen los filtros (OR dentro de un campo, AND entre campos)"""
+        return self._mask(filters).bit_count()
+
+    def facets(self, filters: Dict[str, List[str]]) -> Dict[str, List[dict]]:
+        """
+        Recuento por valor de cada campo, con los filtros de los demás campos
+        (no el propio, así se ven las alternativas a la selección actual)
+        """
+        result = {}
+        for field in FACET_FIELDS:
+            mask = self._mask(filters, skip=field)
+            counts = []
+            for code, bitmap in self.bitmaps[field].items():
+                count = (bitmap & mask).bit_count()
+                if count:
+                    counts.append({"value": self.values[field][code], "count": count})
+            counts.sort(key=lambda c: (-c["count"], c["value"] or ""))
+            result[field] = counts
+        return result
+
+    def items(self, filters: Dict[str, List[str]], limit: int) -> List[dict]:
+        """Los `limit` productos más recientes que cumplen los filtros"""
+        mask = self._mask(filters)
+        if not mask or not limit:
+            return []
+        matches = mask.bit_count()
+        if matches * matches < limit * len(self.order):
+            # Pocas coincidencias: se enumeran sus bits (bin() y find() recorren
+            # el entero en C) y se ordenan solo esas
+            bits = bin(mask)[:1:-1]
+            keys = []
+            position = bits.find("1")
+            while position != -1:
+                keys.append((str(self.columns["created_at"][position]), self.columns["id"][position], position))
+                position = bits.find("1", position + 1)
+            rows = [row for _, _, row in heapq.nlargest(limit, keys)]
+        else:
+            # Muchas: se recorre el orden por fecha hasta llenar la página
+            bits = mask.to_bytes((self.rows + 7) // 8, "little")
+            rows = []
+            for _, _, row in reversed(self.order):
+                if bits[row >> 3] >> (row & 7) & 1:
+                    rows.append(row)
+                    if len(rows) == limit:
+                        break
+        return [self._card(row) for row in rows]
+
+catalog_engine = CatalogEngine()
+product_listeners.append(catalog_engine.apply)
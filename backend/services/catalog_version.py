@@ -0,0 +1,92 @@
+import logging
+import os
+import time
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Documento con el contador de versiones del catálogo
+META_COLLECTION = "catalog_meta"
+VERSION_ID = "catalog"
+# Segundos que un proceso confía en la versión que ya conoce antes de
+# volver a leerla (las escrituras de otros workers tardan eso en notarse)
+CATALOG_VERSION_TTL = float(os.environ.get('CATALOG_VERSION_TTL', 2))
+
+class CatalogVersion:
+    """
+    Contador que aumenta con cada escritura del catálogo (productos,
+    configuración, redes sociales y grupos). Se guarda en MongoDB para que
+    lo compartan todos los procesos; `epoch` cambia si el contador se
+    recrea, así una versión reiniciada no coincide con un ETag antiguo.
+    """
+
+    def __init__(self):
+        self.epoch: Optional[str] = None
+        self.version = 0
+        self._checked_at = 0.0
+
+    def _remember(self, doc: dict):
+        self.epoch = doc["epoch"]
+        self.version = doc["version"]
+        self._checked_at = time.monotonic()
+
+    async def get(self, db: AsyncIOMotorDatabase) -> Tuple[str, int]:
+        if self.epoch is None or time.monotonic() - self._checked_at > CATALOG_VERSION_TTL:
+            doc = await db[META_COLLECTION].find_one_and_update(
+                {"_id": VERSION_ID},
+                {"$setOnInsert": {"epoch": uuid.uuid4().hex, "version": 0}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            self._remember(doc)
+        return self.epoch, self.version
+
+    async def bump(self, db: AsyncIOMotorDatabase):
+        doc = await db[META_COLLECTION].find_one_and_update(
+            {"_id": VERSION_ID},
+            {"$inc": {"version": 1}, "$setOnInsert": {"epoch": uuid.uuid4().hex}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._remember(doc)
+
+    async def etag(self, db: AsyncIOMotorDatabase) -> str:
+        epoch, version = await self.get(db)
+        return f'"{epoch}-{version}"'
+
+catalog_version = CatalogVersion()
+
+async def catalog_changed(db: AsyncIOMotorDatabase, *namespaces: str):
+    """
+    Se llama después de cada escritura del catálogo: invalida las respuestas
+    cacheadas de esos espacios y del bootstrap, y sube la versión.
+    """
+    for namespace in namespaces:
+        response_cache.invalidate(namespace)
+    response_cache.invalidate("bootstrap")
+    try:
+        await catalog_version.bump(db)
+    except Exception as e:
+        logger.error(f"Error bumping catalog version: {str(e)}")
+
+# Índices en memoria del catálogo que se actualizan con cada escritura de un
+# producto de este proceso: reciben (versión tras la escritura, producto o
+# None, id borrado o None)
+product_listeners: List[Callable[[Tuple[str, int], Optional[dict], Optional[str]], None]] = []
+
+async def products_changed(db: AsyncIOMotorDatabase, product: Optional[dict] = None,
+                           removed_id: Optional[str] = None):
+    """
+    catalog_changed para la escritura de un solo producto, que además se
+    aplica a los índices en memoria sin reconstruirlos. Las escrituras
+    masivas usan catalog_changed y los índices se ponen al día al usarse.
+    """
+    await catalog_changed(db, "products")
+    for listener in product_listeners:
+        listener((catalog_version.epoch, catalog_version.version), product, removed_id)
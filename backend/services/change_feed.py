@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cambios por consulta al ponerse al día con list_changes
+SYNC_PAGE_SIZE = 1000
+# Cada cuánto (segundos) se recarga entero un índice aunque no falte nada, por
+# si una escritura concurrente quedó fuera de la secuencia incremental
+INDEX_RELOAD_SECONDS = float(os.environ.get('INDEX_RELOAD_SECONDS', 600))
+
+class ChangeFeedIndex:
+    """
+    Base de los índices en memoria del catálogo que se cargan y se ponen al
+    día con ProductRepository.list_changes desde la última secuencia vista.
+    Las escrituras de este proceso se aplican al momento (registrando `apply`
+    en product_listeners); las de otros workers, cuando la versión del
+    catálogo avanza y se llama a ensure_current.
+
+    Las subclases guardan los productos en `row_of` (id -> fila) e
+    implementan _reset, extend (añadir o reemplazar) y remove.
+    """
+
+    name = "Index"
+
+    def __init__(self):
+        self._reset()
+        self.version: Optional[Tuple[str, int]] = None
+        self.last_seq: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _reset(self):
+        self.row_of = {}
+
+    def extend(self, products: Iterable[dict]):
+        raise NotImplementedError
+
+    def remove(self, product_id: str):
+        raise NotImplementedError
+
+    def add(self, product: dict):
+        """Añade o reemplaza un producto"""
+        self.extend([product])
+
+    def apply(self, version: Tuple[str, int], product: Optional[dict] = None, removed_id: Optional[str] = None):
+        """Escritura de este proceso (ver products_changed); si otro escribió entre medias, se sincroniza al usarse"""
+        if self.version is None:
+            return
+        if product is not None:
+            self.add(product)
+        elif removed_id is not None:
+            self.remove(removed_id)
+        epoch, number = version
+        if self.version == (epoch, number - 1):
+            self.version = version
+
+    async def ensure_current(self, version: Tuple[str, int], repo):
+        """Se pone al día con los cambios del repositorio si la versión del catálogo avanzó"""
+        reload_due = time.monotonic() - self._loaded_at > INDEX_RELOAD_SECONDS
+        if self.version == version and not reload_due:
+            return
+        async with self._lock:
+            reload_due = time.monotonic() - self._loaded_at > INDEX_RELOAD_SECONDS
+            if self.version == version and not reload_due:
+                return
+            if reload_due or self.last_seq is None or self.version is None or self.version[0] != version[0]:
+                await self._load(repo)
+            else:
+                self.last_seq = await self._apply_changes(repo, self.last_seq)
+            self.version = version
+
+    async def _apply_changes(self, repo, since: int) -> int:
+        while True:
+            changes = await repo.list_changes(since, SYNC_PAGE_SIZE)
+            # Los productos nuevos se añaden por lotes; antes de un borrado o de
+            # reemplazar uno existente se vacía el lote para respetar el orden
+            batch = []
+            for change in changes:
+                if change["op"] == "upsert" and change["id"] not in self.row_of:
+                    batch.append(change["product"])
+                    continue
+                self.extend(batch)
+                batch = []
+                if change["op"] == "upsert":
+                    self.add(change["product"])
+                else:
+                    self.remove(change["id"])
+            self.extend(batch)
+            if changes:
+                since = changes[-1]["seq"]
+            if len(changes) < SYNC_PAGE_SIZE:
+                return since
+
+    async def _load(self, repo):
+        start = time.perf_counter()
+        self._reset()
+        self.last_seq = await self._apply_changes(repo, 0)
+        self._loaded_at = time.monotonic()
+        logger.info(f"{self.name} loaded: {len(self.row_of)} products in {time.perf_counter() - start:.2f}s")
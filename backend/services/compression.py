@@ -0,0 +1,166 @@
+import gzip
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from services.response_cache import CachedResponse, response_cache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli está en requirements.txt
+    brotli = None
+
+# Por debajo de este tamaño la respuesta se envía tal cual: comprimir no compensa
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+# Niveles para comprimir al vuelo; las respuestas cacheadas se comprimen una
+# sola vez con los mismos niveles (brotli 11 tarda segundos en un catálogo grande)
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+# Cuerpos mayores se comprimen en un hilo para no bloquear el bucle de eventos
+COMPRESSION_THREAD_BYTES = 256 * 1024
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+# En orden de preferencia cuando el cliente acepta varias con la misma calidad
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+Headers = List[Tuple[bytes, bytes]]
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Codificación de ENCODINGS que prefiere el cliente según Accept-Encoding, o None"""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    # mtime fijo: el mismo cuerpo produce siempre los mismos bytes
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+def use_cached_encodings(request: Request, entry: Optional[CachedResponse]):
+    """
+    Indica al middleware que la respuesta es el cuerpo de `entry` (de
+    response_cache): sus variantes comprimidas se reutilizan o se guardan
+    en la entrada, en lugar de comprimir en cada petición.
+    """
+    request.state.cached_response = entry
+
+def _header(headers: Headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+def _compressible(message: dict, body: bytes) -> bool:
+    headers = message.get("headers", [])
+    content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+    return (
+        200 <= message["status"] < 300 and message["status"] not in (204, 206)
+        and len(body) >= COMPRESSION_MIN_BYTES
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and _header(headers, b"content-encoding") is None
+    )
+
+def _encoded_headers(headers: Headers, encoding: Optional[str], length: int) -> Headers:
+    """Cabeceras con Vary: Accept-Encoding y, si se comprimió, la codificación y la nueva longitud"""
+    result = []
+    vary = b"Accept-Encoding"
+    for key, value in headers:
+        name = key.lower()
+        if name == b"vary":
+            if b"accept-encoding" not in value.lower():
+                vary = value + b", " + vary
+            else:
+                vary = value
+            continue
+        if encoding and name == b"content-length":
+            continue
+        if encoding and name == b"etag" and not value.startswith(b"W/"):
+            # El cuerpo comprimido no es byte a byte el del ETag fuerte
+            value = b"W/" + value
+        result.append((key, value))
+    result.append((b"vary", vary))
+    if encoding:
+        result.append((b"content-encoding", encoding.encode("latin-1")))
+        result.append((b"content-length", str(length).encode("latin-1")))
+    return result
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI: comprime con brotli o gzip, según Accept-Encoding, las
+    respuestas JSON y de texto de un solo cuerpo. Las respuestas en
+    streaming (exportación NDJSON, eventos de trabajos PDF) y las imágenes
+    pasan sin tocar.
+
+    Si la ruta sirvió una entrada de response_cache (use_cached_encodings),
+    cada variante se comprime la primera vez y se guarda en esa entrada;
+    una escritura que invalida la entrada invalida también sus variantes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate((_header(scope["headers"], b"accept-encoding") or b"").decode("latin-1"))
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Se retiene hasta ver el cuerpo: de él dependen las cabeceras
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            if message.get("more_body") or not _compressible(start, body):
+                await send(start)
+                await send(message)
+                return
+
+            if encoding:
+                body = await self._encode(scope, body, encoding)
+            await send({**start, "headers": _encoded_headers(start.get("headers", []), encoding, len(body))})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _encode(self, scope, body: bytes, encoding: str) -> bytes:
+        entry = scope.get("state", {}).get("cached_response")
+        if entry is not None and entry.body == body:
+            encoded = entry.encoded.get(encoding)
+            if encoded is not None:
+                return encoded
+        else:
+            entry = None
+        if len(body) >= COMPRESSION_THREAD_BYTES:
+            encoded = await run_in_threadpool(compress, body, encoding)
+        else:
+            encoded = compress(body, encoding)
+        if entry is not None:
+            response_cache.put_encoded(entry, encoding, encoded)
+        return encoded
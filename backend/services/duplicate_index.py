@@ -0,0 +1,240 @@
+import logging
+import os
+import zlib
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from models.Product import product_natural_key
+from services.catalog_version import product_listeners
+from services.change_feed import ChangeFeedIndex
+from services.suggest_index import fold
+
+logger = logging.getLogger(__name__)
+
+# Firma MinHash de MINHASH_PERMUTATIONS valores en LSH_BANDS bandas de
+# LSH_ROWS. Dos productos con similitud de Jaccard s comparten alguna banda
+# (y se comparan) con probabilidad 1 - (1 - s^LSH_ROWS)^LSH_BANDS: ~0.65
+# con s = 0.5, ~0.99 con s = 0.7 y más de 0.999 con s = 0.8
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+# Similitud estimada (fracción de la firma que coincide) desde la que dos
+# productos de la misma categoría y subcategoría son casi duplicados
+DUPLICATE_THRESHOLD = float(os.environ.get('DUPLICATE_THRESHOLD', 0.7))
+# Shingles por bloque al calcular firmas: acota la matriz permutaciones × shingles
+SIGNATURE_CHUNK = 1 << 16
+# Filas añadidas desde la última ordenación que se buscan recorriéndolas
+RECENT_ROWS = 1024
+
+# Hash multiply-shift por permutación: (a·x + b) mod 2^64 >> 32, con x de 32 bits
+_random = np.random.default_rng(0x5EED)
+_MULTIPLIERS = _random.integers(0, 2**64, MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_INCREMENTS = _random.integers(0, 2**64, MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=False)
+_SHIFT = np.uint64(32)
+_LOW_BITS = np.uint64(0xFFFFFFFF)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+def shingles(product: dict) -> Set[int]:
+    """
+    Hashes de los trigramas de caracteres del título y de los pares de
+    palabras de la descripción, normalizados como el autocompletado. Los
+    títulos son cortos y una errata solo cambia unos pocos trigramas; en
+    las descripciones bastan las palabras. hash() de Python cambia entre
+    procesos, pero las firmas nunca salen del proceso que las calcula.
+    """
+    title = " ".join(fold(product.get("titulo")))
+    words = fold(product.get("descripcion"))
+    hashes = {hash(title[i:i + 3]) for i in range(max(len(title) - 2, 1))}
+    hashes.update(map(hash, zip(words, words[1:]) if len(words) > 1 else words))
+    return hashes
+
+def fingerprint(products: Sequence[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Firmas MinHash (productos × MINHASH_PERMUTATIONS, uint32) y claves LSH
+    (productos × LSH_BANDS, uint64). Cada clave mezcla su banda con la
+    categoría y subcategoría, así solo coinciden productos del mismo grupo.
+    """
+    signatures = np.empty((len(products), MINHASH_PERMUTATIONS), dtype=np.uint32)
+    hashed = [shingles(product) for product in products]
+    start = 0
+    while start < len(products):
+        # Bloques de productos consecutivos con hasta SIGNATURE_CHUNK shingles
+        end, size, offsets, values = start, 0, [], []
+        while end < len(products) and (end == start or size + len(hashed[end]) <= SIGNATURE_CHUNK):
+            offsets.append(size)
+            values.extend(hashed[end])
+            size += len(hashed[end])
+            end += 1
+        column = np.array(values, dtype=np.int64).view(np.uint64) & _LOW_BITS
+        permuted = (_MULTIPLIERS[:, None] * column[None, :] + _INCREMENTS[:, None]) >> _SHIFT
+        signatures[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = end
+
+    groups = np.array(
+        [zlib.crc32(f"{p.get('categoria')}|{p.get('subcategoria') or ''}".encode()) for p in products],
+        dtype=np.uint64
+    )
+    bands = signatures.reshape(len(products), LSH_BANDS, LSH_ROWS).astype(np.uint64)
+    keys = np.repeat(groups[:, None], LSH_BANDS, axis=1)
+    for row in range(LSH_ROWS):
+        keys = keys * _MIX + bands[:, :, row]
+    return signatures, keys
+
+def _similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Fracción de valores de la firma que coincide con cada fila de `others` (estima Jaccard)"""
+    return (others == signature).mean(axis=1)
+
+def near_duplicates_within(signatures: np.ndarray, keys: np.ndarray) -> List[Optional[Tuple[int, float]]]:
+    """
+    Para cada producto de un lote, el anterior del que es casi duplicado
+    (índice, similitud) o None. Solo se compara con los que no son a su vez
+    duplicados, así una cadena de variantes apunta siempre a la primera.
+    """
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    result: List[Optional[Tuple[int, float]]] = []
+    for index in range(len(signatures)):
+        band_keys = list(enumerate(keys[index].tolist()))
+        earlier = sorted({other for band in band_keys for other in buckets.get(band, ())})
+        match = None
+        if earlier:
+            similarities = _similarity(signatures[index], signatures[earlier])
+            best = int(similarities.argmax())
+            if similarities[best] >= DUPLICATE_THRESHOLD:
+                match = (earlier[best], float(similarities[best]))
+        result.append(match)
+        if match is None:
+            for band in band_keys:
+                buckets.setdefault(band, []).append(index)
+    return result
+
+class DuplicateIndex(ChangeFeedIndex):
+    """
+    Firmas MinHash del catálogo en memoria con un índice LSH por bandas,
+    para encontrar casi duplicados de los productos importados sin
+    compararlos con todo el catálogo.
+
+    Cada banda se guarda como un array ordenado de claves (búsqueda con
+    searchsorted); las filas añadidas después de ordenar se recorren hasta
+    que pasan de RECENT_ROWS. Como en el motor del catálogo, una
+    actualización añade una fila y apaga la anterior en `live`.
+    """
+
+    name = "Duplicate index"
+
+    def _reset(self):
+        self.row_of: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.titles: List[Optional[str]] = []
+        self.natural_keys: List[str] = []
+        self.signatures = np.empty((0, MINHASH_PERMUTATIONS), dtype=np.uint32)
+        self.keys = np.empty((0, LSH_BANDS), dtype=np.uint64)
+        self.live = np.empty(0, dtype=bool)
+        self.rows = 0
+        # Por banda, las claves de las filas < sorted_rows ordenadas y sus filas
+        self.sorted_keys = np.empty((LSH_BANDS, 0), dtype=np.uint64)
+        self.sorted_order = np.empty((LSH_BANDS, 0), dtype=np.int32)
+        self.sorted_rows = 0
+
+    def _reserve(self, rows: int):
+        """Amplía los arrays (al doble) para que quepan `rows` filas"""
+        capacity = len(self.live)
+        if rows <= capacity:
+            return
+        capacity = max(rows, 2 * capacity, 1024)
+        for name in ("signatures", "keys", "live"):
+            current = getattr(self, name)
+            grown = np.zeros((capacity, *current.shape[1:]), dtype=current.dtype)
+            grown[:self.rows] = current[:self.rows]
+            setattr(self, name, grown)
+
+    def extend(self, products):
+        """Añade o reemplaza varios productos, con las firmas calculadas de una vez"""
+        products = list({product["id"]: product for product in products}.values())
+        if not products:
+            return
+        for product in products:
+            self.remove(product["id"])
+        signatures, keys = fingerprint(products)
+        start, end = self.rows, self.rows + len(products)
+        self._reserve(end)
+        self.signatures[start:end] = signatures
+        self.keys[start:end] = keys
+        self.live[start:end] = True
+        for row, product in enumerate(products, start):
+            self.row_of[product["id"]] = row
+            self.ids.append(product["id"])
+            self.titles.append(product.get("titulo"))
+            self.natural_keys.append(
+                product_natural_key(product.get("titulo") or "", product.get("categoria"), product.get("subcategoria"))
+            )
+        self.rows = end
+        if self.rows - self.sorted_rows > RECENT_ROWS:
+            self._sort()
+
+    def remove(self, product_id: str):
+        row = self.row_of.pop(product_id, None)
+        if row is None:
+            return
+        self.live[row] = False
+        if self.rows - len(self.row_of) > max(RECENT_ROWS, len(self.row_of)):
+            self._compact()
+
+    def _compact(self):
+        """Se queda solo con las filas vivas (sin recalcular firmas)"""
+        keep = np.flatnonzero(self.live[:self.rows])
+        self.signatures = self.signatures[keep]
+        self.keys = self.keys[keep]
+        self.live = np.ones(len(keep), dtype=bool)
+        self.ids = [self.ids[row] for row in keep]
+        self.titles = [self.titles[row] for row in keep]
+        self.natural_keys = [self.natural_keys[row] for row in keep]
+        self.row_of = {product_id: row for row, product_id in enumerate(self.ids)}
+        self.rows = len(keep)
+        self._sort()
+
+    def _sort(self):
+        columns = self.keys[:self.rows].T
+        order = np.argsort(columns, axis=1, kind="stable")
+        self.sorted_keys = np.take_along_axis(columns, order, axis=1)
+        self.sorted_order = order.astype(np.int32)
+        self.sorted_rows = self.rows
+
+    def _candidates(self, keys: np.ndarray) -> List[set]:
+        """Filas que comparten alguna banda con cada clave de `keys`"""
+        candidates = [set() for _ in range(len(keys))]
+        for band in range(LSH_BANDS):
+            column = self.sorted_keys[band]
+            low = np.searchsorted(column, keys[:, band], "left")
+            high = np.searchsorted(column, keys[:, band], "right")
+            for index in np.flatnonzero(high > low):
+                candidates[index].update(self.sorted_order[band, low[index]:high[index]].tolist())
+        recent = self.keys[self.sorted_rows:self.rows]
+        if len(recent):
+            for index, row_keys in enumerate(keys):
+                hits = np.flatnonzero((recent == row_keys).any(axis=1))
+                candidates[index].update((hits + self.sorted_rows).tolist())
+        return candidates
+
+    def nearest(self, signatures: np.ndarray, keys: np.ndarray,
+                natural_keys: Sequence[str]) -> List[Optional[Tuple[str, Optional[str], float]]]:
+        """
+        Para cada firma, el producto del catálogo más parecido (id, título,
+        similitud) si llega a DUPLICATE_THRESHOLD, sin contar el que tiene su
+        misma clave natural (ese es el propio producto, que se actualiza).
+        """
+        result = []
+        for index, rows in enumerate(self._candidates(keys)):
+            rows = [row for row in rows if self.live[row] and self.natural_keys[row] != natural_keys[index]]
+            match = None
+            if rows:
+                similarities = _similarity(signatures[index], self.signatures[rows])
+                best = int(similarities.argmax())
+                if similarities[best] >= DUPLICATE_THRESHOLD:
+                    row = rows[best]
+                    match = (self.ids[row], self.titles[row], float(similarities[best]))
+            result.append(match)
+        return result
+
+duplicate_index = DuplicateIndex()
+product_listeners.append(duplicate_index.apply)
@@ -0,0 +1,246 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Peticiones más lentas que esto (segundos) se registran en el log; 0 lo desactiva
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', 0))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric:
+    """Base de las métricas: nombre, ayuda y etiquetas fijas"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        # Los listeners de pymongo y el pool de PDF escriben desde otros hilos
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self.values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in values]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self.values[labels] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas -> [cuentas por bucket (no acumuladas) + infinito, suma]
+        self.values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((k, (list(counts), total)) for k, (counts, total) in self.values.items())
+        lines = self.header()
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        # Funciones que actualizan gauges justo antes de exportar
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.error(f"Error collecting metrics: {str(e)}")
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")))
+http_response_size = registry.register(Histogram(
+    "http_response_size_bytes", "Tamaño del cuerpo de las respuestas", ("method", "route"), SIZE_BUCKETS))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso"))
+http_in_flight.set(value=0)
+db_latency = registry.register(Histogram(
+    "db_operation_duration_seconds", "Duración de las operaciones de base de datos",
+    ("backend", "operation", "outcome")))
+pdf_stage_latency = registry.register(Histogram(
+    "pdf_stage_duration_seconds", "Tiempo acumulado por etapa del análisis de un PDF", ("stage",)))
+
+class StageTimer:
+    """
+    Suma el tiempo de cada etapa de un proceso intercalado (las etapas del
+    PDF se alternan página a página). Funciona en los workers del pool: los
+    totales se devuelven en el resultado y se registran en el proceso web.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed_iter(self, name: str, items: Iterable) -> Iterator:
+        """Cuenta en la etapa el tiempo de producir cada elemento"""
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add(name, time.perf_counter() - start)
+            yield item
+
+def record_pdf_stages(totals: Optional[Dict[str, float]]):
+    for stage, seconds in (totals or {}).items():
+        pdf_stage_latency.observe(seconds, stage)
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Duración de cada comando de MongoDB (find, insert, aggregate...)"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        db_latency.observe(event.duration_micros / 1e6, "mongo", event.command_name, "ok")
+
+    def failed(self, event):
+        db_latency.observe(event.duration_micros / 1e6, "mongo", event.command_name, "error")
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: latencia, tamaño de respuesta y peticiones en curso por
+    plantilla de ruta (/api/products/{product_id}, no la URL concreta).
+    No envuelve el cuerpo, así las respuestas en streaming no se acumulan.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc(amount=1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.inc(amount=-1)
+            elapsed = time.perf_counter() - start
+            method = scope["method"]
+            # Las rutas sin coincidencia comparten etiqueta para no crear una serie por URL
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_requests.inc(method, route, str(status))
+            http_latency.observe(elapsed, method, route)
+            http_response_size.observe(size, method, route)
+            if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+                query = scope.get("query_string", b"").decode("latin-1")
+                logger.warning(
+                    f"Slow request: {method} {scope['path']}{'?' + query if query else ''} "
+                    f"({route}) -> {status} in {elapsed:.3f}s, {size} bytes"
+                )
@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import zlib
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import Request
+from pydantic import ValidationError
+
+from models.Product import Product
+from services.serialization import orjson, product_row, render_json
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+GZIP_MEDIA_TYPE = "application/gzip"
+# Tamaño máximo de una línea (un producto) al importar
+MAX_IMPORT_LINE_BYTES = int(os.environ.get('MAX_IMPORT_LINE_BYTES', 16 * 1024 * 1024))
+# Errores que se devuelven en el informe de importación (el resto solo se cuentan)
+MAX_REPORTED_ERRORS = 100
+# Productos por escritura al importar
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+
+class LineTooLongError(ValueError):
+    """Una línea del NDJSON supera MAX_IMPORT_LINE_BYTES"""
+
+def render_line(doc: dict) -> bytes:
+    """Un producto por línea, con la misma forma que GET /products"""
+    if orjson is not None:
+        return orjson.dumps(product_row(doc), option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE)
+    return render_json(Product(**doc)) + b"\n"
+
+async def encode_lines(docs: AsyncIterator[dict], compress: bool = False,
+                       chunk_bytes: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Convierte filas en trozos de NDJSON (opcionalmente gzip) sin acumular el catálogo"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer: List[bytes] = []
+    size = 0
+    async for doc in docs:
+        line = render_line(doc)
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            chunk = b"".join(buffer)
+            buffer, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+def is_gzip_body(request: Request) -> bool:
+    return (request.headers.get("content-encoding", "").lower() == "gzip"
+            or request.headers.get("content-type", "").split(";")[0].strip() == GZIP_MEDIA_TYPE)
+
+async def _decompressed(chunks: AsyncIterator[bytes], piece_bytes: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    """Descomprime gzip en trozos acotados (un cuerpo muy comprimido no se expande de golpe)"""
+    decompressor = zlib.decompressobj(47)
+    async for chunk in chunks:
+        while chunk:
+            piece = decompressor.decompress(chunk, piece_bytes)
+            chunk = decompressor.unconsumed_tail
+            if piece:
+                yield piece
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+async def decode_lines(chunks: AsyncIterator[bytes], compressed: bool = False,
+                       max_line_bytes: int = MAX_IMPORT_LINE_BYTES) -> AsyncIterator[Tuple[int, bytes]]:
+    """Devuelve (número de línea, contenido) a medida que llega el cuerpo"""
+    if compressed:
+        chunks = _decompressed(chunks)
+    pending = bytearray()
+    line_number = 0
+    async for chunk in chunks:
+        pending += chunk
+        if b"\n" in chunk:
+            *lines, rest = pending.split(b"\n")
+            pending = bytearray(rest)
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    yield line_number, bytes(line)
+        if len(pending) > max_line_bytes:
+            raise LineTooLongError(f"La línea {line_number + 1} supera {max_line_bytes} bytes")
+    if pending.strip():
+        yield line_number + 1, bytes(pending)
+
+def parse_product_line(line: bytes) -> Product:
+    """Valida una línea exportada; conserva id y fechas si vienen"""
+    try:
+        data = orjson.loads(line) if orjson is not None else json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"JSON no válido: {str(e)}")
+    if not isinstance(data, dict):
+        raise ValueError("Cada línea debe ser un objeto JSON")
+    try:
+        # Los nulos toman el valor por defecto del modelo (id y fechas nuevas)
+        return Product(**{k: v for k, v in data.items() if v is not None})
+    except ValidationError as e:
+        raise ValueError(f"Datos no válidos: {e.error_count()} errores")
+
+class ImportReport:
+    """Progreso y resultado de una importación por lotes"""
+
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors: List[dict] = []
+
+    def error(self, line: Optional[int], reason: str, count: int = 1):
+        self.failed += count
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "reason": reason})
+
+    def batch_done(self, label: str):
+        self.batches += 1
+        logger.info(f"{label}: batch {self.batches}, {self.processed} processed, "
+                    f"{self.created} created, {self.updated} updated, {self.failed} failed")
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
@@ -0,0 +1,77 @@
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Segundos sin uso tras los que MongoDB elimina una entrada (índice TTL sobre
+# last_used_at, que se renueva en cada acierto: funciona como un LRU por tiempo)
+PDF_CACHE_TTL = int(os.environ.get('PDF_CACHE_TTL', 7 * 24 * 3600))
+
+# Colecciones: resultado por versión del extractor y SHA-256 del PDF, y
+# texto por hash de página
+DOCUMENT_COLLECTION = "pdf_cache"
+PAGE_COLLECTION = "pdf_page_cache"
+
+stats = {"document_hits": 0, "document_misses": 0, "page_hits": 0, "page_misses": 0}
+
+async def get_document(db: AsyncIOMotorDatabase, key: str) -> Optional[dict]:
+    """Resultado guardado para un PDF con el mismo contenido (y versión del extractor), o None"""
+    entry = await db[DOCUMENT_COLLECTION].find_one_and_update(
+        {"_id": key},
+        {"$set": {"last_used_at": datetime.utcnow()}},
+        projection={"_id": 0, "products": 1, "total_pages": 1, "total_text_length": 1}
+    )
+    stats["document_hits" if entry else "document_misses"] += 1
+    return entry
+
+async def put_document(db: AsyncIOMotorDatabase, key: str, result: dict):
+    try:
+        await db[DOCUMENT_COLLECTION].replace_one(
+            {"_id": key},
+            {
+                "products": result["products"],
+                "total_pages": result["total_pages"],
+                "total_text_length": result["total_text_length"],
+                "last_used_at": datetime.utcnow()
+            },
+            upsert=True
+        )
+    except Exception as e:
+        # Un resultado muy grande puede superar el límite de documento; no es fatal
+        logger.error(f"Error caching PDF result {key}: {str(e)}")
+
+async def get_pages(db: AsyncIOMotorDatabase, page_hashes: Iterable[str]) -> Dict[str, str]:
+    """Textos guardados de las páginas cuyo hash de contenido ya se conoce"""
+    page_hashes = list(set(page_hashes))
+    if not page_hashes:
+        return {}
+    cached = {}
+    async for entry in db[PAGE_COLLECTION].find({"_id": {"$in": page_hashes}}, {"text": 1}):
+        cached[entry["_id"]] = entry["text"]
+    if cached:
+        await db[PAGE_COLLECTION].update_many(
+            {"_id": {"$in": list(cached)}}, {"$set": {"last_used_at": datetime.utcnow()}}
+        )
+    return cached
+
+async def put_pages(db: AsyncIOMotorDatabase, pages: Dict[str, str]):
+    if not pages:
+        return
+    now = datetime.utcnow()
+    try:
+        await db[PAGE_COLLECTION].bulk_write(
+            [UpdateOne({"_id": h}, {"$set": {"text": t, "last_used_at": now}}, upsert=True)
+             for h, t in pages.items()],
+            ordered=False
+        )
+    except Exception as e:
+        logger.error(f"Error caching PDF pages: {str(e)}")
+
+def record_pages(hits: int, misses: int):
+    stats["page_hits"] += hits
+    stats["page_misses"] += misses
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Trabajos de importación activos a la vez y tiempo que se conservan al terminar
+PDF_MAX_JOBS = int(os.environ.get('PDF_MAX_JOBS', 4))
+PDF_JOB_RETENTION = float(os.environ.get('PDF_JOB_RETENTION', 3600))
+
+class PDFJob:
+    """Estado de una importación de PDF que se procesa en segundo plano"""
+
+    def __init__(self, filename: str):
+        self.id = str(uuid.uuid4())
+        self.filename = filename
+        self.status = "queued"
+        self.total_pages = 0
+        self.pages_processed = 0
+        self.products: List[dict] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        # Número de cambios; los clientes SSE esperan a que aumente
+        self.version = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    async def update(self, **changes):
+        for key, value in changes.items():
+            setattr(self, key, value)
+        if self.finished and self.finished_at is None:
+            self.finished_at = time.time()
+        async with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    async def add_products(self, products: List[dict], pages_processed: int):
+        self.products.extend(products)
+        await self.update(pages_processed=pages_processed)
+
+    async def wait_for_change(self, version: int, timeout: float) -> bool:
+        """Espera a que la versión supere `version`; False si vence el timeout"""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.version > version), timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+    def snapshot(self, since: int = 0) -> dict:
+        """Estado del trabajo con los productos encontrados a partir de `since`"""
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "total_pages": self.total_pages,
+            "pages_processed": self.pages_processed,
+            "products_found": len(self.products),
+            "products": self.products[since:],
+            "next": len(self.products),
+            "error": self.error,
+        }
+
+_jobs: Dict[str, PDFJob] = {}
+
+def _purge_expired():
+    now = time.time()
+    for job_id in [j.id for j in _jobs.values() if j.finished and now - j.finished_at > PDF_JOB_RETENTION]:
+        del _jobs[job_id]
+
+def active_jobs() -> int:
+    return sum(1 for job in _jobs.values() if not job.finished)
+
+def create_job(filename: str) -> Optional[PDFJob]:
+    """Registra un trabajo nuevo, o devuelve None si ya hay demasiados activos"""
+    _purge_expired()
+    if active_jobs() >= PDF_MAX_JOBS:
+        return None
+    job = PDFJob(filename)
+    _jobs[job.id] = job
+    return job
+
+def get_job(job_id: str) -> Optional[PDFJob]:
+    return _jobs.get(job_id)
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuración del pool de procesos para el análisis de PDF
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+PDF_JOB_TIMEOUT = float(os.environ.get('PDF_JOB_TIMEOUT', 120))
+# Trabajos en ejecución más en cola; por encima se rechazan las subidas
+PDF_MAX_PENDING = int(os.environ.get('PDF_MAX_PENDING', PDF_WORKERS * 2))
+
+class PoolBusyError(Exception):
+    """La cola de trabajos está llena"""
+
+class JobTimeoutError(Exception):
+    """El trabajo superó el tiempo máximo"""
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+# El contador se libera desde el hilo interno del executor
+_pending_lock = threading.Lock()
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _executor
+
+def _release(_future):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+async def run_in_pool(fn: Callable, *args, timeout: Optional[float] = PDF_JOB_TIMEOUT):
+    """
+    Ejecuta `fn(*args)` en el pool de procesos sin bloquear el event loop.
+
+    Un trabajo que supera el timeout sigue ocupando su plaza hasta que el
+    proceso termina, así la cola refleja la carga real de los workers.
+    """
+    global _executor, _pending
+    with _pending_lock:
+        if _pending >= PDF_MAX_PENDING:
+            raise PoolBusyError()
+        _pending += 1
+
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BrokenProcessPool:
+        _release(None)
+        _executor = None
+        raise
+    future.add_done_callback(_release)
+
+    try:
+        # Si vence el timeout se cancela el trabajo cuando aún está en cola
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        raise JobTimeoutError()
+    except BrokenProcessPool:
+        # Un worker murió (p. ej. por memoria): crear un pool nuevo para los siguientes
+        logger.error("PDF process pool is broken, recreating it")
+        _executor = None
+        raise
+
+def pending() -> int:
+    """Trabajos en ejecución más en cola"""
+    return _pending
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,116 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bytes máximos de respuestas guardadas y segundos que vive cada una. Cada
+# proceso tiene su propia caché: el TTL acota cuánto tarda un worker en ver
+# las escrituras hechas en otro.
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 60))
+
+class CachedResponse:
+    __slots__ = ("cache_key", "body", "headers", "expires_at", "encoded")
+
+    def __init__(self, cache_key: Tuple[str, Hashable], body: bytes, headers: Dict[str, str], expires_at: float):
+        self.cache_key = cache_key
+        self.body = body
+        self.headers = headers
+        self.expires_at = expires_at
+        # Content-Encoding -> cuerpo comprimido (lo rellena services/compression.py)
+        self.encoded: Dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        return (len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+                + sum(len(v) for v in self.encoded.values()))
+
+class ResponseCache:
+    """
+    LRU de respuestas JSON ya serializadas, limitada por tamaño total.
+
+    Las claves se agrupan por espacio ("products", "config") y cada escritura
+    invalida su espacio entero. Cada espacio tiene una generación: una lectura
+    que empezó antes de una escritura no guarda su resultado, así no se
+    cachea un dato viejo.
+
+    Las variantes comprimidas de una respuesta se guardan en su misma
+    entrada, así caducan y se invalidan con ella.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, Hashable], CachedResponse]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    def get(self, namespace: str, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get((namespace, key))
+        if entry is None or entry.expires_at < time.monotonic():
+            if entry is not None:
+                self._remove((namespace, key))
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end((namespace, key))
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, namespace: str, key: Hashable, body: bytes, headers: Optional[Dict[str, str]] = None,
+            generation: Optional[int] = None) -> Optional[CachedResponse]:
+        """
+        Guarda una respuesta salvo que el espacio se haya invalidado desde
+        `generation`. Devuelve la entrada guardada, o None si no se guardó.
+        """
+        if generation is not None and generation != self.generation(namespace):
+            return None
+        entry = CachedResponse((namespace, key), body, dict(headers or {}), time.monotonic() + self.ttl)
+        # Una sola respuesta enorme no debe vaciar la caché entera
+        if self.max_bytes <= 0 or entry.size > self.max_bytes // 8:
+            return None
+        self._remove((namespace, key))
+        self._entries[(namespace, key)] = entry
+        self.size += entry.size
+        self._evict()
+        return entry
+
+    def put_encoded(self, entry: CachedResponse, encoding: str, body: bytes):
+        """Añade a `entry` su cuerpo comprimido con `encoding`, si la entrada sigue en la caché"""
+        if self._entries.get(entry.cache_key) is not entry:
+            return
+        self.size += len(body) - len(entry.encoded.get(encoding, b""))
+        entry.encoded[encoding] = body
+        self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, namespace: str):
+        self._generations[namespace] = self.generation(namespace) + 1
+        for cache_key in [k for k in self._entries if k[0] == namespace]:
+            self._remove(cache_key)
+        self.stats["invalidations"] += 1
+
+    def clear(self):
+        for namespace in {k[0] for k in self._entries} | set(self._generations):
+            self.invalidate(namespace)
+
+    def _remove(self, cache_key):
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes}
+
+response_cache = ResponseCache()
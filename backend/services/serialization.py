@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Iterable
+
+from fastapi.encoders import jsonable_encoder
+from pydantic_core import PydanticUndefined
+
+from models.Product import Product
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson está en requirements.txt
+    orjson = None
+
+# Ruta rápida opcional: las filas de la base de datos se serializan con orjson
+# sin construir un modelo Pydantic por producto. La salida es idéntica byte a
+# byte a la de la ruta normal.
+FAST_JSON = os.environ.get('FAST_JSON', 'false').lower() == 'true'
+if FAST_JSON and orjson is None:
+    logger.warning("FAST_JSON is enabled but orjson is not installed; using the standard encoder")
+    FAST_JSON = False
+
+# Campos de Product en el orden en que los serializa el modelo, con su valor
+# por defecto (None para los que se generan con default_factory)
+PRODUCT_DEFAULTS = {
+    name: (None if field.default is PydanticUndefined else field.default)
+    for name, field in Product.model_fields.items()
+}
+DATETIME_FIELDS = ("created_at", "updated_at")
+
+def render_json(content) -> bytes:
+    """Serializa igual que JSONResponse de FastAPI"""
+    if FAST_JSON:
+        return orjson.dumps(content, default=jsonable_encoder)
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def product_row(doc: dict) -> dict:
+    """
+    Documento de la base de datos con la forma exacta de Product: mismos
+    campos, mismo orden y los valores por defecto del modelo.
+    """
+    row = {name: doc.get(name, default) for name, default in PRODUCT_DEFAULTS.items()}
+    # Supabase devuelve UUID, DATE y TIMESTAMPTZ como texto con otro formato
+    if row["id"] is not None:
+        row["id"] = str(row["id"])
+    if row["fecha_lanzamiento"]:
+        row["fecha_lanzamiento"] = str(row["fecha_lanzamiento"])
+    for name in DATETIME_FIELDS:
+        if isinstance(row[name], str):
+            row[name] = datetime.fromisoformat(row[name])
+    return row
+
+def render_products(docs: Iterable[dict]) -> bytes:
+    """Lista de productos serializada sin validar cada fila con Pydantic"""
+    if FAST_JSON:
+        # Pydantic escribe las fechas UTC con "Z"
+        return orjson.dumps([product_row(doc) for doc in docs], option=orjson.OPT_UTC_Z)
+    return render_json([Product(**doc) for doc in docs])
@@ -0,0 +1,171 @@
+import bisect
+import heapq
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+from services.catalog_version import product_listeners
+from services.change_feed import ChangeFeedIndex
+
+logger = logging.getLogger(__name__)
+
+# Campos indexados y su peso en el orden de las sugerencias
+SUGGEST_WEIGHTS = {"titulo": 10, "plataformas": 4, "pais": 2}
+DEFAULT_SUGGESTIONS = int(os.environ.get('SUGGEST_DEFAULT_LIMIT', 8))
+MAX_SUGGESTIONS = 20
+# Consultas recientes con su resultado; los prefijos cortos ("h", "ha") se
+# repiten mucho y son los que más productos recorren
+SUGGEST_CACHE_SIZE = int(os.environ.get('SUGGEST_CACHE_SIZE', 1024))
+
+_WORD = re.compile(r'[^\W_]+')
+
+def fold(value) -> List[str]:
+    """Palabras sin acentos ni mayúsculas, en orden"""
+    if isinstance(value, list):
+        value = " ".join(str(v) for v in value)
+    text = str(value or "").casefold()
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return _WORD.findall(text)
+
+class SuggestIndex(ChangeFeedIndex):
+    """
+    Índice de prefijos en memoria para el autocompletado: vocabulario
+    ordenado (cada prefijo es un rango que se localiza con bisect) y, por
+    palabra, los productos que la contienen con el peso de su mejor campo.
+
+    Cada proceso tiene el suyo. Se carga la primera vez que se usa y, como
+    los demás índices del catálogo (ChangeFeedIndex), aplica al momento las
+    escrituras de este proceso y se pone al día con list_changes cuando
+    otro worker escribe, sin reconstruirse.
+    """
+
+    name = "Suggest index"
+
+    def _reset(self):
+        # id -> lo que se devuelve (id, título, categoría, subcategoría)
+        self.entries: Dict[str, dict] = {}
+        self.row_of = self.entries
+        # id -> palabras del producto con su peso, para poder quitarlo
+        self.tokens: Dict[str, Dict[str, int]] = {}
+        # id -> título normalizado, para preferir los que empiezan por la consulta
+        self.folded_titles: Dict[str, str] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.vocabulary: List[str] = []
+        # (palabras de la consulta, límite) -> resultado; se vacía con cada cambio
+        self._results: "OrderedDict[Tuple[Tuple[str, ...], int], List[dict]]" = OrderedDict()
+
+    def _product_tokens(self, product: dict) -> Dict[str, int]:
+        tokens: Dict[str, int] = {}
+        for field, weight in SUGGEST_WEIGHTS.items():
+            for token in fold(product.get(field)):
+                tokens[token] = max(tokens.get(token, 0), weight)
+        return tokens
+
+    def _store(self, product: dict) -> List[str]:
+        """Guarda el producto y devuelve las palabras que no estaban en el vocabulario"""
+        product_id = product["id"]
+        self.entries[product_id] = {
+            "id": product_id,
+            "titulo": product.get("titulo"),
+            "categoria": product.get("categoria"),
+            "subcategoria": product.get("subcategoria"),
+        }
+        self.tokens[product_id] = self._product_tokens(product)
+        self.folded_titles[product_id] = " ".join(fold(product.get("titulo")))
+        new_tokens = []
+        for token, weight in self.tokens[product_id].items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                new_tokens.append(token)
+            posting[product_id] = weight
+        return new_tokens
+
+    def extend(self, products: Iterable[dict]):
+        """Añade o reemplaza varios productos"""
+        self._results.clear()
+        new_tokens = []
+        # Un id repetido en el lote se quedaría con palabras fuera del vocabulario
+        for product in {product["id"]: product for product in products}.values():
+            self.remove(product["id"])
+            new_tokens.extend(self._store(product))
+        if len(new_tokens) == 1:
+            bisect.insort(self.vocabulary, new_tokens[0])
+        elif new_tokens:
+            # Con un lote se ordena una vez: el vocabulario ya ordenado y las
+            # palabras nuevas son dos tramos que sort() solo tiene que mezclar
+            self.vocabulary.extend(new_tokens)
+            self.vocabulary.sort()
+
+    def remove(self, product_id: str):
+        if self.entries.pop(product_id, None) is None:
+            return
+        self._results.clear()
+        del self.folded_titles[product_id]
+        for token in self.tokens.pop(product_id):
+            posting = self.postings[token]
+            posting.pop(product_id, None)
+            if not posting:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def _matches(self, prefix: str) -> Dict[str, int]:
+        """Productos con alguna palabra que empieza por `prefix` y su mejor peso"""
+        matches: Dict[str, int] = {}
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        for token in self.vocabulary[start:bisect.bisect_left(self.vocabulary, prefix + "\uffff")]:
+            for product_id, weight in self.postings[token].items():
+                if weight > matches.get(product_id, 0):
+                    matches[product_id] = weight
+        return matches
+
+    def suggest(self, query: str, limit: int = DEFAULT_SUGGESTIONS) -> List[dict]:
+        """
+        Productos en los que cada palabra de `query` es prefijo de alguna de
+        sus palabras. Ordena por peso de los campos coincidentes, luego los
+        títulos que empiezan por la consulta y los más cortos.
+        """
+        prefixes = fold(query)
+        if not prefixes:
+            return []
+        key = (tuple(prefixes), limit)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._results.move_to_end(key)
+            return cached
+        result = self._search(prefixes, limit)
+        self._results[key] = result
+        if len(self._results) > SUGGEST_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return result
+
+    def _search(self, prefixes: List[str], limit: int) -> List[dict]:
+        # La palabra más larga es la más selectiva: da los candidatos, y las
+        # demás solo se comprueban contra las palabras de esos candidatos
+        first, *rest = sorted(set(prefixes), key=len, reverse=True)
+        scores = self._matches(first)
+        for prefix in rest:
+            narrowed = {}
+            for product_id, score in scores.items():
+                weight = max((w for t, w in self.tokens[product_id].items() if t.startswith(prefix)), default=0)
+                if weight:
+                    narrowed[product_id] = score + weight
+            scores = narrowed
+        if not scores:
+            return []
+
+        phrase = " ".join(prefixes)
+
+        def rank(product_id: str) -> tuple:
+            title = self.folded_titles[product_id]
+            return (scores[product_id], title.startswith(phrase), -len(title))
+
+        best = heapq.nlargest(limit, scores, key=rank)
+        return [self.entries[product_id] for product_id in best]
+
+suggest_index = SuggestIndex()
+product_listeners.append(suggest_index.apply)
@@ -6,6 +6,7 @@ import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const JOB_POLL_INTERVAL = 1000;
 
 export const PDFUploader = ({ onProductsExtracted }) => {
   const [selectedFile, setSelectedFile] = useState(null);
@@ -24,9 +25,9 @@ export const PDFUploader = ({ onProductsExtracted }) => {
         return;
       }
       
-      // Validar tamaño (máximo 10MB)
-      if (file.size > 10 * 1024 * 1024) {
-        setError('El archivo es demasiado grande. Por favor selecciona un PDF menor a 10MB');
+      // Validar tamaño (máximo 50MB, igual que PDF_MAX_BYTES en el backend)
+      if (file.size > 50 * 1024 * 1024) {
+        setError('El archivo es demasiado grande. Por favor selecciona un PDF menor a 50MB');
         return;
       }
 
@@ -58,20 +59,39 @@ export const PDFUploader = ({ onProductsExtracted }) => {
       const formData = new FormData();
       formData.append('file', selectedFile);
       
-      setProcessingInfo('Analizando contenido del PDF...');
-      
-      const response = await axios.post(`${API}/pdf/upload`, formData, {
+      // El servidor procesa el PDF en segundo plano y devuelve un id de trabajo
+      const { data: job } = await axios.post(`${API}/pdf/jobs`, formData, {
         headers: {
           'Content-Type': 'multipart/form-data'
         },
-        timeout: 30000 // 30 segundos
+        timeout: 30000 // 30 segundos para subir el archivo
       });
       
-      if (response.data.success) {
-        setExtractedProducts(response.data.products);
-        setProcessingInfo(`Procesamiento completado. Se encontraron ${response.data.products.length} productos.`);
-      } else {
-        setError('No se pudieron extraer productos del PDF');
+      setProcessingInfo('Analizando contenido del PDF...');
+      
+      // Consultar el progreso y acumular los productos encontrados por tandas
+      let products = [];
+      let status = job.status;
+      while (status !== 'completed' && status !== 'failed') {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL));
+        const { data } = await axios.get(`${API}/pdf/jobs/${job.job_id}`, {
+          params: { since: products.length }
+        });
+        products = products.concat(data.products);
+        status = data.status;
+        if (data.total_pages) {
+          setProcessingInfo(
+            `Analizando página ${data.pages_processed} de ${data.total_pages}. Productos encontrados: ${data.products_found}`
+          );
+        }
+        if (status === 'failed') {
+          setError(data.error || 'No se pudieron extraer productos del PDF');
+        }
+      }
+      
+      if (status === 'completed') {
+        setExtractedProducts(products);
+        setProcessingInfo(`Procesamiento completado. Se encontraron ${products.length} productos.`);
       }
       
     } catch (err) {
@@ -79,7 +99,7 @@ export const PDFUploader = ({ onProductsExtracted }) => {
       if (err.response?.data?.detail) {
         setError(err.response.data.detail);
       } else if (err.code === 'ECONNABORTED') {
-        setError('El procesamiento tomó demasiado tiempo. Intenta con un archivo más pequeño.');
+        setError('La subida del archivo tomó demasiado tiempo. Intenta nuevamente.');
       } else {
         setError('Error al procesar el PDF. Por favor intenta nuevamente.');
       }
@@ -101,7 +121,9 @@ export const PDFUploader = ({ onProductsExtracted }) => {
         if (onProductsExtracted) {
           onProductsExtracted(extractedProducts);
         }
-        alert(`${response.data.saved_count} productos agregados exitosamente al catálogo`);
+        const { created, updated, skipped, failed } = response.data;
+        const failedInfo = failed ? `, ${failed} no se pudieron guardar` : '';
+        alert(`${created} productos agregados y ${updated} actualizados en el catálogo (${skipped} omitidos${failedInfo})`);
         clearFile();
       } else {
         setError('Error al guardar los productos');
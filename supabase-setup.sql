@@ -12,10 +12,28 @@ CREATE TABLE IF NOT EXISTS products (
     plataformas TEXT[], -- Array de strings
     categoria VARCHAR(50) NOT NULL,
     subcategoria VARCHAR(50),
+    natural_key TEXT, -- título normalizado|categoria|subcategoria (lo calcula el backend)
+    change_seq BIGINT, -- posición en la secuencia de cambios (la asigna un trigger)
+    changed_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Migración para tablas creadas antes de la clave natural; el backend la
+-- rellena al arrancar
+ALTER TABLE products ADD COLUMN IF NOT EXISTS natural_key TEXT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS change_seq BIGINT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS changed_at TIMESTAMP WITH TIME ZONE;
+
+-- Marcas de borrado para la sincronización incremental (/api/products/changes).
+-- El backend borra al arrancar las más antiguas que TOMBSTONE_RETENTION_DAYS
+CREATE SEQUENCE IF NOT EXISTS products_change_seq;
+CREATE TABLE IF NOT EXISTS product_tombstones (
+    id UUID PRIMARY KEY,
+    change_seq BIGINT NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Crear tabla de configuración del sitio
 CREATE TABLE IF NOT EXISTS site_config (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -27,7 +45,7 @@ CREATE TABLE IF NOT EXISTS site_config (
 -- Crear tabla de redes sociales
 CREATE TABLE IF NOT EXISTS social_networks (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
-    name VARCHAR(100) NOT NULL,
+    name VARCHAR(100) UNIQUE NOT NULL,
     url TEXT NOT NULL,
     icon VARCHAR(50) NOT NULL,
     is_active BOOLEAN DEFAULT true,
@@ -37,7 +55,7 @@ CREATE TABLE IF NOT EXISTS social_networks (
 -- Crear tabla de grupos de negocio
 CREATE TABLE IF NOT EXISTS business_groups (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
-    name VARCHAR(255) NOT NULL,
+    name VARCHAR(255) UNIQUE NOT NULL,
     description TEXT,
     link TEXT,
     is_active BOOLEAN DEFAULT true,
@@ -48,10 +66,83 @@ CREATE TABLE IF NOT EXISTS business_groups (
 CREATE INDEX IF NOT EXISTS idx_products_categoria ON products(categoria);
 CREATE INDEX IF NOT EXISTS idx_products_subcategoria ON products(subcategoria);
 CREATE INDEX IF NOT EXISTS idx_products_fecha ON products(fecha_lanzamiento);
+-- Upsert por clave natural (importaciones) y paginación por (created_at, id)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_natural_key ON products(natural_key);
+CREATE INDEX IF NOT EXISTS idx_products_created ON products(created_at DESC, id DESC);
+-- Cambios posteriores a una secuencia (/api/products/changes)
+CREATE INDEX IF NOT EXISTS idx_products_change_seq ON products(change_seq);
+CREATE INDEX IF NOT EXISTS idx_product_tombstones_seq ON product_tombstones(change_seq);
 CREATE INDEX IF NOT EXISTS idx_products_titulo ON products USING gin(to_tsvector('spanish', titulo));
 CREATE INDEX IF NOT EXISTS idx_products_descripcion ON products USING gin(to_tsvector('spanish', descripcion));
 CREATE INDEX IF NOT EXISTS idx_site_config_key ON site_config(key);
 
+-- Búsqueda de texto completo ordenada por relevancia.
+-- Las expresiones coinciden con idx_products_titulo e idx_products_descripcion
+-- para que PostgreSQL use los índices GIN en lugar de recorrer la tabla.
+CREATE OR REPLACE FUNCTION search_products(q TEXT)
+RETURNS SETOF products AS $$
+    SELECT p.*
+    FROM products p, websearch_to_tsquery('spanish', q) query
+    WHERE to_tsvector('spanish', p.titulo) @@ query
+       OR to_tsvector('spanish', p.descripcion) @@ query
+    ORDER BY 2 * ts_rank(to_tsvector('spanish', p.titulo), query)
+           + ts_rank(to_tsvector('spanish', p.descripcion), query) DESC,
+             p.created_at DESC;
+$$ LANGUAGE sql STABLE;
+
+-- Migración para bases creadas antes de que name fuera único: se eliminan
+-- las filas inactivas acumuladas y los duplicados (se conserva el más reciente)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'social_networks_name_key') THEN
+        DELETE FROM social_networks a USING social_networks b
+        WHERE a.name = b.name AND (a.created_at, a.id) < (b.created_at, b.id);
+        ALTER TABLE social_networks ADD CONSTRAINT social_networks_name_key UNIQUE (name);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'business_groups_name_key') THEN
+        DELETE FROM business_groups WHERE is_active = false;
+        DELETE FROM business_groups a USING business_groups b
+        WHERE a.name = b.name AND (a.created_at, a.id) < (b.created_at, b.id);
+        ALTER TABLE business_groups ADD CONSTRAINT business_groups_name_key UNIQUE (name);
+    END IF;
+END $$;
+
+-- Reemplazo de redes sociales y grupos de negocio en una sola sentencia
+-- (una transacción y un round trip): las filas recibidas se insertan o
+-- actualizan por nombre y las que ya no están en la lista se eliminan.
+CREATE OR REPLACE FUNCTION replace_social_networks(networks JSONB)
+RETURNS SETOF social_networks AS $$
+    WITH incoming AS (
+        SELECT DISTINCT ON (name) name, url, COALESCE(NULLIF(icon, ''), name) AS icon
+        FROM jsonb_to_recordset(networks) AS n(name TEXT, url TEXT, icon TEXT)
+        WHERE COALESCE(name, '') <> '' AND COALESCE(url, '') <> ''
+    ), purged AS (
+        DELETE FROM social_networks s
+        WHERE NOT EXISTS (SELECT 1 FROM incoming i WHERE i.name = s.name)
+    )
+    INSERT INTO social_networks (name, url, icon, is_active)
+    SELECT name, url, icon, true FROM incoming
+    ON CONFLICT (name) DO UPDATE SET url = EXCLUDED.url, is_active = true
+    RETURNING *;
+$$ LANGUAGE sql VOLATILE;
+
+CREATE OR REPLACE FUNCTION replace_business_groups(groups JSONB)
+RETURNS SETOF business_groups AS $$
+    WITH incoming AS (
+        SELECT DISTINCT ON (name) name, COALESCE(description, '') AS description, COALESCE(link, '') AS link
+        FROM jsonb_to_recordset(groups) AS g(name TEXT, description TEXT, link TEXT)
+        WHERE COALESCE(name, '') <> ''
+    ), purged AS (
+        DELETE FROM business_groups b
+        WHERE NOT EXISTS (SELECT 1 FROM incoming i WHERE i.name = b.name)
+    )
+    INSERT INTO business_groups (name, description, link, is_active)
+    SELECT name, description, link, true FROM incoming
+    ON CONFLICT (name) DO UPDATE
+        SET description = EXCLUDED.description, link = EXCLUDED.link, is_active = true
+    RETURNING *;
+$$ LANGUAGE sql VOLATILE;
+
 -- Función para actualizar el campo updated_at automáticamente
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -68,6 +159,38 @@ CREATE TRIGGER update_products_updated_at BEFORE UPDATE ON products
 CREATE TRIGGER update_site_config_updated_at BEFORE UPDATE ON site_config
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Cada inserción o actualización de un producto toma la siguiente posición
+-- de la secuencia de cambios, y cada borrado deja una marca con la suya
+CREATE OR REPLACE FUNCTION set_product_change_seq()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.change_seq = nextval('products_change_seq');
+    NEW.changed_at = NOW();
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION record_product_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO product_tombstones (id, change_seq, deleted_at)
+    VALUES (OLD.id, nextval('products_change_seq'), NOW())
+    ON CONFLICT (id) DO UPDATE SET change_seq = EXCLUDED.change_seq, deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS set_products_change_seq ON products;
+CREATE TRIGGER set_products_change_seq BEFORE INSERT OR UPDATE ON products
+    FOR EACH ROW EXECUTE FUNCTION set_product_change_seq();
+
+DROP TRIGGER IF EXISTS record_products_tombstone ON products;
+CREATE TRIGGER record_products_tombstone AFTER DELETE ON products
+    FOR EACH ROW EXECUTE FUNCTION record_product_tombstone();
+
+-- Migración: las filas anteriores a la secuencia reciben su posición (el trigger la asigna)
+UPDATE products SET changed_at = NOW() WHERE change_seq IS NULL;
+
 -- Políticas RLS (Row Level Security) - Opcional, para seguridad adicional
 -- ALTER TABLE products ENABLE ROW LEVEL SECURITY;
 -- ALTER TABLE site_config ENABLE ROW LEVEL SECURITY;
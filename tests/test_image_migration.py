@@ -0,0 +1,42 @@
+import base64
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from database import image_store
+from database.memory_product_repository import MemoryProductRepository
+from models.Product import Product
+
+DATA_URL = "data:image/png;base64," + base64.b64encode(b"png").decode()
+
+def _product(**fields) -> dict:
+    return Product(
+        descripcion="", pais="AR", fecha_lanzamiento="2020", categoria="A", **fields
+    ).dict()
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.mark.anyio
+async def test_migration_writes_products_through_the_repository(monkeypatch):
+    async def store(db, data):
+        return {"id": "abc", "url": image_store.image_url("abc"), "widths": []}
+
+    monkeypatch.setattr(image_store, "store_image", store)
+    repo = MemoryProductRepository()
+    await repo.create_product(_product(id="1", titulo="Con base64", imagen=DATA_URL))
+    await repo.create_product(_product(id="2", titulo="Con URL", imagen="/img.png"))
+    changes = await repo.list_changes(0, 10)
+
+    db = AsyncMongoMockClient()["test"]
+    await db.site_config.insert_one({"key": "logo", "value": DATA_URL})
+    result = await image_store.migrate_base64_images(db, repo)
+
+    assert result == {"products": 1, "config": 1, "failed": 0}
+    assert (await repo.get_product("1"))["imagen"] == "/api/images/abc"
+    assert (await repo.get_product("2"))["imagen"] == "/img.png"
+    assert (await db.site_config.find_one({"key": "logo"}))["value"] == "/api/images/abc"
+    # La nueva URL llega a los clientes que sincronizan por cambios
+    later = await repo.list_changes(changes[-1]["seq"], 10)
+    assert [change["id"] for change in later] == ["1"]
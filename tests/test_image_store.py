@@ -0,0 +1,21 @@
+import io
+
+import pytest
+from PIL import Image
+
+from database import image_store
+
+def _png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def test_decompression_bomb_is_an_invalid_image(monkeypatch):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    with pytest.raises(image_store.InvalidImageError, match="demasiados píxeles"):
+        image_store._render_thumbnails(_png(300, 300))
+
+def test_thumbnails_are_never_wider_than_the_original():
+    content_type, thumbnails = image_store._render_thumbnails(_png(300, 150))
+    assert content_type == "image/png"
+    assert sorted(thumbnails) == [200]
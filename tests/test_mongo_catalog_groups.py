@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import OperationFailure
+
+from database.mongo_product_repository import MongoProductRepository
+from database.product_repository import get_product_repository
+from routes import bootstrap
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+class _Products:
+    """Colección que registra el pipeline (mongomock no implementa $topN)"""
+
+    def __init__(self, groups, error=None):
+        self.groups = groups
+        self.error = error
+        self.pipelines = []
+
+    @property
+    def pipeline(self):
+        return self.pipelines[-1]
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        if self.error and any("$topN" in str(stage) for stage in pipeline):
+            raise self.error
+
+        async def results():
+            for group in self.groups:
+                yield group
+
+        return results()
+
+@pytest.mark.anyio
+async def test_catalog_groups_keeps_the_newest_per_group_while_grouping():
+    products = _Products([{
+        "_id": {"categoria": "juegos", "subcategoria": "pc"}, "total": 7,
+        "products": [{"id": "b", "titulo": "Halo"}, {"id": "a", "titulo": "Zelda"}],
+    }])
+    repo = MongoProductRepository(type("DB", (), {"products": products})())
+
+    groups = await repo.catalog_groups(["id", "titulo"], 2)
+
+    assert groups == [{
+        "categoria": "juegos", "subcategoria": "pc", "total": 7,
+        "products": [{"id": "b", "titulo": "Halo"}, {"id": "a", "titulo": "Zelda"}],
+    }]
+    group = products.pipeline[0]["$group"]
+    assert group["products"] == {"$topN": {
+        "n": 2, "sortBy": {"created_at": -1, "id": -1}, "output": {"id": "$id", "titulo": "$titulo"},
+    }}
+    # Sin $push de todo el grupo ni $slice posterior
+    assert all("$project" not in stage for stage in products.pipeline)
+
+@pytest.mark.anyio
+async def test_catalog_groups_falls_back_when_the_server_has_no_top_n():
+    products = _Products([], error=OperationFailure("Unrecognized accumulator '$topN'"))
+    repo = MongoProductRepository(type("DB", (), {"products": products})())
+
+    await repo.catalog_groups(["id"], 2)
+    await repo.catalog_groups(["id"], 2)
+
+    # $push + $slice, y la segunda vez ya no se intenta $topN
+    assert len(products.pipelines) == 3
+    assert products.pipelines[1] == products.pipelines[2]
+    assert products.pipeline[1]["$group"]["products"] == {"$push": {"id": "$id"}}
+    assert products.pipeline[2]["$project"]["products"] == {"$slice": ["$products", 2]}
+
+def _stored(product_id: str, categoria: str, subcategoria: str, created_at: datetime) -> dict:
+    return {
+        "id": product_id, "titulo": f"Producto {product_id}", "descripcion": "", "imagen": "/img.png",
+        "pais": "Japón", "fecha_lanzamiento": "2020", "plataformas": ["PC"], "categoria": categoria,
+        "subcategoria": subcategoria, "created_at": created_at, "updated_at": created_at,
+    }
+
+def test_bootstrap_groups_on_mongo(monkeypatch):
+    monkeypatch.delenv("SUPABASE_URL", raising=False)
+    db = AsyncMongoMockClient()["test"]
+    repo = MongoProductRepository(db)
+    start = datetime(2024, 1, 1)
+    asyncio.run(db.products.insert_many([
+        _stored(f"j{n}", "juegos", "pc", start + timedelta(minutes=n)) for n in range(3)
+    ] + [_stored("a0", "aplicaciones", "android", start)]))
+    monkeypatch.setattr(bootstrap, "BOOTSTRAP_CARDS_PER_GROUP", 2)
+
+    app = FastAPI()
+    app.include_router(bootstrap.router, prefix="/api")
+
+    async def get_database():
+        return db
+
+    async def get_repository():
+        return repo
+
+    app.dependency_overrides[bootstrap.get_database] = get_database
+    app.dependency_overrides[get_product_repository] = get_repository
+
+    response = TestClient(app).get("/api/bootstrap")
+
+    assert response.status_code == 200
+    catalog = response.json()["catalog"]
+    assert [(g["categoria"], g["total"], [p["id"] for p in g["products"]]) for g in catalog] == [
+        ("aplicaciones", 1, ["a0"]), ("juegos", 3, ["j2", "j1"])
+    ]
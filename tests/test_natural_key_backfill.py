@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from database import indexes
+from models.Product import product_natural_key
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+def _legacy(product_id: str, titulo: str, days: int) -> dict:
+    return {
+        "id": product_id, "titulo": titulo, "categoria": "juegos", "subcategoria": "pc",
+        "created_at": datetime(2024, 1, 1) + timedelta(days=days)
+    }
+
+@pytest.mark.anyio
+async def test_backfill_reports_legacy_products_that_share_a_key():
+    db = AsyncMongoMockClient()["test"]
+    await db.products.insert_many([
+        _legacy("halo", "Halo", 0),
+        _legacy("halo-copia", "  HALO ", 1),
+        _legacy("zelda", "Zelda", 2),
+    ])
+    # Uno de los productos antiguos repite la clave de uno reciente
+    await db.products.insert_one({
+        **_legacy("zelda-nuevo", "Zelda", -1), "natural_key": product_natural_key("Zelda", "juegos", "pc")
+    })
+
+    duplicates = await indexes.backfill_natural_keys(db, batch_size=2)
+
+    assert [(d["id"], d["duplicate_of"]["id"]) for d in duplicates] == [
+        ("halo-copia", "halo"), ("zelda", "zelda-nuevo")
+    ]
+    assert (await db.products.find_one({"id": "halo"}))["natural_key"] == product_natural_key("Halo", "juegos", "pc")
+    report = await indexes.legacy_duplicates(db)
+    assert report["count"] == 2
+    assert [(d["id"], d["duplicate_of"]["id"]) for d in report["products"]] == [
+        ("halo-copia", "halo"), ("zelda", "zelda-nuevo")
+    ]
+
+@pytest.mark.anyio
+async def test_backfill_is_a_single_query_when_nothing_is_pending(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    await db.products.insert_one({**_legacy("halo", "Halo", 0), "natural_key": "halo|juegos|pc"})
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("no debería recorrer los productos")
+
+    monkeypatch.setattr(type(db.products), "find", no_scan)
+    assert await indexes.backfill_natural_keys(db) == []
@@ -0,0 +1,89 @@
+import os
+import tempfile
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from benchmarks.pdf_fixtures import catalog_pdf
+from routes import pdf
+from services import pdf_cache
+from services.pdf_jobs import PDFJob
+from services.pdf_pool import PoolBusyError
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.mark.anyio
+async def test_job_fails_when_the_pool_stays_busy(monkeypatch):
+    async def busy(fn, *args):
+        raise PoolBusyError()
+
+    monkeypatch.setattr(pdf, "run_in_pool", busy)
+    monkeypatch.setattr(pdf, "PDF_JOB_TIMEOUT", 0.05)
+    monkeypatch.setattr(pdf, "POOL_RETRY_SECONDS", 0.01)
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(b"%PDF-1.4")
+    job = PDFJob("catalogo.pdf")
+    await pdf._run_pdf_job(job, tmp.name, "digest", AsyncMongoMockClient()["test"])
+
+    assert job.status == "failed"
+    assert "demasiados PDF" in job.error
+    assert not os.path.exists(tmp.name)
+
+class _BrokenUpload:
+    """Subida cuyo cuerpo se corta a mitad de lectura"""
+
+    def __init__(self):
+        self.reads = 0
+
+    def read(self, size):
+        self.reads += 1
+        if self.reads > 1:
+            raise ConnectionError("cliente desconectado")
+        return b"%PDF-1.4"
+
+@pytest.mark.anyio
+async def test_spool_upload_removes_the_partial_file(monkeypatch):
+    created = []
+    named_temporary_file = tempfile.NamedTemporaryFile
+
+    def tracking(*args, **kwargs):
+        tmp = named_temporary_file(*args, **kwargs)
+        created.append(tmp.name)
+        return tmp
+
+    monkeypatch.setattr(pdf.tempfile, "NamedTemporaryFile", tracking)
+    upload = type("Upload", (), {"file": _BrokenUpload()})()
+
+    with pytest.raises(ConnectionError):
+        await pdf._spool_upload(upload)
+
+    assert len(created) == 1
+    assert not os.path.exists(created[0])
+
+@pytest.mark.anyio
+async def test_job_reads_cached_pages_one_batch_at_a_time(monkeypatch):
+    async def inline(fn, *args):
+        return fn(*args)
+
+    requested = []
+    get_pages = pdf_cache.get_pages
+
+    async def recording_get_pages(db, page_hashes):
+        page_hashes = list(page_hashes)
+        requested.append(len(page_hashes))
+        return await get_pages(db, page_hashes)
+
+    monkeypatch.setattr(pdf, "run_in_pool", inline)
+    monkeypatch.setattr(pdf, "PDF_JOB_BATCH_PAGES", 2)
+    monkeypatch.setattr(pdf_cache, "get_pages", recording_get_pages)
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(catalog_pdf(5))
+    job = PDFJob("catalogo.pdf")
+    await pdf._run_pdf_job(job, tmp.name, "digest", AsyncMongoMockClient()["test"])
+
+    assert job.status == "completed"
+    assert requested == [2, 2, 1]
@@ -0,0 +1,89 @@
+import os
+import tempfile
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from benchmarks.pdf_fixtures import _pdf_string, write_pdf
+from routes import pdf
+from routes.pdf import hash_pdf_pages, pdf_processor
+from services import pdf_cache
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+def _xobject_pdf(texts, font="Helvetica"):
+    """
+    Una página por texto, todas con el mismo stream de contenido
+    `q /X1 Do Q`: el texto está en un formulario XObject distinto por página
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /%s >>" % font.encode()]
+    content = b"q /X1 Do Q"
+    page_refs = []
+    for text in texts:
+        form = b"BT /F1 12 Tf 50 700 Td " + _pdf_string(text) + b" Tj ET"
+        objects.append(
+            b"<< /Type /XObject /Subtype /Form /BBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Length %d >>\nstream\n%s\nendstream" % (len(form), form)
+        )
+        form_ref = len(objects)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /XObject << /X1 {form_ref} 0 R >> >> /Contents {len(objects)} 0 R >>"
+        ).encode())
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(page_refs)} >>".encode()
+    return write_pdf(objects)
+
+@pytest.fixture
+def pdf_path():
+    paths = []
+
+    def write(content: bytes) -> str:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(content)
+        paths.append(tmp.name)
+        return tmp.name
+
+    yield write
+    for path in paths:
+        os.unlink(path)
+
+def test_pages_with_same_content_stream_and_different_xobjects_have_different_hashes(pdf_path):
+    path = pdf_path(_xobject_pdf(["Producto: Halo Infinite", "Producto: Forza Horizon"]))
+    first, second = hash_pdf_pages(path)
+    assert first != second
+
+def test_page_cache_does_not_return_text_of_another_xobject_page(pdf_path):
+    path = pdf_path(_xobject_pdf(["Producto: Halo Infinite", "Producto: Forza Horizon"]))
+    new_pages = {}
+    texts = list(pdf_processor.iter_page_texts(path, page_cache={}, new_pages=new_pages))
+    assert "Halo Infinite" in texts[0] and "Forza Horizon" in texts[1]
+
+    # Segunda lectura con la caché de la primera: cada página recibe su propio texto
+    cached = list(pdf_processor.iter_page_texts(path, page_cache=new_pages, new_pages={}))
+    assert cached == texts
+
+def test_different_fonts_change_the_hash(pdf_path):
+    [helvetica] = hash_pdf_pages(pdf_path(_xobject_pdf(["Producto: Halo"])))
+    [courier] = hash_pdf_pages(pdf_path(_xobject_pdf(["Producto: Halo"], font="Courier")))
+    assert helvetica != courier
+
+def test_identical_page_in_another_document_keeps_its_hash(pdf_path):
+    [alone] = hash_pdf_pages(pdf_path(_xobject_pdf(["Producto: Halo"])))
+    hashes = hash_pdf_pages(pdf_path(_xobject_pdf(["Producto: Forza", "Producto: Halo"])))
+    # Mismos objetos con otros números
+    assert hashes[1] == alone
+
+@pytest.mark.anyio
+async def test_document_cache_ignores_results_from_another_parser_version(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    result = {"products": [{"titulo": "Antiguo"}], "total_pages": 1, "total_text_length": 10}
+    await pdf_cache.put_document(db, pdf._document_key("abc"), result)
+    assert (await pdf_cache.get_document(db, pdf._document_key("abc")))["products"] == result["products"]
+
+    monkeypatch.setattr(pdf, "PARSER_VERSION", pdf.PARSER_VERSION + 1)
+    assert await pdf_cache.get_document(db, pdf._document_key("abc")) is None
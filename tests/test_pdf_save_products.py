@@ -0,0 +1,70 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from database.memory_product_repository import MemoryProductRepository
+from database.product_repository import get_product_repository
+from routes import pdf
+
+def _item(titulo: str, descripcion: str) -> dict:
+    return {
+        "titulo": titulo, "descripcion": descripcion, "imagen": "/img.png", "pais": "Japón",
+        "fecha_lanzamiento": "2020", "plataformas": ["PC"], "categoria": "Juegos"
+    }
+
+@pytest.fixture
+def repo():
+    return MemoryProductRepository()
+
+@pytest.fixture
+def client(repo):
+    db = AsyncMongoMockClient()["test"]
+    app = FastAPI()
+    app.include_router(pdf.router, prefix="/api")
+
+    async def get_database():
+        return db
+
+    async def get_repository():
+        return repo
+
+    app.dependency_overrides[pdf.get_database] = get_database
+    app.dependency_overrides[get_product_repository] = get_repository
+    return TestClient(app)
+
+def test_response_keeps_the_saved_products(client):
+    first = client.post("/api/pdf/save-products", json=[_item("Halo", "Disparos en primera persona")]).json()
+    assert first["success"] is True
+    assert first["created"] == 1
+    [created] = first["products"]
+    assert created["id"] == first["results"][0]["id"]
+
+    item = _item("Halo", "Nueva edición")
+    item["imagen"] = "/otra.png"
+    second = client.post("/api/pdf/save-products", json=[item]).json()
+    assert second["updated"] == 1
+    [updated] = second["products"]
+    # Se actualiza el producto existente sin pisar su id ni su imagen
+    assert updated["id"] == created["id"]
+    assert updated["imagen"] == "/img.png"
+    assert updated["descripcion"] == "Nueva edición"
+    assert "natural_key" not in updated
+
+def test_partial_failure_is_reported_per_item(client, repo, monkeypatch):
+    bulk_upsert = repo.bulk_upsert
+
+    async def failing_second(docs, insert_only):
+        statuses = await bulk_upsert(docs[:1], insert_only)
+        return statuses + ["failed"] * (len(docs) - 1)
+
+    monkeypatch.setattr(repo, "bulk_upsert", failing_second)
+    body = client.post(
+        "/api/pdf/save-products",
+        json=[_item("Halo", "Disparos"), _item("Zelda", "Aventura en Hyrule")]
+    ).json()
+
+    assert body["success"] is True
+    assert (body["saved_count"], body["created"], body["failed"]) == (1, 1, 1)
+    assert [product["titulo"] for product in body["products"]] == ["Halo"]
+    assert [entry["status"] for entry in body["results"]] == ["created", "failed"]
@@ -0,0 +1,141 @@
+"""Contrato común de ProductRepository, con el backend en memoria y con MongoDB (mongomock)"""
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from database.indexes import ensure_indexes
+from database.memory_product_repository import MemoryProductRepository
+from database.mongo_product_repository import MongoProductRepository
+from database.product_repository import DuplicateProductError
+
+START = datetime(2024, 1, 1)
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(params=["memory", "mongo"])
+async def repo(request):
+    if request.param == "memory":
+        return MemoryProductRepository()
+    db = AsyncMongoMockClient()["test"]
+    # Los índices únicos (id, natural_key) son parte del contrato
+    await ensure_indexes(db)
+    return MongoProductRepository(db)
+
+def _product(product_id: str, titulo: str, minutes: int = 0, **fields) -> dict:
+    created = START + timedelta(minutes=minutes)
+    return {
+        "id": product_id, "titulo": titulo, "descripcion": "", "imagen": "/img.png", "pais": "Japón",
+        "fecha_lanzamiento": "2020", "plataformas": ["PC"], "categoria": "juegos", "subcategoria": "pc",
+        "created_at": created, "updated_at": created, **fields
+    }
+
+async def _pages(repo, **params):
+    ids, position = [], None
+    while True:
+        rows, position = await repo.list_products(position=position, **params)
+        ids.append([row["id"] for row in rows])
+        if position is None:
+            return ids
+
+@pytest.mark.anyio
+async def test_list_pages_with_a_cursor_newest_first(repo):
+    # Dos productos con el mismo created_at: el id desempata
+    for index, minutes in enumerate([0, 1, 2, 2, 3]):
+        await repo.create_product(_product(f"p{index}", f"Juego {index}", minutes))
+    await repo.create_product(_product("app", "Editor", 4, categoria="aplicaciones", subcategoria="android"))
+
+    assert await _pages(repo, limit=2) == [["app", "p4"], ["p3", "p2"], ["p1", "p0"]]
+    assert await _pages(repo, categoria="juegos", limit=3) == [["p4", "p3", "p2"], ["p1", "p0"]]
+    rows, position = await repo.list_products(limit=10, fields={"titulo"})
+    assert position is None
+    assert rows[0] == {"id": "app", "titulo": "Editor"}
+
+@pytest.mark.anyio
+async def test_search_pages_by_offset(repo):
+    if isinstance(repo, MongoProductRepository):
+        pytest.skip("mongomock no implementa $text")
+    for index in range(5):
+        await repo.create_product(_product(f"p{index}", f"Halo {index}", index))
+    await repo.create_product(_product("z", "Zelda", 9))
+
+    rows, position = await repo.list_products(search="halo", limit=2)
+    assert position == {"o": 2}
+    pages = [[row["id"] for row in rows]] + (await _pages(repo, search="halo", limit=2))[1:]
+    assert sorted(id for page in pages for id in page) == ["p0", "p1", "p2", "p3", "p4"]
+    rows, position = await repo.list_products(search="halo", limit=2, position={"o": 4})
+    assert (len(rows), position) == (1, None)
+
+@pytest.mark.anyio
+async def test_create_rejects_a_duplicate_natural_key(repo):
+    await repo.create_product(_product("halo", "Halo"))
+    with pytest.raises(DuplicateProductError):
+        # Mismo título normalizado, categoría y subcategoría
+        await repo.create_product(_product("otro", "  HALO "))
+    # En otra subcategoría no es duplicado
+    await repo.create_product(_product("otro", "Halo", subcategoria="xboxOne"))
+    assert (await repo.get_product("otro"))["subcategoria"] == "xboxOne"
+
+@pytest.mark.anyio
+async def test_update_rejects_a_natural_key_collision(repo):
+    await repo.create_product(_product("halo", "Halo"))
+    await repo.create_product(_product("zelda", "Zelda", 1))
+
+    with pytest.raises(DuplicateProductError):
+        await repo.update_product("zelda", {"titulo": "halo"})
+    assert (await repo.get_product("zelda"))["titulo"] == "Zelda"
+
+    updated = await repo.update_product("zelda", {"titulo": "Zelda 2", "pais": "Japón"})
+    assert updated["titulo"] == "Zelda 2"
+    assert "natural_key" not in updated
+    assert await repo.update_product("falta", {"titulo": "X"}) is None
+
+@pytest.mark.anyio
+async def test_bulk_upsert_reports_each_status(repo):
+    await repo.create_product(_product("halo", "Halo"))
+
+    # El creado va primero: mongomock numera los upserted por orden de
+    # inserción en lugar de por posición en el lote
+    statuses = await repo.bulk_upsert([
+        _product("zelda", "Zelda", 6),
+        _product("nuevo-id", "Halo", 5, descripcion="Reimportado", imagen="/otra.png"),
+        # Clave natural nueva con el id de otro producto: viola el índice único de id
+        _product("halo", "Metroid", 7),
+    ], insert_only=("id", "created_at", "imagen"))
+
+    assert statuses == ["created", "updated", "failed"]
+    halo = await repo.get_product("halo")
+    # Al actualizar se conservan los campos de insert_only
+    assert (halo["descripcion"], halo["imagen"], halo["created_at"]) == ("Reimportado", "/img.png", START)
+    assert halo["titulo"] == "Halo"
+    assert await repo.get_product("nuevo-id") is None
+    assert (await repo.get_product("zelda"))["titulo"] == "Zelda"
+    assert set(await repo.find_by_natural_keys(["metroid|juegos|pc"])) == set()
+
+@pytest.mark.anyio
+async def test_list_changes_returns_last_states_and_tombstones(repo):
+    await repo.create_product(_product("halo", "Halo"))
+    await repo.create_product(_product("zelda", "Zelda", 1))
+    first = await repo.list_changes(0, 10)
+    assert [(c["op"], c["id"]) for c in first] == [("upsert", "halo"), ("upsert", "zelda")]
+    assert first[0]["product"]["titulo"] == "Halo"
+    assert "natural_key" not in first[0]["product"]
+    since = first[-1]["seq"]
+
+    await repo.update_product("halo", {"titulo": "Halo 2"})
+    await repo.delete_product("zelda")
+    await repo.create_product(_product("metroid", "Metroid", 2))
+    await repo.update_product("halo", {"titulo": "Halo 3"})
+
+    changes = await repo.list_changes(since, 10)
+    # Solo el último estado de cada producto, en orden de secuencia
+    assert [(c["op"], c["id"]) for c in changes] == [("delete", "zelda"), ("upsert", "metroid"), ("upsert", "halo")]
+    assert changes[-1]["product"]["titulo"] == "Halo 3"
+    assert [c["seq"] for c in changes] == sorted(c["seq"] for c in changes)
+    assert all(c["seq"] > since for c in changes)
+    # Con límite se continúa desde la última secuencia recibida
+    page = await repo.list_changes(since, 2)
+    assert [c["id"] for c in page + await repo.list_changes(page[-1]["seq"], 10)] == ["zelda", "metroid", "halo"]
+    assert await repo.list_changes(changes[-1]["seq"], 10) == []
@@ -0,0 +1,56 @@
+import pytest
+
+from database.memory_product_repository import MemoryProductRepository
+from models.Product import Product
+from services.suggest_index import SuggestIndex
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+def _product(titulo: str, **fields) -> dict:
+    return Product(
+        titulo=titulo, descripcion="", imagen="", pais="Japón", fecha_lanzamiento="2020",
+        categoria="juegos", **fields
+    ).dict()
+
+def _titles(index: SuggestIndex, query: str):
+    return [entry["titulo"] for entry in index.suggest(query)]
+
+@pytest.mark.anyio
+async def test_follows_other_workers_through_the_change_feed(monkeypatch):
+    repo = MemoryProductRepository()
+    halo = await repo.create_product(_product("Halo Infinite"))
+    index = SuggestIndex()
+    await index.ensure_current(("epoch", 1), repo)
+    assert _titles(index, "hal") == ["Halo Infinite"]
+
+    # Escrituras de otro worker: solo llegan por la versión del catálogo
+    await repo.create_product(_product("Halo Wars", plataformas=["Xbox"]))
+    await repo.delete_product(halo["id"])
+
+    async def no_reload(repo):
+        raise AssertionError("debería aplicar solo los cambios")
+
+    monkeypatch.setattr(index, "_load", no_reload)
+    await index.ensure_current(("epoch", 3), repo)
+
+    assert _titles(index, "hal") == ["Halo Wars"]
+    assert _titles(index, "xb") == ["Halo Wars"]
+    assert "infinite" not in index.vocabulary
+
+@pytest.mark.anyio
+async def test_local_writes_apply_without_a_sync():
+    repo = MemoryProductRepository()
+    index = SuggestIndex()
+    await index.ensure_current(("epoch", 0), repo)
+
+    zelda = _product("Zelda Tears of the Kingdom")
+    index.apply(("epoch", 1), zelda)
+    assert index.version == ("epoch", 1)
+    assert _titles(index, "zel tea") == ["Zelda Tears of the Kingdom"]
+
+    index.apply(("epoch", 2), {**zelda, "titulo": "Zelda Breath of the Wild"})
+    assert _titles(index, "zel") == ["Zelda Breath of the Wild"]
+    assert "tears" not in index.vocabulary
+    assert index.vocabulary == sorted(index.vocabulary)
@@ -0,0 +1,127 @@
+import json
+from datetime import datetime
+
+import httpx
+import pytest
+
+from database import supabase_product_repository
+from database.product_repository import DuplicateProductError
+from database.supabase_product_repository import SupabaseProductRepository
+from database.supabase_rest import SupabaseRest
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+def _row(product_id: str, titulo: str, created_at: str, **fields) -> dict:
+    return {
+        "id": product_id, "titulo": titulo, "categoria": "juegos", "subcategoria": "pc",
+        "created_at": created_at, "natural_key": f"{titulo.lower()}|juegos|pc", "change_seq": 1,
+        "changed_at": created_at, **fields
+    }
+
+def _doc(product_id: str, titulo: str, **fields) -> dict:
+    created = datetime(2024, 5, 1)
+    return {
+        "id": product_id, "titulo": titulo, "descripcion": "", "imagen": "/nueva.png", "pais": "Japón",
+        "fecha_lanzamiento": "2020", "plataformas": ["PC"], "categoria": "juegos", "subcategoria": "pc",
+        "created_at": created, "updated_at": created, **fields
+    }
+
+@pytest.fixture
+def server(monkeypatch):
+    """PostgREST simulado: `handler(request)` decide cada respuesta"""
+    state = {"requests": [], "handler": None}
+
+    def transport(request: httpx.Request) -> httpx.Response:
+        state["requests"].append(request)
+        return state["handler"](request)
+
+    rest = SupabaseRest("https://demo.supabase.co", "clave", transport=httpx.MockTransport(transport))
+    monkeypatch.setattr(supabase_product_repository, "get_supabase_rest", lambda: rest)
+    return state
+
+@pytest.mark.anyio
+async def test_list_pages_by_created_at_and_id(server):
+    pages = [
+        [_row("c", "Cyberpunk", "2024-03-01T00:00:00"), _row("b", "Bioshock", "2024-02-01T00:00:00"),
+         _row("a", "Alan Wake", "2024-02-01T00:00:00")],
+        [_row("a", "Alan Wake", "2024-02-01T00:00:00")],
+    ]
+    server["handler"] = lambda request: httpx.Response(200, json=pages.pop(0))
+    repo = SupabaseProductRepository()
+
+    rows, position = await repo.list_products(categoria="juegos", limit=2)
+    assert [row["id"] for row in rows] == ["c", "b"]
+    # Sin las columnas internas
+    assert "natural_key" not in rows[0] and "change_seq" not in rows[0]
+    assert position == {"c": "2024-02-01T00:00:00", "i": "b"}
+
+    rows, position = await repo.list_products(categoria="juegos", limit=2, position=position, fields={"titulo"})
+    assert rows == [{"id": "a", "titulo": "Alan Wake"}]
+    assert position is None
+
+    first, second = (request.url.params for request in server["requests"])
+    assert first["order"] == "created_at.desc,id.desc"
+    assert (first["categoria"], first["limit"]) == ("eq.juegos", "3")
+    assert "or" not in first
+    # La página siguiente continúa después del último (created_at, id), sin OFFSET
+    assert second["or"] == '(created_at.lt."2024-02-01T00:00:00",and(created_at.eq."2024-02-01T00:00:00",id.lt."b"))'
+    assert "offset" not in second
+    assert second["select"].split(",")[:2] == ["id", "titulo"]
+
+@pytest.mark.anyio
+async def test_bulk_upsert_statuses_and_payload(server):
+    existing = _row("halo-id", "Halo", "2023-01-01T00:00:00", imagen="/original.png")
+    upserts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            return httpx.Response(200, json=[existing])
+        upserts.append(request)
+        return httpx.Response(201, json=json.loads(request.content))
+
+    server["handler"] = handler
+    repo = SupabaseProductRepository()
+
+    statuses = await repo.bulk_upsert([
+        _doc("nuevo-1", "Halo", descripcion="Reimportado"),
+        _doc("nuevo-2", "Zelda"),
+        # La misma clave natural dos veces en el lote: gana la última
+        _doc("nuevo-3", "zelda", descripcion="Segunda"),
+    ], insert_only=("id", "created_at", "imagen"))
+
+    assert statuses == ["updated", "created", "updated"]
+    lookup = server["requests"][0]
+    assert lookup.url.params["natural_key"].startswith("in.(")
+    [upsert] = upserts
+    assert upsert.url.params["on_conflict"] == "natural_key"
+    payload = {row["natural_key"]: row for row in json.loads(upsert.content)}
+    assert sorted(payload) == ["halo|juegos|pc", "zelda|juegos|pc"]
+    # La fila existente conserva los campos insert_only
+    halo = payload["halo|juegos|pc"]
+    assert (halo["id"], halo["created_at"], halo["imagen"]) == ("halo-id", "2023-01-01T00:00:00", "/original.png")
+    assert halo["descripcion"] == "Reimportado"
+    assert (payload["zelda|juegos|pc"]["id"], payload["zelda|juegos|pc"]["descripcion"]) == ("nuevo-3", "Segunda")
+
+@pytest.mark.anyio
+async def test_bulk_upsert_fails_the_whole_batch_on_error(server):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            return httpx.Response(200, json=[])
+        return httpx.Response(400, json={"code": "23502", "message": "null value in column"})
+
+    server["handler"] = handler
+    statuses = await SupabaseProductRepository().bulk_upsert([_doc("1", "Halo"), _doc("2", "Zelda")])
+    assert statuses == ["failed", "failed"]
+
+@pytest.mark.anyio
+async def test_unique_violation_is_a_duplicate_product(server):
+    server["handler"] = lambda request: httpx.Response(
+        409, json={"code": "23505", "message": "duplicate key value violates unique constraint"}
+    )
+    repo = SupabaseProductRepository()
+    with pytest.raises(DuplicateProductError):
+        await repo.create_product(_doc("1", "Halo"))
+    with pytest.raises(DuplicateProductError):
+        await repo.update_product("1", {"descripcion": "Otra"})
@@ -0,0 +1,113 @@
+import json
+
+import httpx
+import pytest
+
+from database.supabase_rest import SupabaseError, SupabaseRest
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+class Recorder:
+    """Transporte que guarda las peticiones y responde con `responses` en orden"""
+
+    def __init__(self, *responses: httpx.Response):
+        self.requests = []
+        self.responses = list(responses)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responses.pop(0) if self.responses else httpx.Response(200, json=[])
+
+    def client(self) -> SupabaseRest:
+        return SupabaseRest("https://demo.supabase.co/", "clave", transport=httpx.MockTransport(self))
+
+@pytest.mark.anyio
+async def test_select_builds_postgrest_filters():
+    recorder = Recorder(httpx.Response(200, json=[{"id": "1"}]))
+    rest = recorder.client()
+
+    response = await rest.table("products").select("id,titulo").eq("categoria", "juegos").neq(
+        "pais", "México"
+    ).is_("subcategoria", None).gt("change_seq", 10).lt("precio", 5).in_(
+        "natural_key", ["halo|juegos|pc", 'a,"b"']
+    ).or_('(created_at.lt."2024-01-01",and(created_at.eq."2024-01-01",id.lt."9"))').order(
+        "created_at", desc=True
+    ).order("id", desc=True).limit(21).offset(40).execute()
+
+    assert response.data == [{"id": "1"}]
+    [request] = recorder.requests
+    assert request.method == "GET"
+    assert request.url.path == "/rest/v1/products"
+    assert request.headers["apikey"] == "clave"
+    assert request.headers["authorization"] == "Bearer clave"
+    assert request.url.params.multi_items() == [
+        ("select", "id,titulo"),
+        ("categoria", "eq.juegos"),
+        ("pais", "neq.México"),
+        ("subcategoria", "is.null"),
+        ("change_seq", "gt.10"),
+        ("precio", "lt.5"),
+        # Cada valor va entre comillas: las comas y comillas no rompen la lista
+        ("natural_key", 'in.("halo|juegos|pc","a,\\"b\\"")'),
+        ("or", '(created_at.lt."2024-01-01",and(created_at.eq."2024-01-01",id.lt."9"))'),
+        # Varias columnas de orden en un solo parámetro
+        ("order", "created_at.desc,id.desc"),
+        ("limit", "21"),
+        ("offset", "40"),
+    ]
+    await rest.close()
+
+@pytest.mark.anyio
+async def test_upsert_merges_on_the_conflict_column():
+    rows = [{"id": "1", "natural_key": "halo|juegos|pc"}]
+    recorder = Recorder(httpx.Response(201, json=rows))
+    rest = recorder.client()
+
+    response = await rest.table("products").upsert(rows, on_conflict="natural_key").execute()
+
+    assert response.data == rows
+    [request] = recorder.requests
+    assert request.method == "POST"
+    assert request.url.params["on_conflict"] == "natural_key"
+    assert request.headers["prefer"] == "return=representation,resolution=merge-duplicates"
+    assert json.loads(request.content) == rows
+    await rest.close()
+
+@pytest.mark.anyio
+async def test_update_delete_and_rpc_requests():
+    recorder = Recorder(httpx.Response(200, json=[]), httpx.Response(204), httpx.Response(200, json=[]))
+    rest = recorder.client()
+
+    await rest.table("products").update({"titulo": "Halo"}).eq("id", "1").execute()
+    deleted = await rest.table("products").delete().eq("id", "1").execute()
+    await rest.rpc("search_products", {"q": "halo"}, columns="id").limit(5).execute()
+
+    update, delete, rpc = recorder.requests
+    assert (update.method, json.loads(update.content), update.url.params["id"]) == ("PATCH", {"titulo": "Halo"}, "eq.1")
+    assert delete.method == "DELETE"
+    # Una respuesta sin cuerpo se lee como lista vacía
+    assert deleted.data == []
+    assert (rpc.method, rpc.url.path) == ("POST", "/rest/v1/rpc/search_products")
+    assert json.loads(rpc.content) == {"q": "halo"}
+    assert rpc.url.params.multi_items() == [("select", "id"), ("limit", "5")]
+    await rest.close()
+
+@pytest.mark.anyio
+async def test_errors_keep_the_postgres_code():
+    recorder = Recorder(
+        httpx.Response(409, json={"code": "23505", "message": "duplicate key value violates unique constraint"}),
+        httpx.Response(502, text="Bad Gateway"),
+    )
+    rest = recorder.client()
+
+    with pytest.raises(SupabaseError) as unique:
+        await rest.table("products").insert({"id": "1"}).execute()
+    assert (unique.value.status_code, unique.value.code) == (409, "23505")
+    assert unique.value.message == "duplicate key value violates unique constraint"
+
+    with pytest.raises(SupabaseError) as gateway:
+        await rest.table("products").select().execute()
+    assert (gateway.value.status_code, gateway.value.code, gateway.value.message) == (502, None, "Bad Gateway")
+    await rest.close()